@@ -3,6 +3,15 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Served by gunicorn with uvicorn workers when SERVER_MODE=asgi (see
+gunicorn.conf.py), equivalent to:
+
+    gunicorn config.asgi:application -k uvicorn_worker.UvicornWorker
+
+The read-only views (dashboard, registration list and detail) and the CSV
+export are async, so one worker process serves many concurrent requests and
+long downloads without tying up a thread per request.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 import os
+import time
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,8 +46,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tagnid.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'tagnid.middleware.AsyncWhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -70,6 +74,16 @@ TEMPLATES = [
     },
 ]
 
+if not DEBUG:
+    # Parse each template once per worker process and never check for changes
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'config.wsgi.application'
 
 
@@ -95,8 +109,123 @@ else:
             'PASSWORD': os.environ.get('PGPASSWORD', ''),
             'HOST': os.environ.get('PGHOST', 'localhost'),
             'PORT': os.environ.get('PGPORT', '5432'),
+            # Keep connections open between requests instead of a new
+            # TCP + auth handshake per request; checked before each reuse
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
         }
     }
+    
+    if os.environ.get('DB_POOL', 'False').lower() == 'true':
+        # psycopg 3 connection pool, one per worker process: size max_size to the
+        # worker's thread count. Pooling replaces persistent connections.
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '1')),
+                'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '4')),
+                # Seconds a request waits for a free connection before failing
+                'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+            },
+        }
+    elif os.environ.get('SERVER_MODE', 'wsgi').lower() == 'asgi':
+        # Under ASGI each request's ORM work runs in its own short-lived thread,
+        # so a persistent connection would be abandoned with that thread instead
+        # of reused; close it after each request (set DB_POOL=true to reuse)
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+
+if DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'tagnid',
+        }
+    }
+else:
+    # File-based so every gunicorn worker sees the same entries and invalidations.
+    # Holds sessions and logged-in users as well as statistics, so it needs more
+    # than the default 300 entries before culling starts.
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', '/tmp/tagnid_cache'),
+            'OPTIONS': {
+                'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '10000')),
+            },
+        }
+    }
+
+# Per-process cache for template fragments that only change on deploy (the
+# filter dropdowns); a shared file cache would cost more than re-rendering them
+CACHES['fragments'] = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'tagnid-fragments',
+}
+
+# Logged-in users, per process so their rows (and password hashes) are never
+# written to the shared file cache; see tagnid/authentication.py
+CACHES['users'] = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'tagnid-users',
+    'OPTIONS': {
+        'MAX_ENTRIES': 1000,
+    },
+}
+
+# Rendered list pages (see tagnid/conditional.py): many short-lived entries per
+# user and query string, kept apart so they never evict sessions or users from
+# the default cache. Per process and bounded; when full, the least recently
+# used quarter is dropped. A miss only means rendering the page again.
+CACHES['pages'] = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'tagnid-pages',
+    'OPTIONS': {
+        'MAX_ENTRIES': int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', '200')),
+        'CULL_FREQUENCY': 4,
+    },
+}
+
+
+# Sessions and authentication
+# https://docs.djangoproject.com/en/6.0/topics/http/sessions/#configuring-the-session-engine
+#
+# SESSION_MODE picks where sessions live:
+# - "db": the django_session table, read on every authenticated request
+# - "cached_db" (default): written through to the table but read from the
+#   default cache (shared by all workers, so a logout is seen everywhere)
+# - "signed_cookies": in the signed session cookie, no storage at all; a
+#   copied cookie stays valid until it expires, even after logout
+SESSION_MODE = os.environ.get('SESSION_MODE', 'cached_db').lower()
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+if SESSION_MODE not in SESSION_ENGINES:
+    raise ImproperlyConfigured(
+        f"SESSION_MODE must be one of {', '.join(SESSION_ENGINES)}, not {SESSION_MODE!r}"
+    )
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
+SESSION_CACHE_ALIAS = 'default'
+SESSION_COOKIE_HTTPONLY = True
+
+# Logged-in users are kept in each worker's memory for this many seconds
+# instead of being loaded on every request (0 disables); see tagnid/authentication.py
+USER_CACHE_TIMEOUT = int(os.environ.get('USER_CACHE_TIMEOUT', '300'))
+
+# Sessions record the backend that logged them in, and only load users through
+# backends still listed here. ModelBackend stays second so sessions created
+# before CachedModelBackend keep working (uncached) until they expire or the
+# user logs in again; new logins go through CachedModelBackend. Remove it once
+# SESSION_COOKIE_AGE has passed since that deploy.
+AUTHENTICATION_BACKENDS = [
+    'tagnid.authentication.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
 
 
 # Password validation
@@ -142,6 +271,24 @@ STATICFILES_DIRS = [
 # WhiteNoise configuration for static files
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Uploaded and generated files (background PDF exports are written here).
+# In production point MEDIA_ROOT at a persistent volume: the container disk is
+# wiped on every redeploy (missing export files are simply rendered again).
+MEDIA_URL = 'media/'
+MEDIA_ROOT = Path(os.environ.get('MEDIA_ROOT', BASE_DIR / 'media'))
+
+# Request instrumentation: per-request query count and timings in a
+# Server-Timing header, with per-view percentiles at /metrics/requests/
+REQUEST_METRICS_ENABLED = os.environ.get('REQUEST_METRICS_ENABLED', 'False').lower() == 'true'
+
+# Identifies the deployed code in the ETags of rendered pages, so a deploy
+# (with changed templates) invalidates them; defaults to the server start time
+RELEASE_VERSION = (
+    os.environ.get('RELEASE_VERSION')
+    or os.environ.get('RAILWAY_DEPLOYMENT_ID')
+    or str(int(time.time()))
+)
+
 # Login/Logout URLs
 LOGIN_URL = 'tagnid:login'
 LOGIN_REDIRECT_URL = 'tagnid:dashboard'
@@ -0,0 +1,117 @@
+"""
+Gunicorn configuration for production.
+
+Gunicorn loads this file automatically when started from the project root.
+Workers and threads are sized from the CPUs and memory actually available
+to the container (cgroup limits, falling back to the host), and every value
+can be overridden from the environment:
+
+- WEB_CONCURRENCY: number of worker processes
+- GUNICORN_THREADS: threads per worker (WSGI mode)
+- GUNICORN_WORKER_MEMORY_MB: memory budgeted per worker when sizing (default 200)
+- GUNICORN_TIMEOUT: seconds before a silent worker is restarted (default 120)
+- SERVER_MODE: "wsgi" (default) or "asgi" for uvicorn workers (see config/asgi.py)
+
+The PDF export worker (`manage.py run_export_jobs`) is not started from here:
+the Procfile runs it next to gunicorn as its own process in the same
+container, since both need the same MEDIA_ROOT.
+
+Each worker has its own database connections, so DB_POOL_MAX_SIZE (see
+config/settings.py) should be at least GUNICORN_THREADS, and Postgres must
+allow workers x that many connections. In ASGI mode connections are closed
+after every request unless DB_POOL=true.
+"""
+import os
+
+
+# Memory reserved for the OS, the export worker and headroom
+RESERVED_MEMORY_MB = 256
+
+DEFAULT_WORKER_MEMORY_MB = 200
+
+DEFAULT_THREADS = 4
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def available_cpus():
+    """CPUs this container may use: cgroup quota if set, else the CPUs we may run on"""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    
+    # cgroup v2 "quota period", or v1 separate files; quota is "max"/-1 when unlimited
+    quota = period = None
+    cpu_max = _read('/sys/fs/cgroup/cpu.max')
+    if cpu_max:
+        quota, period = cpu_max.split()
+    else:
+        quota = _read('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+        period = _read('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+    if quota and period and quota not in ('max', '-1'):
+        cpus = min(cpus, max(int(quota) // int(period), 1))
+    return cpus
+
+
+def available_memory_mb():
+    """Memory limit of this container in MB (cgroup limit if set, else physical memory)"""
+    physical = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    limit = _read('/sys/fs/cgroup/memory.max') or _read('/sys/fs/cgroup/memory/memory.limit_in_bytes')
+    if limit and limit != 'max':
+        # cgroup v1 reports a huge number when unlimited
+        return min(int(limit) // (1024 * 1024), physical)
+    return physical
+
+
+def compute_workers(cpus, memory_mb, worker_memory_mb=DEFAULT_WORKER_MEMORY_MB):
+    """The usual 2 x CPUs + 1 workers, capped by how many fit in memory (at least 1)"""
+    by_memory = (memory_mb - RESERVED_MEMORY_MB) // worker_memory_mb
+    return max(min(2 * cpus + 1, by_memory), 1)
+
+
+server_mode = os.environ.get('SERVER_MODE', 'wsgi').lower()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+workers = int(os.environ.get('WEB_CONCURRENCY') or compute_workers(
+    available_cpus(),
+    available_memory_mb(),
+    int(os.environ.get('GUNICORN_WORKER_MEMORY_MB', DEFAULT_WORKER_MEMORY_MB)),
+))
+
+if server_mode == 'asgi':
+    wsgi_app = 'config.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'config.wsgi:application'
+    # Threads let a worker keep serving while one request waits on the database
+    # or streams an export
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', DEFAULT_THREADS))
+
+# Import Django and the app once in the master; workers fork with it already
+# loaded and share those memory pages
+preload_app = True
+
+# Full CSV exports stream for a long time; a worker is only killed when it
+# stops responding for this long
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then so slow leaks cannot build up
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Never share a database connection opened in the master with the workers
+    from django.db import connections
+    connections.close_all()
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Registration, Vitals
+from .models import Registration, RegistrationCounter, Vitals, ExportJob, DuplicateCandidate
+from .service import save_registration, delete_registration, delete_registrations
 
 
 @admin.register(Registration)
@@ -23,6 +24,16 @@ class RegistrationAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    # Route writes through the service layer so RegistrationCounter stays in step
+    def save_model(self, request, obj, form, change):
+        save_registration(obj)
+    
+    def delete_model(self, request, obj):
+        delete_registration(obj.pk)
+    
+    def delete_queryset(self, request, queryset):
+        delete_registrations(queryset)
 
 
 @admin.register(Vitals)
@@ -32,3 +43,25 @@ class VitalsAdmin(admin.ModelAdmin):
     search_fields = ['registration__first_name', 'registration__last_name']
     readonly_fields = ['created_at', 'updated_at']
 
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'format', 'status', 'requested_by', 'created_at', 'finished_at']
+    list_filter = ['format', 'status', 'created_at']
+    readonly_fields = ['filter_key', 'data_version', 'created_at', 'updated_at', 'finished_at']
+
+
+@admin.register(RegistrationCounter)
+class RegistrationCounterAdmin(admin.ModelAdmin):
+    list_display = ['region', 'auxiliary_body', 'year', 'count']
+    list_filter = ['region', 'auxiliary_body', 'year']
+    readonly_fields = ['region', 'auxiliary_body', 'year', 'count']
+
+
+@admin.register(DuplicateCandidate)
+class DuplicateCandidateAdmin(admin.ModelAdmin):
+    list_display = ['registration', 'duplicate', 'score', 'status', 'reviewed_by', 'created_at']
+    list_filter = ['status', 'created_at']
+    list_select_related = ['registration', 'duplicate', 'reviewed_by']
+    raw_id_fields = ['registration', 'duplicate']
+    readonly_fields = ['score', 'reviewed_by', 'reviewed_at', 'created_at']
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class TagnidConfig(AppConfig):
     name = 'tagnid'
+    
+    def ready(self):
+        # Register signal handlers
+        from . import signals  # noqa: F401
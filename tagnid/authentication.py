@@ -0,0 +1,81 @@
+"""
+Authentication backend that keeps logged-in users in memory.
+
+AuthenticationMiddleware loads request.user from the database on every
+request. CachedModelBackend keeps each worker's recently seen users in its own
+memory (the "users" cache alias) for USER_CACHE_TIMEOUT seconds, so together
+with cached_db or signed-cookie sessions (see SESSION_MODE in
+config/settings.py) an authenticated page needs no queries for the session or
+the user. User rows, password hash included, never leave the process.
+
+Every worker must still notice when a user changes, so the shared default
+cache holds a random version token per user, and saving or deleting a user
+replaces it (see signals.py). A worker reuses its copy only while the token
+matches, so a password change, deactivation or is_staff change takes effect
+on the next request everywhere; the session hash of a cached user is still
+checked as usual.
+"""
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache, caches
+
+
+USER_CACHE_ALIAS = 'users'
+
+USER_CACHE_PREFIX = 'tagnid:user:'
+
+USER_VERSION_PREFIX = 'tagnid:user-version:'
+
+
+def user_cache_key(user_id):
+    return f'{USER_CACHE_PREFIX}{user_id}'
+
+
+def user_version_key(user_id):
+    return f'{USER_VERSION_PREFIX}{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    """Make every worker reload a user on their next request"""
+    cache.set(user_version_key(user_id), uuid.uuid4().hex, None)
+    caches[USER_CACHE_ALIAS].delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose per-request user lookup is served from process memory"""
+    
+    def get_user(self, user_id):
+        timeout = settings.USER_CACHE_TIMEOUT
+        if not timeout:
+            return super().get_user(user_id)
+        
+        # Read the version before loading, so a change committed meanwhile
+        # leaves this copy stale rather than current
+        version = cache.get_or_set(user_version_key(user_id), uuid.uuid4().hex, None)
+        cached = caches[USER_CACHE_ALIAS].get(user_cache_key(user_id))
+        if cached and cached[0] == version:
+            user = cached[1]
+        else:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            caches[USER_CACHE_ALIAS].set(user_cache_key(user_id), (version, user), timeout)
+        return user if self.user_can_authenticate(user) else None
+    
+    async def aget_user(self, user_id):
+        timeout = settings.USER_CACHE_TIMEOUT
+        if not timeout:
+            return await super().aget_user(user_id)
+        
+        version = await cache.aget_or_set(user_version_key(user_id), uuid.uuid4().hex, None)
+        cached = await caches[USER_CACHE_ALIAS].aget(user_cache_key(user_id))
+        if cached and cached[0] == version:
+            user = cached[1]
+        else:
+            user = await super().aget_user(user_id)
+            if user is None:
+                return None
+            await caches[USER_CACHE_ALIAS].aset(user_cache_key(user_id), (version, user), timeout)
+        return user if self.user_can_authenticate(user) else None
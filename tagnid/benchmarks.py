@@ -0,0 +1,365 @@
+"""
+Benchmark suite for the tagnid views and bulk operations.
+
+BenchmarkSuite times the dashboard, the registration list (first, deep keyset
+and deep offset pages, filters and search), the lookup API, CSV and PDF
+exports, unique-code allocation from concurrent threads and the unique-code
+backfill against whatever data is in the database, and returns a JSON-friendly
+report. The `run_benchmarks` command seeds data, prints the report, saves it
+and compares it with an earlier one so regressions show up over time.
+
+The "auth:" benchmarks request the same pages under each session engine, with
+and without the cached user backend, and report the queries per request each
+saves compared with plain database sessions.
+
+Views are requested through the test Client, so the timings include the full
+middleware stack (sessions, authentication) but not the network.
+"""
+import io
+import platform
+import statistics
+import threading
+import time
+import uuid
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .exports import render_registrations_pdf
+from .middleware import QueryTimer, RequestMetrics, percentile
+from .models import CodeSequence, Registration, Vitals
+from .pagination import encode_cursor
+from .service import invalidate_dashboard_stats
+
+
+# Prefix of the throwaway staff user the views are requested as
+BENCHMARK_USERNAME_PREFIX = '_benchmark_'
+
+# Scratch CodeSequence year used (and removed again) by the allocation benchmark
+ALLOCATION_YEAR = 2999
+
+# Codes per request in the lookup API benchmark
+API_LOOKUP_CODES = 100
+
+# Request headers that make pages skip the rendered page cache
+NO_CACHE = {'Cache-Control': 'no-cache'}
+
+# Session engine and authentication backend of each "auth:" benchmark; the
+# first is the baseline the others report their saved queries against
+AUTH_MODES = {
+    'db sessions': ('db', 'django.contrib.auth.backends.ModelBackend'),
+    'cached_db sessions': ('cached_db', 'django.contrib.auth.backends.ModelBackend'),
+    'cached_db sessions + user cache': ('cached_db', 'tagnid.authentication.CachedModelBackend'),
+    'signed cookie sessions + user cache': ('signed_cookies', 'tagnid.authentication.CachedModelBackend'),
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+def summarize(timings):
+    """Median, p90, min and max (ms) of a list of timings in seconds"""
+    ordered = sorted(timing * 1000 for timing in timings)
+    return {
+        'runs': len(ordered),
+        'median_ms': round(statistics.median(ordered), 2),
+        'p90_ms': round(percentile(ordered, 90), 2),
+        'min_ms': round(ordered[0], 2),
+        'max_ms': round(ordered[-1], 2),
+    }
+
+
+def compare_reports(previous, current, tolerance=0.2):
+    """
+    Compare the median timings of two reports
+    
+    Returns:
+        List of (name, previous median, current median, relative change, regressed)
+        for every benchmark present in both reports
+    """
+    rows = []
+    for name, result in current['results'].items():
+        before = previous.get('results', {}).get(name, {}).get('median_ms')
+        after = result.get('median_ms')
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        rows.append((name, before, after, change, change > tolerance))
+    return rows
+
+
+class BenchmarkSuite:
+    """Time each benchmark `repeat` times (after one warm-up run) and build a report"""
+    
+    def __init__(self, repeat=5, threads=4, allocations=200, backfill_rows=10000, pdf_params=None):
+        self.repeat = repeat
+        self.threads = threads
+        self.allocations = allocations
+        self.backfill_rows = backfill_rows
+        self.pdf_params = pdf_params if pdf_params is not None else {'region': 'URR'}
+    
+    def run(self, only=None, progress=None):
+        """
+        Run every benchmark whose name contains one of `only` (default: all)
+        
+        Args:
+            only: Optional list of name substrings to select benchmarks
+            progress: Optional callable receiving (name, result) after each benchmark
+        
+        Returns:
+            Report dict with the environment, the suite settings and per-benchmark results
+        """
+        total = Registration.objects.count()
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'environment': {
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'registrations': total,
+                'vitals': Vitals.objects.count(),
+            },
+            'settings': {
+                'repeat': self.repeat,
+                'threads': self.threads,
+                'allocations': self.allocations,
+                'backfill_rows': self.backfill_rows,
+                'pdf_params': self.pdf_params,
+            },
+            'results': {},
+        }
+        if not total:
+            return report
+        
+        # A fresh, uniquely named user, so no real account is changed or deleted
+        user = User.objects.create_user(
+            username=f'{BENCHMARK_USERNAME_PREFIX}{uuid.uuid4().hex[:12]}', is_staff=True
+        )
+        client = Client()
+        client.force_login(user)
+        try:
+            for name, benchmark in self.get_benchmarks(client, total, user).items():
+                if only and not any(part in name for part in only):
+                    continue
+                result = benchmark()
+                report['results'][name] = result
+                if progress:
+                    progress(name, result)
+        finally:
+            client.logout()
+            user.delete()
+        return report
+    
+    def get_benchmarks(self, client, total, user):
+        """Name -> callable returning that benchmark's result dict"""
+        newest = Registration.objects.order_by('-created_at', '-id')
+        middle = newest[total // 2]
+        codes = list(newest.exclude(unique_code=None).values_list('unique_code', flat=True)[:API_LOOKUP_CODES])
+        list_url = reverse('tagnid:registration_list')
+        export_url = reverse('tagnid:export_registrations')
+        
+        def view(url, params=None, before=None, headers=None):
+            return lambda: self.time_view(client, url, params, before, headers)
+        
+        def page(url, params=None):
+            # Bypass the rendered page cache to time the real work
+            return view(url, params, headers=NO_CACHE)
+        
+        auth_urls = [
+            reverse('tagnid:dashboard'),
+            list_url,
+            reverse('tagnid:registration_detail', args=[middle.pk]),
+            reverse('tagnid:api_registrations') + f'?codes={",".join(codes[:10])}',
+        ]
+        auth_baseline = {}
+        
+        def auth(mode):
+            return lambda: self.time_auth_mode(user, auth_urls, *AUTH_MODES[mode], baseline=auth_baseline)
+        
+        benchmarks = {
+            'dashboard (cached)': view(reverse('tagnid:dashboard')),
+            'dashboard (uncached)': view(reverse('tagnid:dashboard'), before=invalidate_dashboard_stats),
+            'registration_list first page': page(list_url),
+            'registration_list first page (page cache)': view(list_url),
+            'registration_list deep keyset page': page(list_url, {'cursor': encode_cursor('next', middle)}),
+            'registration_list deep offset page': page(list_url, {'page': max(total // 40, 1)}),
+            'registration_list region filter': page(list_url, {'region': 'URR', 'auxiliary_body': 'Khuddam'}),
+            'registration_list name search': page(list_url, {'search': 'jal'}),
+            'registration_list code search': page(list_url, {'search': middle.unique_code or ''}),
+            'registration_detail': page(reverse('tagnid:registration_detail', args=[middle.pk])),
+            'api lookup': view(reverse('tagnid:api_registrations'), {'codes': ','.join(codes)}),
+            'csv export (region)': view(export_url, {'region': 'URR'}),
+            'csv export (all)': view(export_url),
+            'pdf export render': self.time_pdf,
+            'code allocation': self.time_code_allocation,
+            'unique code backfill': self.time_backfill,
+        }
+        benchmarks.update((f'auth: {mode}', auth(mode)) for mode in AUTH_MODES)
+        return benchmarks
+    
+    def measure(self, func, before=None):
+        """Warm up once, then time `func` `repeat` times"""
+        func()
+        timings = []
+        for _ in range(self.repeat):
+            if before:
+                before()
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return summarize(timings)
+    
+    def time_view(self, client, url, params=None, before=None, headers=None):
+        """Time a GET through the full stack, reading streamed bodies to the end"""
+        def fetch():
+            response = client.get(url, params or {}, headers=headers)
+            if response.status_code != 200:
+                raise RuntimeError(f'GET {url} returned {response.status_code}')
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+            return len(body)
+        
+        result = self.measure(fetch, before=before)
+        
+        # One more (untimed) run to count its queries once caches are warm
+        if before:
+            before()
+        metrics = RequestMetrics()
+        with connection.execute_wrapper(QueryTimer(metrics)):
+            size = fetch()
+        result.update(queries=metrics.query_count, bytes=size)
+        return result
+    
+    def time_auth_mode(self, user, urls, session_mode, backend, baseline):
+        """
+        Time one request to each of `urls` with the given session engine and
+        authentication backend, and count the queries each makes
+        
+        Args:
+            baseline: Dict shared by the auth benchmarks; the first one run
+                stores its queries per URL there for the others to compare with
+        
+        Returns:
+            Timing of a round over all URLs, with the average queries per
+            request and how many of them are saved compared with the baseline
+        """
+        with override_settings(SESSION_ENGINE=settings.SESSION_ENGINES[session_mode], AUTHENTICATION_BACKENDS=[backend]):
+            # A new client builds its middleware (and session store) from these settings
+            client = Client()
+            client.force_login(user)
+            try:
+                def fetch_all():
+                    for url in urls:
+                        response = client.get(url, headers=NO_CACHE)
+                        if response.status_code != 200:
+                            raise RuntimeError(f'GET {url} returned {response.status_code}')
+                
+                result = self.measure(fetch_all)
+                
+                queries = {}
+                for url in urls:
+                    metrics = RequestMetrics()
+                    with connection.execute_wrapper(QueryTimer(metrics)):
+                        client.get(url, headers=NO_CACHE)
+                    queries[url] = metrics.query_count
+            finally:
+                client.logout()
+        
+        if not baseline:
+            baseline.update(queries)
+        saved = sum(baseline.get(url, count) - count for url, count in queries.items())
+        result.update(
+            session_engine=session_mode,
+            backend=backend,
+            queries_by_url=queries,
+            queries=round(sum(queries.values()) / len(urls), 2),
+            queries_saved=round(saved / len(urls), 2),
+        )
+        return result
+    
+    def time_pdf(self):
+        """Time rendering the PDF roster for the configured filters"""
+        output = io.BytesIO()
+        
+        def render():
+            output.seek(0)
+            output.truncate()
+            render_registrations_pdf(output, self.pdf_params)
+        
+        result = self.measure(render)
+        result['bytes'] = output.tell()
+        return result
+    
+    def time_code_allocation(self):
+        """Allocate codes one at a time from `threads` concurrent threads"""
+        per_thread = max(self.allocations // max(self.threads, 1), 1)
+        errors = []
+        latencies = []
+        lock = threading.Lock()
+        
+        def allocate(close):
+            try:
+                for _ in range(per_thread):
+                    start = time.perf_counter()
+                    try:
+                        CodeSequence.objects.allocate(ALLOCATION_YEAR)
+                    except Exception as e:
+                        with lock:
+                            errors.append(str(e))
+                        continue
+                    with lock:
+                        latencies.append(time.perf_counter() - start)
+            finally:
+                if close:
+                    connection.close()
+        
+        CodeSequence.objects.filter(year=ALLOCATION_YEAR).delete()
+        start = time.perf_counter()
+        if self.threads > 1:
+            workers = [threading.Thread(target=allocate, args=(True,)) for _ in range(self.threads)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        else:
+            allocate(False)
+        elapsed = time.perf_counter() - start
+        
+        last_number = CodeSequence.objects.filter(year=ALLOCATION_YEAR).values_list('last_number', flat=True).first()
+        CodeSequence.objects.filter(year=ALLOCATION_YEAR).delete()
+        
+        result = summarize(latencies) if latencies else {'runs': 0}
+        result.update(
+            threads=max(self.threads, 1),
+            allocated=len(latencies),
+            errors=len(errors),
+            codes_per_second=round(len(latencies) / elapsed, 1) if elapsed else None,
+            gaps_or_duplicates=(last_number or 0) != len(latencies),
+        )
+        return result
+    
+    def time_backfill(self):
+        """Clear the codes of the newest `backfill_rows` rows and time the backfill (rolled back)"""
+        ids = Registration.objects.order_by('-id').values_list('id', flat=True)
+        rows = min(self.backfill_rows, ids.count())
+        if not rows:
+            return {'runs': 0}
+        
+        result = {}
+        try:
+            with transaction.atomic():
+                Registration.objects.filter(id__gte=ids[rows - 1]).update(unique_code=None)
+                start = time.perf_counter()
+                updated = Registration.objects.backfill_unique_codes()
+                elapsed = time.perf_counter() - start
+                result = summarize([elapsed])
+                result.update(rows=updated, rows_per_second=round(updated / elapsed, 1) if elapsed else None)
+                raise _Rollback
+        except _Rollback:
+            pass
+        return result
@@ -0,0 +1,145 @@
+"""
+Conditional GET (ETag / Last-Modified) and short-lived page caching for the
+registration list and detail pages.
+
+Each page gets a cheap fingerprint of the data it shows, combined with the
+user, the normalized query string, the date (ages roll over) and the deployed
+release (templates change). For a detail page that is the registration's and
+its vitals' updated_at. For list pages it is the table-wide MAX(updated_at)
+(an index lookup) plus the registration count from RegistrationCounter, so
+deletions change it too: computing MAX(updated_at) over just the filtered rows
+costs more than rendering the page, so any change to any registration
+invalidates every list page instead. MAX(updated_at) does not move when a
+registration is deleted, so list pages are revalidated by ETag only and carry
+no Last-Modified. Browsers and kiosks revalidating with If-None-Match (or,
+for detail pages, If-Modified-Since) get a 304 without the page query or
+template rendering. Rendered list pages are also kept for a short time in the
+cache under the same fingerprint, so another request for the same unchanged
+page is served straight from the cache (the bounded "pages" alias, so they
+never push sessions or users out of the default cache).
+
+Django's condition() decorator calls its functions synchronously, which the
+async views cannot do for database queries, so conditional_page() is the
+async equivalent built on the same get_conditional_response().
+"""
+import datetime
+import hashlib
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import caches
+from django.db.models import Max
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, urlencode
+
+from .models import Registration
+from .service import count_registrations
+
+
+# Seconds a rendered list page stays cached (per user, query string and data version)
+LIST_PAGE_CACHE_TIMEOUT = 30
+
+PAGE_CACHE_PREFIX = 'tagnid:page:'
+
+# Cache alias holding rendered pages, separate from sessions and statistics
+PAGE_CACHE_ALIAS = 'pages'
+
+
+def normalize_query_string(params):
+    """Sorted, non-empty parameters, so equivalent URLs share a fingerprint"""
+    return urlencode(sorted((key, value) for key, values in params.lists() for value in values if value))
+
+
+def _page_etag(request, *parts):
+    """ETag for a page rendered for this user and release from data described by `parts`"""
+    user = request.user
+    payload = ':'.join(str(part) for part in (
+        settings.RELEASE_VERSION, user.pk, user.is_staff, user.is_superuser, timezone.localdate(), *parts
+    ))
+    return '"%s"' % hashlib.md5(payload.encode(), usedforsecurity=False).hexdigest()
+
+
+def _start_of_today():
+    return timezone.make_aware(datetime.datetime.combine(timezone.localdate(), datetime.time()))
+
+
+def registration_list_fingerprint(request):
+    """
+    (etag, None) of the list page for request.GET, from two index/counter lookups
+    
+    No last_modified: a deletion changes the count in the ETag but not MAX(updated_at).
+    """
+    last = Registration.objects.order_by().aggregate(last=Max('updated_at'))['last']
+    count = count_registrations({})
+    return _page_etag(request, 'list', normalize_query_string(request.GET), count, last), None
+
+
+def registration_detail_fingerprint(request, pk):
+    """(etag, last_modified) of a registration's detail page, or None if it does not exist"""
+    row = Registration.objects.filter(pk=pk).values_list('updated_at', 'vitals__id', 'vitals__updated_at').first()
+    if row is None:
+        return None
+    updated_at, vitals_id, vitals_updated_at = row
+    last_modified = max(filter(None, [updated_at, vitals_updated_at, _start_of_today()]))
+    return _page_etag(request, 'detail', pk, updated_at, vitals_id, vitals_updated_at), last_modified
+
+
+def _fingerprint_unless_messages(fingerprint, request, args, kwargs):
+    # A page with pending flash messages must be rendered (and never cached)
+    if len(messages.get_messages(request)):
+        return None
+    return fingerprint(request, *args, **kwargs)
+
+
+def conditional_page(fingerprint, cache_timeout=None):
+    """
+    Async view decorator answering conditional GETs from `fingerprint`
+    
+    Args:
+        fingerprint: Sync callable taking the view's arguments and returning
+            (etag, last_modified), or None to always run the view; last_modified
+            may be None to revalidate by ETag alone
+        cache_timeout: If set, successful responses are cached for this many
+            seconds under their ETag and served from there (unless the request
+            says Cache-Control: no-cache)
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await view(request, *args, **kwargs)
+            
+            result = await sync_to_async(_fingerprint_unless_messages)(fingerprint, request, args, kwargs)
+            if result is None:
+                return await view(request, *args, **kwargs)
+            etag, last_modified = result
+            if last_modified is not None:
+                last_modified = int(last_modified.timestamp())
+            
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            # A hard reload (Cache-Control: no-cache) always renders afresh
+            use_cache = cache_timeout and 'no-cache' not in request.headers.get('Cache-Control', '')
+            if response is None and use_cache:
+                content = await caches[PAGE_CACHE_ALIAS].aget(PAGE_CACHE_PREFIX + etag)
+                if content is not None:
+                    response = HttpResponse(content)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+                if cache_timeout and response.status_code == 200 and not response.streaming:
+                    await caches[PAGE_CACHE_ALIAS].aset(PAGE_CACHE_PREFIX + etag, response.content, cache_timeout)
+            
+            if response.status_code in (200, 304):
+                response.headers.setdefault('ETag', etag)
+                if last_modified is not None and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                # Only the user's own browser may keep it, and must revalidate each time
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        
+        return wrapper
+    
+    return decorator
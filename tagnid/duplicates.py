@@ -0,0 +1,214 @@
+"""
+Fuzzy duplicate registration detection.
+
+Comparing every registration with every other is O(n²), so candidates are
+only compared within blocks of rows sharing a blocking key:
+
+- last name phonetic key + birth year
+- first name phonetic key + birth year (catches a misspelt last name)
+- last + first name phonetic keys (catches a missing or mistyped date of birth)
+
+Each blocking is one pass over the table sorted by the (indexed) key columns,
+so rows stream through in key order and only one block is held in memory.
+Oversized blocks (very common names) fall back to comparing each row with its
+next DUPLICATE_WINDOW neighbours. Pairs are scored on name similarity, date of
+birth and region; those above the threshold are stored as DuplicateCandidate
+rows for staff review.
+"""
+from functools import lru_cache
+from itertools import combinations, groupby
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import DuplicateCandidate, Registration
+from .phonetics import name_similarity, phonetic_key
+
+
+DUPLICATE_THRESHOLD = 0.85
+
+# Blocks larger than this are compared with a sliding window instead of all pairs
+MAX_BLOCK_SIZE = 200
+DUPLICATE_WINDOW = 20
+
+# Rows fetched per round trip while streaming a blocking pass
+SCAN_CHUNK_SIZE = 5000
+
+# Most candidate rows scored by the pre-insert check
+PRE_INSERT_CANDIDATES = 50
+
+ROW_FIELDS = ('id', 'first_name', 'last_name', 'dob', 'region', 'first_name_key', 'last_name_key')
+
+# (ordering, block key) per blocking pass; rows whose key is None are skipped
+BLOCKINGS = [
+    (('last_name_key', 'dob'), lambda row: (row[6], row[3].year) if row[6] and row[3] else None),
+    (('first_name_key', 'dob'), lambda row: (row[5], row[3].year) if row[5] and row[3] else None),
+    (('last_name_key', 'first_name_key'), lambda row: (row[6], row[5]) if row[6] and row[5] else None),
+]
+
+
+def dob_similarity(a, b):
+    """1.0 for the same date, partial credit for likely typos, 0.5 if either is unknown"""
+    if a is None or b is None:
+        return 0.5
+    if a == b:
+        return 1.0
+    if a.year == b.year and (a.month, a.day) == (b.day, b.month):
+        # Day and month swapped
+        return 0.9
+    if (a.month, a.day) == (b.month, b.day) and abs(a.year - b.year) == 1:
+        return 0.6
+    return 0.0
+
+
+# Score weights; names dominate so that a missing date of birth can still match
+NAME_WEIGHT = 0.7
+DOB_WEIGHT = 0.25
+REGION_WEIGHT = 0.05
+
+
+@lru_cache(maxsize=200000)
+def _name_similarity(a, b):
+    # Names repeat heavily, so most comparisons are cache hits
+    return name_similarity(a, b)
+
+
+def score_pair(a, b, threshold=0.0):
+    """
+    Similarity of two registrations from 0 to 1
+    
+    Args:
+        a, b: (first_name, last_name, dob, region) tuples
+        threshold: Pairs that cannot reach this score even with identical
+            names score 0 without comparing the names
+    """
+    rest = DOB_WEIGHT * dob_similarity(a[2], b[2]) + REGION_WEIGHT * (a[3] == b[3])
+    if NAME_WEIGHT + rest < threshold:
+        return 0.0
+    names = (_name_similarity(a[0], b[0]) + _name_similarity(a[1], b[1])) / 2
+    if names < 1.0:
+        swapped = (_name_similarity(a[0], b[1]) + _name_similarity(a[1], b[0])) / 2
+        names = max(names, swapped)
+    return round(NAME_WEIGHT * names + rest, 3)
+
+
+def _block_pairs(block):
+    """Candidate pairs within one block: all pairs, or a sliding window if it is too big"""
+    if len(block) <= MAX_BLOCK_SIZE:
+        return combinations(block, 2)
+    return (
+        (block[i], block[j])
+        for i in range(len(block))
+        for j in range(i + 1, min(i + 1 + DUPLICATE_WINDOW, len(block)))
+    )
+
+
+def find_duplicates(threshold=DUPLICATE_THRESHOLD, registrations=None, progress=None):
+    """
+    Find likely duplicate pairs across `registrations` (default: all)
+    
+    Args:
+        threshold: Minimum score for a pair to be reported
+        registrations: Optional queryset to restrict the scan
+        progress: Optional callable receiving (pass number, stats) after each blocking pass
+    
+    Returns:
+        (pairs, stats): pairs is a dict mapping (lower id, higher id) to score;
+        stats counts blocks, comparisons and pairs found
+    """
+    if registrations is None:
+        registrations = Registration.objects.all()
+    
+    pairs = {}
+    stats = {'blocks': 0, 'comparisons': 0, 'pairs': 0}
+    for number, (ordering, block_key) in enumerate(BLOCKINGS, start=1):
+        rows = registrations.order_by(*ordering, 'id').values_list(*ROW_FIELDS).iterator(chunk_size=SCAN_CHUNK_SIZE)
+        for key, block in groupby(rows, key=block_key):
+            if key is None:
+                continue
+            block = list(block)
+            if len(block) < 2:
+                continue
+            stats['blocks'] += 1
+            for a, b in _block_pairs(block):
+                # Pairs in more than one blocking are simply scored again (the
+                # score is the same); that beats remembering every pair compared
+                stats['comparisons'] += 1
+                score = score_pair(a[1:5], b[1:5], threshold)
+                if score >= threshold:
+                    pairs[(a[0], b[0]) if a[0] < b[0] else (b[0], a[0])] = score
+        stats['pairs'] = len(pairs)
+        if progress:
+            progress(number, dict(stats))
+    return pairs, stats
+
+
+def _recorded_pairs(pairs):
+    """The (registration_id, duplicate_id) pairs among `pairs` that are already stored"""
+    recorded = set()
+    lows = sorted({low for low, _ in pairs})
+    for start in range(0, len(lows), 500):
+        recorded.update(DuplicateCandidate.objects.filter(
+            registration_id__in=lows[start:start + 500]
+        ).values_list('registration_id', 'duplicate_id'))
+    return recorded & pairs.keys()
+
+
+def record_duplicates(pairs):
+    """
+    Store new candidate pairs for review; returns how many this call inserted
+    
+    Pairs already recorded (including dismissed ones) are left as they are. If
+    another process stores one of the same pairs meanwhile, the insert is rolled
+    back and retried without it, so the count is exactly the rows created here.
+    """
+    for attempt in range(3):
+        recorded = _recorded_pairs(pairs)
+        new = [
+            DuplicateCandidate(registration_id=low, duplicate_id=high, score=score)
+            for (low, high), score in pairs.items()
+            if (low, high) not in recorded
+        ]
+        try:
+            with transaction.atomic():
+                DuplicateCandidate.objects.bulk_create(new, batch_size=1000)
+        except IntegrityError:
+            if attempt == 2:
+                raise
+            continue
+        return len(new)
+
+
+def find_possible_duplicates(first_name, last_name, dob=None, region=None, exclude_pk=None, threshold=DUPLICATE_THRESHOLD):
+    """
+    Pre-insert check: existing registrations that look like the given person
+    
+    Uses the same blocking keys as find_duplicates(), answered with index
+    lookups on the stored phonetic keys, so it only scores a handful of rows.
+    
+    Returns:
+        List of (registration, score) pairs, best match first
+    """
+    first_key, last_key = phonetic_key(first_name), phonetic_key(last_name)
+    if not (first_key and last_key):
+        return []
+    
+    candidates = Q(last_name_key=last_key, first_name_key=first_key)
+    if dob:
+        candidates |= Q(last_name_key=last_key, dob__year=dob.year) | Q(first_name_key=first_key, dob__year=dob.year)
+    # Newest first, so the rows scored are the same on every call
+    registrations = Registration.objects.filter(candidates).order_by('-created_at', '-id').only(
+        'id', 'unique_code', 'first_name', 'last_name', 'dob', 'region'
+    )
+    if exclude_pk:
+        registrations = registrations.exclude(pk=exclude_pk)
+    
+    person = (first_name, last_name, dob, region)
+    matches = []
+    for registration in registrations[:PRE_INSERT_CANDIDATES]:
+        score = score_pair(
+            person, (registration.first_name, registration.last_name, registration.dob, registration.region)
+        )
+        if score >= threshold:
+            matches.append((registration, score))
+    return sorted(matches, key=lambda match: -match[1])
@@ -0,0 +1,303 @@
+"""
+Export helpers: PDF rendering and the background export job queue.
+
+PDF exports of large rosters are too slow to render inside a request, so the
+views only enqueue an ExportJob and the `run_export_jobs` management command
+renders it to storage. Jobs are keyed by their filters and a fingerprint of the
+registration data, so identical requests reuse the finished file until a
+registration (or its vitals) changes. A job left running by a worker that
+died mid-render is marked failed after STALE_JOB_TIMEOUT, so the same export
+can be requested again.
+"""
+import hashlib
+import io
+import json
+from datetime import datetime, timedelta
+
+from django.core.files.base import ContentFile
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Registration, Vitals, ExportJob, REGION_LABELS, AUXILIARY_BODY_LABELS
+from .service import FILTER_PARAMS, count_registrations, filter_registrations
+
+
+# Rows fetched per round trip when streaming exports
+EXPORT_CHUNK_SIZE = 2000
+
+# Registration rows per PDF table; sized so each table fits on one A4 page
+PDF_ROWS_PER_TABLE = 40
+
+# A running job not finished within this time is assumed to belong to a dead
+# worker; well above the render time of the largest roster
+STALE_JOB_TIMEOUT = timedelta(minutes=30)
+
+PDF_TABLE_HEADER = ['Unique Code', 'Name', 'Region', 'Auxiliary Body', 'DOB', 'Age', 'Blood Group', 'Height']
+
+
+def normalize_export_params(params):
+    """Keep only the non-empty filter parameters, as a plain dict"""
+    return {key: params.get(key) for key in FILTER_PARAMS if params.get(key)}
+
+
+def export_filter_key(export_format, params):
+    """Stable hash identifying an export format and filter combination"""
+    payload = json.dumps([export_format, params], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def registrations_data_version():
+    """
+    Cheap fingerprint that changes whenever a registration or vitals row changes,
+    and every day, since printed ages and the min_age/max_age filters depend on the date
+    """
+    registrations = Registration.objects.order_by().aggregate(count=Count('id'), last=Max('updated_at'))
+    vitals = Vitals.objects.order_by().aggregate(count=Count('id'), last=Max('updated_at'))
+    parts = [
+        timezone.localdate().isoformat(),
+        registrations['count'],
+        registrations['last'].timestamp() if registrations['last'] else 0,
+        vitals['count'],
+        vitals['last'].timestamp() if vitals['last'] else 0,
+    ]
+    return ':'.join(str(part) for part in parts)
+
+
+def export_file_exists(job):
+    """Whether a job's rendered file is still in storage"""
+    return bool(job.file) and job.file.storage.exists(job.file.name)
+
+
+def request_export(params, export_format=ExportJob.FORMAT_PDF, user=None):
+    """
+    Return an export job for the given filters, reusing an existing one if possible
+    
+    A pending, running (and not stale) or finished job with the same filters and
+    data version is returned as-is; otherwise a new pending job is queued. A
+    finished job whose file is gone from storage (e.g. a container disk wiped
+    by a redeploy) is marked failed and replaced.
+    """
+    params = normalize_export_params(params)
+    filter_key = export_filter_key(export_format, params)
+    data_version = registrations_data_version()
+    
+    job = ExportJob.objects.filter(
+        filter_key=filter_key,
+        data_version=data_version,
+        status__in=[ExportJob.STATUS_PENDING, ExportJob.STATUS_RUNNING, ExportJob.STATUS_DONE],
+    ).exclude(
+        status=ExportJob.STATUS_RUNNING, updated_at__lt=timezone.now() - STALE_JOB_TIMEOUT
+    ).first()
+    if job and not (job.status == ExportJob.STATUS_DONE and not export_file_exists(job)):
+        return job
+    if job:
+        job.status = ExportJob.STATUS_FAILED
+        job.error = 'The export file is no longer in storage.'
+        job.save(update_fields=['status', 'error', 'updated_at'])
+    
+    return ExportJob.objects.create(
+        format=export_format,
+        params=params,
+        filter_key=filter_key,
+        data_version=data_version,
+        requested_by=user if user and user.is_authenticated else None,
+    )
+
+
+def fail_stale_jobs():
+    """Mark jobs running for longer than STALE_JOB_TIMEOUT as failed; returns the count"""
+    return ExportJob.objects.filter(
+        status=ExportJob.STATUS_RUNNING,
+        updated_at__lt=timezone.now() - STALE_JOB_TIMEOUT,
+    ).update(
+        status=ExportJob.STATUS_FAILED,
+        error='The export worker stopped before finishing this job.',
+        finished_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+
+
+def claim_next_job():
+    """Atomically mark the oldest pending job as running and return it (or None)"""
+    fail_stale_jobs()
+    while True:
+        job = ExportJob.objects.filter(status=ExportJob.STATUS_PENDING).order_by('created_at', 'id').first()
+        if job is None:
+            return None
+        # Conditional update so two workers can never claim the same job
+        claimed = ExportJob.objects.filter(pk=job.pk, status=ExportJob.STATUS_PENDING).update(
+            status=ExportJob.STATUS_RUNNING, updated_at=timezone.now()
+        )
+        if claimed:
+            job.status = ExportJob.STATUS_RUNNING
+            return job
+
+
+def run_export_job(job):
+    """Render a claimed job to storage and record the outcome"""
+    try:
+        buffer = io.BytesIO()
+        render_registrations_pdf(buffer, job.params)
+        job.file.save(f'registrations_{job.pk}_{job.filter_key[:12]}.pdf', ContentFile(buffer.getvalue()), save=False)
+        job.status = ExportJob.STATUS_DONE
+        job.error = ''
+    except Exception as e:
+        job.status = ExportJob.STATUS_FAILED
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save()
+    
+    if job.status == ExportJob.STATUS_DONE:
+        _discard_stale_artifacts(job)
+    return job
+
+
+def _discard_stale_artifacts(job):
+    """Delete older finished jobs (and their files) for the same filters"""
+    stale = ExportJob.objects.filter(
+        filter_key=job.filter_key,
+        status__in=[ExportJob.STATUS_DONE, ExportJob.STATUS_FAILED],
+    ).exclude(pk=job.pk).exclude(data_version=job.data_version)
+    for old_job in stale:
+        if old_job.file:
+            old_job.file.delete(save=False)
+        old_job.delete()
+
+
+def process_pending_jobs(limit=None):
+    """Run pending jobs until the queue is empty (or `limit` jobs ran); returns the count"""
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_export_job(job)
+        processed += 1
+    return processed
+
+
+def _pdf_table_rows(registrations):
+    """Yield PDF table rows for `registrations`, streamed as plain values"""
+    rows = registrations.with_age().values_list(
+        'unique_code', 'first_name', 'last_name', 'region', 'auxiliary_body',
+        'dob', 'current_age', 'vitals__blood_group', 'vitals__height'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    
+    for unique_code, first_name, last_name, region, auxiliary_body, dob, age, blood_group, height in rows:
+        yield [
+            unique_code or 'N/A',
+            f"{first_name} {last_name}",
+            REGION_LABELS.get(region, region),
+            AUXILIARY_BODY_LABELS.get(auxiliary_body, auxiliary_body),
+            dob.strftime('%Y-%m-%d') if dob else 'N/A',
+            str(age) if age else 'N/A',
+            blood_group or 'N/A',
+            f"{height} cm" if height else 'N/A',
+        ]
+
+
+def _chunked(iterable, size):
+    """Yield lists of up to `size` items from `iterable`"""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _LazyStory(list):
+    """
+    Flowable list for doc.build() that pulls the next flowable from `pending`
+    only once everything before it has been laid out, so finished tables (and
+    their rows) are released page by page instead of all being held at once
+    """
+    
+    def __init__(self, flowables, pending):
+        super().__init__(flowables)
+        self._pending = pending
+    
+    def __len__(self):
+        if not super().__len__():
+            flowable = next(self._pending, None)
+            if flowable is not None:
+                self.append(flowable)
+        return super().__len__()
+
+
+def render_registrations_pdf(output, params):
+    """Render the registrations matching `params` as a PDF into the file-like `output`"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.enums import TA_CENTER
+    
+    # Get filtered registrations
+    registrations = filter_registrations(params)
+    
+    # Create PDF document
+    doc = SimpleDocTemplate(output, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=30)
+    story = []
+    
+    # Define styles
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        textColor=colors.HexColor('#000000'),
+        spaceAfter=30,
+        alignment=TA_CENTER
+    )
+    
+    # Title
+    title = Paragraph("Majilis Khuddamul Ahmadiyya The Gambia<br/>National Registration Tajnid 2025", title_style)
+    story.append(title)
+    story.append(Spacer(1, 0.2*inch))
+    
+    # Summary info
+    summary_text = f"Total Registrations: {count_registrations(params)}<br/>Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+    if params.get('search'):
+        summary_text += f"<br/>Search: {params.get('search')}"
+    if params.get('region'):
+        summary_text += f"<br/>Region: {REGION_LABELS.get(params.get('region'), '')}"
+    if params.get('auxiliary_body'):
+        summary_text += f"<br/>Auxiliary Body: {AUXILIARY_BODY_LABELS.get(params.get('auxiliary_body'), '')}"
+    
+    summary = Paragraph(summary_text, styles['Normal'])
+    story.append(summary)
+    story.append(Spacer(1, 0.3*inch))
+    
+    # One page-sized table per chunk of rows keeps ReportLab's layout work
+    # linear; tables are built as the previous one is laid out
+    col_widths = [0.8*inch, 1.2*inch, 0.8*inch, 0.9*inch, 0.8*inch, 0.4*inch, 0.6*inch, 0.6*inch]
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#bab148')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+        ('TOPPADDING', (0, 0), (-1, 0), 10),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#fdf4e3')),
+        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 7),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#fdf4e3')]),
+    ])
+    
+    def tables():
+        for rows in _chunked(_pdf_table_rows(registrations), PDF_ROWS_PER_TABLE):
+            table = Table([PDF_TABLE_HEADER] + rows, colWidths=col_widths, repeatRows=1)
+            table.setStyle(table_style)
+            yield table
+    
+    # Build PDF
+    doc.build(_LazyStory(story, tables()))
+    return output
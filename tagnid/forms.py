@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import AuthenticationForm
-from .models import Registration, Vitals
+from datetime import date
+from .models import Registration, Vitals, auxiliary_body_age_error, calculate_age
 
 
 class CustomLoginForm(AuthenticationForm):
@@ -52,6 +53,23 @@ class RegistrationForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         self.fields['auxiliary_body'].required = True
         self.fields['dob'].required = False
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        dob = cleaned_data.get('dob')
+        auxiliary_body = cleaned_data.get('auxiliary_body')
+        
+        if dob and dob > date.today():
+            self.add_error('dob', 'Date of birth cannot be in the future.')
+        elif dob and auxiliary_body:
+            # Only check new entries and edits that touch dob or auxiliary body,
+            # so members who have since aged out can still be edited
+            if not self.instance.pk or {'dob', 'auxiliary_body'} & set(self.changed_data):
+                error = auxiliary_body_age_error(auxiliary_body, calculate_age(dob))
+                if error:
+                    self.add_error('auxiliary_body', error)
+        
+        return cleaned_data
 
 
 class VitalsForm(forms.ModelForm):
@@ -80,3 +98,12 @@ class VitalsForm(forms.ModelForm):
         self.fields['blood_group'].required = False
         self.fields['height'].required = False
 
+
+class RegistrationImportForm(forms.Form):
+    file = forms.FileField(
+        label='Spreadsheet (.csv or .xlsx)',
+        widget=forms.ClearableFileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv,.xlsx'
+        })
+    )
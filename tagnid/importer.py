@@ -0,0 +1,282 @@
+"""
+Bulk import of registrations (and optional vitals) from CSV or Excel files,
+and from batches queued on offline field devices.
+
+Rows are parsed as a stream, validated with the same RegistrationForm and
+VitalsForm rules as the web forms, and written a batch at a time: one block of
+unique codes per year from CodeSequence, one bulk_create for the registrations
+and one for their vitals. Invalid rows are reported and skipped; they never
+abort the rest of the file.
+"""
+import csv
+import io
+import uuid
+from datetime import date
+
+from django.db import IntegrityError, transaction
+
+from .forms import RegistrationForm, VitalsForm
+from .models import Registration
+from .service import bulk_create_registrations, invalidate_dashboard_stats
+
+
+IMPORT_BATCH_SIZE = 500
+
+# Most registrations one offline sync request may carry
+SYNC_MAX_BATCH = 500
+
+# Accepted column headings (normalized to lowercase with underscores) per field
+COLUMN_ALIASES = {
+    'first_name': ['first_name', 'firstname', 'first'],
+    'last_name': ['last_name', 'lastname', 'surname', 'last'],
+    'dob': ['dob', 'date_of_birth', 'birth_date'],
+    'region': ['region'],
+    'auxiliary_body': ['auxiliary_body', 'auxiliary', 'majilis'],
+    'blood_group': ['blood_group', 'blood'],
+    'height': ['height', 'height_(cm)', 'height_cm'],
+}
+
+VITALS_FIELDS = ('blood_group', 'height')
+
+
+class ImportResult:
+    """Outcome of an import: how many rows were created and which rows failed"""
+    
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+    
+    def add_error(self, row_number, message):
+        self.errors.append((row_number, message))
+    
+    @property
+    def failed(self):
+        return len(self.errors)
+
+
+def _normalize_heading(heading):
+    return str(heading or '').strip().lower().replace(' ', '_')
+
+
+def _column_map(headings):
+    """Map each field name to its column index in `headings`"""
+    normalized = [_normalize_heading(heading) for heading in headings]
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                columns[field] = normalized.index(alias)
+                break
+    return columns
+
+
+def _choice_lookup(choices):
+    """Accept either the stored value or the display label, case-insensitively"""
+    lookup = {}
+    for value, label in choices:
+        lookup[value.lower()] = value
+        lookup[label.lower()] = value
+    return lookup
+
+
+REGION_LOOKUP = _choice_lookup(Registration.REGION_CHOICES)
+AUXILIARY_BODY_LOOKUP = _choice_lookup(Registration.AUXILIARY_BODY_CHOICES)
+
+
+def _iter_csv(file):
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.reader(text)
+    finally:
+        text.detach()
+
+
+def _iter_xlsx(file):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('Excel import requires openpyxl. Please install it or upload a CSV file.')
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield ['' if value is None else value for value in row]
+    finally:
+        workbook.close()
+
+
+def read_rows(file, filename):
+    """
+    Yield (row_number, data) for each data row of a CSV or .xlsx file
+    
+    `data` maps field names to raw cell values, ready for RegistrationForm/VitalsForm.
+    Raises ValueError if the file type is unsupported or required columns are missing.
+    """
+    if filename.lower().endswith('.xlsx'):
+        rows = _iter_xlsx(file)
+    elif filename.lower().endswith('.csv'):
+        rows = _iter_csv(file)
+    else:
+        raise ValueError('Unsupported file type. Upload a .csv or .xlsx file.')
+    
+    headings = next(rows, None)
+    if headings is None:
+        return
+    columns = _column_map(headings)
+    missing = [field for field in ('first_name', 'last_name', 'region', 'auxiliary_body') if field not in columns]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+    
+    for row_number, row in enumerate(rows, start=2):
+        if not any(str(cell).strip() for cell in row):
+            continue
+        data = {}
+        for field, index in columns.items():
+            value = row[index] if index < len(row) else ''
+            if isinstance(value, date):
+                value = value.strftime('%Y-%m-%d')
+            data[field] = str(value).strip()
+        data['region'] = REGION_LOOKUP.get(data['region'].lower(), data['region'])
+        data['auxiliary_body'] = AUXILIARY_BODY_LOOKUP.get(data['auxiliary_body'].lower(), data['auxiliary_body'])
+        yield row_number, data
+
+
+def _form_errors(*forms):
+    messages = []
+    for form in forms:
+        for field, errors in form.errors.items():
+            label = form.fields[field].label if field in form.fields else field
+            messages.append(f"{label}: {' '.join(errors)}")
+    return '; '.join(messages)
+
+
+def build_registration(data):
+    """
+    Validate one row of registration (and optional vitals) data with the web forms
+    
+    Returns:
+        (registration, vitals, None) with unsaved instances (vitals is None when no
+        vitals were given), or (None, None, error message) if the data is invalid
+    """
+    registration_form = RegistrationForm(data)
+    vitals_form = VitalsForm(data)
+    if not (registration_form.is_valid() and vitals_form.is_valid()):
+        return None, None, _form_errors(registration_form, vitals_form)
+    
+    vitals = None
+    if any(vitals_form.cleaned_data.get(field) for field in VITALS_FIELDS):
+        vitals = vitals_form.save(commit=False)
+    return registration_form.save(commit=False), vitals, None
+
+
+def import_registrations(rows, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """
+    Validate and insert registrations from `rows` (as yielded by read_rows)
+    
+    Args:
+        rows: Iterable of (row_number, data) pairs
+        batch_size: Number of valid rows written per transaction
+        progress: Optional callable receiving the ImportResult after each batch
+    
+    Returns:
+        ImportResult with the number created and a list of (row_number, message) errors
+    """
+    result = ImportResult()
+    batch = []
+    
+    for row_number, data in rows:
+        registration, vitals, error = build_registration(data)
+        if error:
+            result.add_error(row_number, error)
+            continue
+        batch.append((registration, vitals))
+        
+        if len(batch) >= batch_size:
+            result.created += len(bulk_create_registrations(batch))
+            batch = []
+            if progress:
+                progress(result)
+    
+    if batch:
+        result.created += len(bulk_create_registrations(batch))
+        if progress:
+            progress(result)
+    
+    if result.created:
+        invalidate_dashboard_stats()
+    return result
+
+
+def sync_registrations(items):
+    """
+    Create registrations queued on an offline device, idempotently by client UUID
+    
+    Items whose client_uuid was already synced are not created again; their
+    existing code is returned, so a device can safely resend a batch after a
+    dropped connection. All new items are written in one transaction.
+    
+    Args:
+        items: List of dicts holding a client_uuid plus registration/vitals fields
+    
+    Returns:
+        One dict per item, in order, with client_uuid, status ('created',
+        'existing' or 'invalid') and either id/unique_code or errors
+    """
+    results = [None] * len(items)
+    indexes = {}
+    for index, item in enumerate(items):
+        try:
+            client_uuid = uuid.UUID(str(item.get('client_uuid')))
+        except ValueError:
+            results[index] = {
+                'client_uuid': item.get('client_uuid'),
+                'status': 'invalid',
+                'errors': 'client_uuid: Enter a valid UUID.',
+            }
+            continue
+        indexes.setdefault(client_uuid, []).append(index)
+    
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                outcomes = _sync_batch(items, indexes)
+            break
+        except IntegrityError:
+            # Another request synced one of these UUIDs concurrently; the retry sees it
+            if attempt:
+                raise
+    
+    for client_uuid, outcome in outcomes.items():
+        for index in indexes[client_uuid]:
+            results[index] = dict(outcome, client_uuid=str(client_uuid))
+    
+    if any(outcome['status'] == 'created' for outcome in outcomes.values()):
+        invalidate_dashboard_stats()
+    return results
+
+
+def _sync_batch(items, indexes):
+    """Create the not-yet-synced items; returns client_uuid -> outcome"""
+    outcomes = {}
+    existing = Registration.objects.filter(client_uuid__in=list(indexes)).values_list('client_uuid', 'id', 'unique_code')
+    for client_uuid, pk, unique_code in existing:
+        outcomes[client_uuid] = {'status': 'existing', 'id': pk, 'unique_code': unique_code}
+    
+    pairs = []
+    for client_uuid, item_indexes in indexes.items():
+        if client_uuid in outcomes:
+            continue
+        data = {key: '' if value is None else value for key, value in items[item_indexes[0]].items()}
+        registration, vitals, error = build_registration(data)
+        if error:
+            outcomes[client_uuid] = {'status': 'invalid', 'errors': error}
+            continue
+        registration.client_uuid = client_uuid
+        pairs.append((registration, vitals))
+    
+    for registration in bulk_create_registrations(pairs):
+        outcomes[registration.client_uuid] = {
+            'status': 'created',
+            'id': registration.pk,
+            'unique_code': registration.unique_code,
+        }
+    return outcomes
@@ -1,8 +1,10 @@
 """
 Management command to backfill unique codes for existing registrations.
 """
+import time
+
 from django.core.management.base import BaseCommand
-from tagnid.models import Registration
+from tagnid.models import Registration, BACKFILL_BATCH_SIZE
 from tagnid.service import backfill_unique_codes
 
 
@@ -15,9 +17,20 @@ class Command(BaseCommand):
             action='store_true',
             help='Show what would be done without actually updating',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BACKFILL_BATCH_SIZE,
+            help=f'Number of registrations updated per batch (default: {BACKFILL_BATCH_SIZE})',
+        )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
+        batch_size = options['batch_size']
+        
+        if batch_size < 1:
+            self.stdout.write(self.style.ERROR('--batch-size must be at least 1.'))
+            return
         
         # Count registrations without unique codes
         missing_count = Registration.objects.filter(unique_code__isnull=True).count()
@@ -49,11 +62,23 @@ class Command(BaseCommand):
             return
         
         # Actually backfill
+        start = time.monotonic()
+        
+        def report_progress(done):
+            elapsed = time.monotonic() - start
+            rate = done / elapsed if elapsed else 0
+            self.stdout.write(
+                f"  {done}/{missing_count} registrations updated ({rate:.0f}/s)"
+            )
+        
         try:
-            updated_count = backfill_unique_codes()
+            updated_count = backfill_unique_codes(batch_size=batch_size, progress=report_progress)
+            elapsed = time.monotonic() - start
+            rate = updated_count / elapsed if elapsed else 0
             self.stdout.write(
                 self.style.SUCCESS(
-                    f'Successfully backfilled unique codes for {updated_count} registrations.'
+                    f'Successfully backfilled unique codes for {updated_count} registrations '
+                    f'in {elapsed:.1f}s ({rate:.0f}/s).'
                 )
             )
         except Exception as e:
@@ -0,0 +1,110 @@
+"""
+Management command to show query plans and timings for the registration access paths.
+
+Run it against a scratch database: --seed inserts synthetic rows, and
+--without-indexes drops the Registration indexes inside a transaction that is
+rolled back afterwards (on PostgreSQL this holds an exclusive table lock while
+the "before" measurements run).
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from tagnid.models import Registration
+from tagnid.seeding import seed_registrations
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Show EXPLAIN plans and timings for list/export/dashboard queries, optionally without indexes'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Insert this many synthetic registrations first (e.g. 500000)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Number of timed runs per query; the median is reported (default: 5)',
+        )
+        parser.add_argument(
+            '--without-indexes',
+            action='store_true',
+            help='Also measure every query with the Registration indexes dropped (rolled back afterwards)',
+        )
+        parser.add_argument(
+            '--no-plans',
+            action='store_true',
+            help='Only print timings, not EXPLAIN output',
+        )
+    
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.stdout.write(f"Seeding {options['seed']} registrations...")
+            start = time.monotonic()
+            seed_registrations(options['seed'])
+            self.stdout.write(f"  done in {time.monotonic() - start:.1f}s")
+        
+        total = Registration.objects.count()
+        self.stdout.write(f"Registrations in table: {total} ({connection.vendor})")
+        if not total:
+            self.stdout.write(self.style.WARNING('Nothing to measure; use --seed to add rows.'))
+            return
+        
+        queries = self.get_queries(total)
+        
+        if options['without_indexes']:
+            self.stdout.write(self.style.MIGRATE_HEADING('\nWithout indexes'))
+            try:
+                with transaction.atomic():
+                    with connection.cursor() as cursor:
+                        for index in Registration._meta.indexes:
+                            cursor.execute(f"DROP INDEX {connection.ops.quote_name(index.name)}")
+                    self.run_queries(queries, options)
+                    raise _Rollback
+            except _Rollback:
+                pass
+        
+        self.stdout.write(self.style.MIGRATE_HEADING('\nWith indexes'))
+        self.run_queries(queries, options)
+    
+    def get_queries(self, total):
+        """Name -> callable returning the queryset (or result) to measure"""
+        newest = Registration.objects.order_by('-created_at', '-id')
+        middle = newest.values_list('created_at', 'id')[total // 2]
+        
+        return {
+            'list first page': lambda: newest[:21],
+            'list by region': lambda: newest.filter(region='URR')[:21],
+            'list by region + auxiliary body': lambda: newest.filter(region='URR', auxiliary_body='Khuddam')[:21],
+            'list by auxiliary body': lambda: newest.filter(auxiliary_body='Ansar')[:21],
+            'keyset page at middle': lambda: newest.filter(created_at__lt=middle[0])[:21],
+            'offset page at middle': lambda: newest[total // 2:total // 2 + 21],
+            'export by region': lambda: newest.filter(region='CRR').values_list('unique_code', 'created_at'),
+            'export fingerprint (max updated_at)': lambda: Registration.objects.order_by().aggregate(Max('updated_at')),
+        }
+    
+    def run_queries(self, queries, options):
+        for name, build in queries.items():
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                result = build()
+                if hasattr(result, 'explain'):
+                    list(result)
+                timings.append((time.perf_counter() - start) * 1000)
+            
+            self.stdout.write(f"{name}: {statistics.median(timings):.2f} ms")
+            result = build()
+            if not options['no_plans'] and hasattr(result, 'explain'):
+                for line in result.explain().splitlines():
+                    self.stdout.write(f"    {line}")
@@ -0,0 +1,69 @@
+"""
+Management command to report registrations whose age does not fit their auxiliary body.
+"""
+import csv
+
+from django.core.management.base import BaseCommand
+from tagnid.exports import EXPORT_CHUNK_SIZE
+from tagnid.models import ELIGIBILITY_STATUSES
+from tagnid.service import eligibility_report, ineligible_registrations
+
+
+class Command(BaseCommand):
+    help = 'Check every registration\'s age against its auxiliary body\'s age range'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='Also print the registrations that are too young or too old',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=50,
+            help='Maximum number of registrations printed by --list (default: 50)',
+        )
+        parser.add_argument(
+            '--csv',
+            help='Write every ineligible registration to this CSV file',
+        )
+    
+    def handle(self, *args, **options):
+        report = eligibility_report()
+        
+        self.stdout.write(
+            f"{'Auxiliary Body':<16}" + ''.join(f"{label:>18}" for label in ELIGIBILITY_STATUSES.values())
+        )
+        ineligible = 0
+        for auxiliary_body, counts in report.items():
+            self.stdout.write(
+                f"{auxiliary_body:<16}" + ''.join(f"{counts[status]:>18}" for status in ELIGIBILITY_STATUSES)
+            )
+            ineligible += counts['too_young'] + counts['too_old']
+        
+        if ineligible:
+            self.stdout.write(self.style.WARNING(f'\n{ineligible} registration(s) outside their auxiliary body\'s age range.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('\nAll registrations with a date of birth are eligible.'))
+        
+        fields = ('unique_code', 'first_name', 'last_name', 'dob', 'current_age', 'auxiliary_body', 'region', 'eligibility')
+        
+        if options['list'] and ineligible:
+            for row in ineligible_registrations().values_list(*fields)[:options['limit']]:
+                code, first_name, last_name, dob, age, auxiliary_body, region, status = row
+                self.stdout.write(
+                    f"  {code or 'N/A'}  {first_name} {last_name}  age {age} ({dob})  "
+                    f"{auxiliary_body}, {region}: {ELIGIBILITY_STATUSES[status]}"
+                )
+            if ineligible > options['limit']:
+                self.stdout.write(f"  ... and {ineligible - options['limit']} more")
+        
+        if options['csv']:
+            with open(options['csv'], 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['Unique Code', 'First Name', 'Last Name', 'Date of Birth', 'Age', 'Auxiliary Body', 'Region', 'Problem'])
+                rows = ineligible_registrations().values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+                for *values, status in rows:
+                    writer.writerow(values + [ELIGIBILITY_STATUSES[status]])
+            self.stdout.write(self.style.SUCCESS(f"Ineligible registrations written to {options['csv']}"))
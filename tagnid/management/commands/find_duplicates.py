@@ -0,0 +1,55 @@
+"""
+Management command to find registrations that are probably the same person.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from tagnid.duplicates import DUPLICATE_THRESHOLD, find_duplicates, record_duplicates
+from tagnid.models import Registration
+
+
+class Command(BaseCommand):
+    help = 'Find likely duplicate registrations (phonetic name keys + date of birth) and queue them for staff review'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=DUPLICATE_THRESHOLD,
+            help=f'Minimum similarity score from 0 to 1 (default: {DUPLICATE_THRESHOLD})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Print the pairs found without saving them',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Maximum number of pairs printed (default: 20)',
+        )
+    
+    def handle(self, *args, **options):
+        def progress(number, stats):
+            self.stdout.write(
+                f"  pass {number}: {stats['blocks']} blocks, {stats['comparisons']} comparisons, {stats['pairs']} pairs"
+            )
+        
+        start = time.perf_counter()
+        pairs, stats = find_duplicates(threshold=options['threshold'], progress=progress)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"Found {len(pairs)} possible duplicate pair(s) in {elapsed:.1f}s")
+        
+        best = sorted(pairs.items(), key=lambda item: -item[1])[:options['limit']]
+        names = Registration.objects.in_bulk({pk for pair, score in best for pk in pair})
+        for (low, high), score in best:
+            self.stdout.write(f"  {score:.2f}  {names[low]}  <->  {names[high]}")
+        if len(pairs) > options['limit']:
+            self.stdout.write(f"  ... and {len(pairs) - options['limit']} more")
+        
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run: nothing saved.'))
+            return
+        created = record_duplicates(pairs)
+        self.stdout.write(self.style.SUCCESS(f'{created} pair(s) queued for review.'))
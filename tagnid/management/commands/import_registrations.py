@@ -0,0 +1,52 @@
+"""
+Management command to bulk-import registrations from a CSV or Excel file.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from tagnid.importer import IMPORT_BATCH_SIZE, import_registrations, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Import registrations (and optional vitals) from a .csv or .xlsx file'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Path to the .csv or .xlsx file',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help=f'Number of valid rows written per transaction (default: {IMPORT_BATCH_SIZE})',
+        )
+    
+    def handle(self, *args, **options):
+        path = options['path']
+        start = time.monotonic()
+        
+        def report_progress(result):
+            self.stdout.write(
+                f"  {result.created} imported, {result.failed} skipped so far"
+            )
+        
+        try:
+            with open(path, 'rb') as file:
+                result = import_registrations(
+                    read_rows(file, path),
+                    batch_size=options['batch_size'],
+                    progress=report_progress,
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        
+        for row_number, message in result.errors:
+            self.stdout.write(self.style.ERROR(f"  Row {row_number}: {message}"))
+        
+        elapsed = time.monotonic() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Imported {result.created} registration(s) in {elapsed:.1f}s; {result.failed} row(s) skipped.'
+            )
+        )
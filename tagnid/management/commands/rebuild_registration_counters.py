@@ -0,0 +1,43 @@
+"""
+Management command to rebuild or verify the denormalized registration counters.
+"""
+from django.core.management.base import BaseCommand
+from tagnid.models import RegistrationCounter
+from tagnid.service import invalidate_dashboard_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild (or verify) the per-region/auxiliary-body/year registration counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only compare the counters with the registrations table and report differences',
+        )
+
+    def handle(self, *args, **options):
+        mismatches = RegistrationCounter.objects.verify()
+        
+        if options['verify']:
+            if not mismatches:
+                self.stdout.write(
+                    self.style.SUCCESS('All registration counters match the registrations table.')
+                )
+                return
+            self.stdout.write(
+                self.style.WARNING(f'Found {len(mismatches)} counter(s) out of step:')
+            )
+            for (region, auxiliary_body, year), stored, expected in mismatches:
+                self.stdout.write(
+                    f"  - {region} / {auxiliary_body} / {year}: stored {stored}, actual {expected}"
+                )
+            return
+        
+        rows = RegistrationCounter.objects.rebuild()
+        invalidate_dashboard_stats()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Rebuilt {rows} registration counter(s); {len(mismatches)} had drifted.'
+            )
+        )
@@ -0,0 +1,26 @@
+"""
+Management command to rebuild the application-side registration search index.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from tagnid.search import rebuild_search_index, uses_trigram_indexes
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the search grams used for registrant search on databases without pg_trgm'
+
+    def handle(self, *args, **options):
+        if uses_trigram_indexes():
+            self.stdout.write(
+                self.style.SUCCESS('PostgreSQL pg_trgm indexes are maintained by the database; nothing to do.')
+            )
+            return
+        
+        start = time.monotonic()
+        count = rebuild_search_index()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Indexed {count} registrations in {time.monotonic() - start:.1f}s.'
+            )
+        )
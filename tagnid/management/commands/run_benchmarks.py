@@ -0,0 +1,137 @@
+"""
+Management command to run the benchmark suite and save a machine-readable report.
+
+Run it against a scratch database: --seed inserts synthetic registrations and
+vitals first. Use --output to keep the JSON report and --compare to check a
+new run against an earlier report.
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from tagnid.benchmarks import BenchmarkSuite, compare_reports
+from tagnid.seeding import seed_registrations
+
+
+class Command(BaseCommand):
+    help = 'Time the tagnid views, exports, code allocation and backfill, and write a JSON report'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Insert this many synthetic registrations (with vitals) first',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Timed runs per benchmark after one warm-up run (default: 5)',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=4,
+            help='Concurrent threads for the code allocation benchmark (default: 4)',
+        )
+        parser.add_argument(
+            '--allocations',
+            type=int,
+            default=200,
+            help='Total codes allocated in the code allocation benchmark (default: 200)',
+        )
+        parser.add_argument(
+            '--backfill-rows',
+            type=int,
+            default=10000,
+            help='Rows re-coded in the (rolled back) backfill benchmark (default: 10000)',
+        )
+        parser.add_argument(
+            '--only',
+            action='append',
+            help='Only run benchmarks whose name contains this text (repeatable)',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the JSON report to this file',
+        )
+        parser.add_argument(
+            '--compare',
+            help='Compare median timings with an earlier JSON report',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=20,
+            help='Percent slowdown reported as a regression by --compare (default: 20)',
+        )
+        parser.add_argument(
+            '--fail-on-regression',
+            action='store_true',
+            help='Exit with an error if --compare finds a regression',
+        )
+    
+    def handle(self, *args, **options):
+        previous = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    previous = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {options['compare']}: {e}")
+        
+        if options['seed']:
+            self.stdout.write(f"Seeding {options['seed']} registrations...")
+            start = time.monotonic()
+            seed_registrations(options['seed'])
+            self.stdout.write(f"  done in {time.monotonic() - start:.1f}s")
+        
+        suite = BenchmarkSuite(
+            repeat=options['repeat'],
+            threads=options['threads'],
+            allocations=options['allocations'],
+            backfill_rows=options['backfill_rows'],
+        )
+        
+        def report_progress(name, result):
+            extra = ''
+            if 'queries_saved' in result:
+                extra = f" ({result['queries']} queries/request, {result['queries_saved']} saved)"
+            elif 'queries' in result:
+                extra = f" ({result['queries']} queries)"
+            elif 'codes_per_second' in result:
+                extra = f" ({result['codes_per_second']} codes/s, {result['errors']} errors)"
+            elif 'rows_per_second' in result:
+                extra = f" ({result['rows_per_second']} rows/s)"
+            self.stdout.write(f"{name}: median {result.get('median_ms', '-')} ms{extra}")
+        
+        report = suite.run(only=options['only'], progress=report_progress)
+        environment = report['environment']
+        self.stdout.write(
+            f"{environment['registrations']} registrations, {environment['vitals']} vitals ({environment['database']})"
+        )
+        if not environment['registrations']:
+            self.stdout.write(self.style.WARNING('Nothing to measure; use --seed to add rows.'))
+        
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+        
+        if previous is not None:
+            regressions = self.compare(previous, report, options['tolerance'] / 100)
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'{len(regressions)} benchmark(s) regressed')
+    
+    def compare(self, previous, report, tolerance):
+        self.stdout.write(self.style.MIGRATE_HEADING('\nCompared with previous report'))
+        regressions = []
+        for name, before, after, change, regressed in compare_reports(previous, report, tolerance):
+            line = f"{name}: {before} -> {after} ms ({change:+.0%})"
+            if regressed:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        return regressions
@@ -0,0 +1,56 @@
+"""
+Management command that works through the background export job queue.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from tagnid.exports import claim_next_job, run_export_job
+from tagnid.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = 'Process pending export jobs (PDF exports requested from the registration list)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the jobs currently queued and exit instead of polling forever',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between polls when the queue is empty (default: 2)',
+        )
+
+    def handle(self, *args, **options):
+        once = options['once']
+        sleep = options['sleep']
+
+        if not once:
+            self.stdout.write('Waiting for export jobs. Press Ctrl+C to stop.')
+
+        try:
+            while True:
+                job = claim_next_job()
+                if job is None:
+                    if once:
+                        break
+                    time.sleep(sleep)
+                    continue
+
+                start = time.monotonic()
+                run_export_job(job)
+                elapsed = time.monotonic() - start
+
+                if job.status == ExportJob.STATUS_DONE:
+                    self.stdout.write(
+                        self.style.SUCCESS(f'Finished export job #{job.pk} in {elapsed:.1f}s.')
+                    )
+                else:
+                    self.stdout.write(
+                        self.style.ERROR(f'Export job #{job.pk} failed: {job.error}')
+                    )
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped.')
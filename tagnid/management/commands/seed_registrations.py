@@ -0,0 +1,104 @@
+"""
+Management command to generate synthetic registrations and vitals for scale testing.
+
+Rows are generated deterministically from --seed and --end and written with
+bulk_create in batches, with unique codes pre-assigned from CodeSequence.
+Use --database to fill a scratch SQLite or PostgreSQL database (any alias in
+settings.DATABASES) before running `run_benchmarks` or `benchmark_queries`.
+"""
+import time
+from datetime import datetime, time as dt_time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+from tagnid.seeding import SEED_BATCH_SIZE, VITALS_RATIO, seed_registrations
+
+
+class Command(BaseCommand):
+    help = 'Insert synthetic registrations (and vitals) in bulk, deterministically from a seed'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'count',
+            type=int,
+            help='Number of registrations to insert (e.g. 1000000)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed; the same seed and --end give the same data (default: 0)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SEED_BATCH_SIZE,
+            help=f'Registrations written per transaction (default: {SEED_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Spread registration dates over this many days (default: 365)',
+        )
+        parser.add_argument(
+            '--end',
+            help='Date of the newest registration, YYYY-MM-DD (default: now)',
+        )
+        parser.add_argument(
+            '--vitals-ratio',
+            type=float,
+            default=VITALS_RATIO,
+            help=f'Share of registrations that get vitals (default: {VITALS_RATIO})',
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Database alias to write to (default: "default")',
+        )
+    
+    def handle(self, *args, **options):
+        count = options['count']
+        if count < 1 or options['batch_size'] < 1:
+            raise CommandError('count and --batch-size must be at least 1.')
+        if not 0 <= options['vitals_ratio'] <= 1:
+            raise CommandError('--vitals-ratio must be between 0 and 1.')
+        if options['database'] not in connections:
+            raise CommandError(f"Unknown database alias: {options['database']}")
+        
+        end = None
+        if options['end']:
+            try:
+                end_date = datetime.strptime(options['end'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--end must be a date in YYYY-MM-DD format.')
+            end = timezone.make_aware(datetime.combine(end_date, dt_time(12)))
+        
+        vendor = connections[options['database']].vendor
+        self.stdout.write(f"Seeding {count} registrations into '{options['database']}' ({vendor})...")
+        start = time.monotonic()
+        
+        def report_progress(inserted):
+            elapsed = time.monotonic() - start
+            rate = inserted / elapsed if elapsed else 0
+            self.stdout.write(f"  {inserted}/{count} registrations ({rate:.0f} rows/s)")
+        
+        inserted = seed_registrations(
+            count,
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            days=options['days'],
+            end=end,
+            vitals_ratio=options['vitals_ratio'],
+            progress=report_progress,
+            using=options['database'],
+        )
+        
+        elapsed = time.monotonic() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Inserted {inserted} registrations in {elapsed:.1f}s '
+                f'(counters and search index rebuilt).'
+            )
+        )
@@ -0,0 +1,277 @@
+"""
+Per-request instrumentation for the tagnid views.
+
+When settings.REQUEST_METRICS_ENABLED is on, RequestMetricsMiddleware records
+for every request the number of SQL queries and the time spent in them (via
+connection.execute_wrapper), the time spent rendering templates, the number of
+database connections opened (via the connection_created signal), the total
+time and the response size. Each response gets a Server-Timing header, and
+samples are kept in memory per URL name so percentiles can be read from the
+staff-only metrics endpoint, next to the connection pool statistics (which
+include the time spent connecting and waiting for a pooled connection).
+
+Samples live in the memory of each worker process; every gunicorn worker
+keeps (and reports) its own.
+
+The middleware works under WSGI and ASGI. Under ASGI the ORM runs in the
+request's thread-sensitive worker thread, so the query timers are installed on
+(and removed from) that thread's connections through sync_to_async.
+
+AsyncWhiteNoiseMiddleware serves static files like WhiteNoise's middleware,
+but also natively under ASGI, so the middleware chain stays async end to end.
+"""
+import contextvars
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+# Samples kept per URL name; older ones are dropped
+REQUEST_METRICS_SAMPLES = 1000
+
+PERCENTILES = (50, 90, 99)
+
+_current = contextvars.ContextVar('tagnid_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Measurements for one request"""
+    
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.connect_count = 0
+        self.rendering = False
+
+
+class QueryTimer:
+    """execute_wrapper that counts and times every query into `metrics`"""
+    
+    def __init__(self, metrics):
+        self.metrics = metrics
+    
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.metrics.query_count += 1
+            self.metrics.db_time += time.perf_counter() - start
+
+
+def _install_query_timers(stack, timer):
+    """Wrap this thread's connections with `timer` until `stack` is closed"""
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(timer))
+
+
+def _count_connect(sender, connection, **kwargs):
+    """connection_created receiver: count new connections against the current request"""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.connect_count += 1
+
+
+def _instrument_templates():
+    """Time top-level template renders (includes queries evaluated while rendering)"""
+    from django.template.backends.django import Template
+    
+    if getattr(Template.render, 'timed', False):
+        return
+    original = Template.render
+    
+    @wraps(original)
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None or metrics.rendering:
+            return original(self, context, request)
+        metrics.rendering = True
+        start = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - start
+            metrics.rendering = False
+    
+    render.timed = True
+    Template.render = render
+
+
+def database_connection_stats():
+    """Connection settings per database alias, plus pool statistics when pooling"""
+    stats = {}
+    for connection in connections.all(initialized_only=True):
+        entry = {
+            'conn_max_age': connection.settings_dict.get('CONN_MAX_AGE'),
+            'health_checks': connection.settings_dict.get('CONN_HEALTH_CHECKS'),
+        }
+        pool = getattr(connection, 'pool', None)
+        if pool is not None:
+            entry['pool'] = pool.get_stats()
+        stats[connection.alias] = entry
+    return stats
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, -(-len(sorted_values) * percent // 100) - 1)
+    return sorted_values[index]
+
+
+class MetricsStore:
+    """Thread-safe, bounded in-memory samples per URL name"""
+    
+    def __init__(self, max_samples=REQUEST_METRICS_SAMPLES):
+        self._samples = defaultdict(lambda: deque(maxlen=max_samples))
+        self._lock = threading.Lock()
+    
+    def record(self, name, sample):
+        with self._lock:
+            self._samples[name].append(sample)
+    
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+    
+    def summary(self):
+        """URL name -> sample count plus percentiles of each measurement"""
+        with self._lock:
+            samples = {name: list(values) for name, values in self._samples.items()}
+        
+        summary = {}
+        for name, values in sorted(samples.items()):
+            entry = {'count': len(values)}
+            for field in ('total_ms', 'db_ms', 'template_ms', 'queries', 'connects', 'bytes'):
+                measured = sorted(value[field] for value in values if value[field] is not None)
+                if measured:
+                    entry[field] = {f'p{percent}': percentile(measured, percent) for percent in PERCENTILES}
+                    entry[field]['max'] = measured[-1]
+            summary[name] = entry
+        return summary
+
+
+metrics_store = MetricsStore()
+
+
+class RequestMetricsMiddleware:
+    """Record query count, DB/template/total time and response size per request"""
+    
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        _instrument_templates()
+        connection_created.connect(_count_connect, dispatch_uid='tagnid.middleware.count_connect')
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as timers:
+                _install_query_timers(timers, QueryTimer(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+    
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        # The ORM calls of this request run in its thread-sensitive worker
+        # thread, so the timers go on (and come off) that thread's connections
+        timers = ExitStack()
+        await sync_to_async(_install_query_timers)(timers, QueryTimer(metrics))
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(timers.close)()
+            _current.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+    
+    def finish(self, request, response, metrics, total):
+        """Add the Server-Timing header and record the sample"""
+        # Streaming responses run their remaining queries after this point
+        size = None if response.streaming else len(response.content)
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.query_count} queries"',
+            f'conn;desc="{metrics.connect_count} connects"',
+            f'tpl;dur={metrics.template_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+        
+        match = getattr(request, 'resolver_match', None)
+        metrics_store.record(match.view_name if match else '<unresolved>', {
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'template_ms': round(metrics.template_time * 1000, 2),
+            'queries': metrics.query_count,
+            'connects': metrics.connect_count,
+            'bytes': size,
+        })
+        return response
+
+
+async def _aread_chunks(filelike, block_size):
+    """Read `filelike` in a worker thread one block at a time"""
+    if filelike is None:
+        return
+    read = sync_to_async(filelike.read, thread_sensitive=False)
+    while chunk := await read(block_size):
+        yield chunk
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware that also runs natively under ASGI
+    
+    WhiteNoise's middleware is sync-only, so under ASGI Django would wrap every
+    middleware inside it and the (async) views with async_to_sync, holding a
+    thread for the whole request. Here static files are looked up the same way
+    and their content is read in worker threads; every other request goes
+    straight on to the async handler.
+    """
+    
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+    
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return await self.get_response(request)
+        
+        response = await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        # The open file is still closed with the response
+        response.streaming_content = _aread_chunks(response.file_to_stream, response.block_size)
+        return response
@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-17 02:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tagnid', '0004_alter_registration_auxiliary_body_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CodeSequence',
+            fields=[
+                ('year', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('last_number', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Code Sequence',
+                'verbose_name_plural': 'Code Sequences',
+            },
+        ),
+    ]
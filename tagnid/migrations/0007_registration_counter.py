@@ -0,0 +1,50 @@
+# Generated by Django 6.0 on 2026-10-17 02:45
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import ExtractYear
+
+
+def populate_counters(apps, schema_editor):
+    """Fill the counter table from the existing registrations"""
+    Registration = apps.get_model('tagnid', 'Registration')
+    RegistrationCounter = apps.get_model('tagnid', 'RegistrationCounter')
+    
+    rows = Registration.objects.order_by().values(
+        'region', 'auxiliary_body', year=ExtractYear('created_at')
+    ).annotate(total=Count('id'))
+    RegistrationCounter.objects.bulk_create([
+        RegistrationCounter(
+            region=row['region'],
+            auxiliary_body=row['auxiliary_body'],
+            year=row['year'],
+            count=row['total']
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tagnid', '0006_export_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistrationCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(choices=[('URR', 'URR'), ('LRR', 'LRR'), ('CRR', 'CRR'), ('NBR1', 'NBR1'), ('NBR2', 'NBR2'), ('BANJUL_KOMBO', 'BANJUL KOMBO'), ('FONI', 'FONI')], max_length=20)),
+                ('auxiliary_body', models.CharField(choices=[('Atfal', 'Atfal'), ('Khuddam', 'Khuddam'), ('Ansar', 'Ansar'), ('Guest', 'Guest')], max_length=20)),
+                ('year', models.PositiveIntegerField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Registration Counter',
+                'verbose_name_plural': 'Registration Counters',
+                'constraints': [models.UniqueConstraint(fields=('region', 'auxiliary_body', 'year'), name='unique_registration_counter')],
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
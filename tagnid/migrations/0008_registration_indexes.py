@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-17 02:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tagnid', '0007_registration_counter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['created_at', 'id'], name='registration_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['region', 'created_at'], name='registration_region_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['region', 'auxiliary_body', 'created_at'], name='registration_region_aux_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['auxiliary_body', 'created_at'], name='registration_aux_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['updated_at'], name='registration_updated_idx'),
+        ),
+    ]
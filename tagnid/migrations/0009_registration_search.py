@@ -0,0 +1,70 @@
+# Generated by Django 6.0 on 2026-10-17 02:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+TRIGRAM_COLUMNS = ['first_name', 'last_name', 'unique_code']
+
+
+def ngrams(text):
+    text = (text or '').lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def create_search_indexes(apps, schema_editor):
+    """pg_trgm GIN indexes on PostgreSQL, the search gram table everywhere else"""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for column in TRIGRAM_COLUMNS:
+            # Matches the UPPER(col::text) LIKE UPPER('%x%') that icontains generates
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS registration_{column}_trgm_idx '
+                f'ON tagnid_registration USING gin (UPPER("{column}"::text) gin_trgm_ops)'
+            )
+        return
+    
+    Registration = apps.get_model('tagnid', 'Registration')
+    RegistrationSearchGram = apps.get_model('tagnid', 'RegistrationSearchGram')
+    grams = []
+    for pk, first_name, last_name, unique_code in Registration.objects.values_list(
+        'id', 'first_name', 'last_name', 'unique_code'
+    ).iterator(chunk_size=2000):
+        grams.extend(
+            RegistrationSearchGram(registration_id=pk, gram=gram)
+            for gram in ngrams(first_name) | ngrams(last_name) | ngrams(unique_code)
+        )
+        if len(grams) >= 20000:
+            RegistrationSearchGram.objects.bulk_create(grams)
+            grams = []
+    RegistrationSearchGram.objects.bulk_create(grams)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for column in TRIGRAM_COLUMNS:
+            schema_editor.execute(f'DROP INDEX IF EXISTS registration_{column}_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tagnid', '0008_registration_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistrationSearchGram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=3)),
+                ('registration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_grams', to='tagnid.registration')),
+            ],
+            options={
+                'verbose_name': 'Registration Search Gram',
+                'verbose_name_plural': 'Registration Search Grams',
+                'indexes': [models.Index(fields=['gram', 'registration'], name='registration_search_gram_idx')],
+            },
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
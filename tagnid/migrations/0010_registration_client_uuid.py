@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tagnid', '0009_registration_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registration',
+            name='client_uuid',
+            field=models.UUIDField(blank=True, editable=False, help_text='Identifier assigned by an offline device; makes sync retries idempotent', null=True, unique=True),
+        ),
+    ]
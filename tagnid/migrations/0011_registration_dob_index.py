@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-17 03:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tagnid', '0010_registration_client_uuid'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['dob'], name='registration_dob_idx'),
+        ),
+    ]
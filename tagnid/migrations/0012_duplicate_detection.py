@@ -0,0 +1,85 @@
+# Generated by Django 6.0 on 2026-10-17 03:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Imported rather than copied: stored keys must match the ones computed at runtime
+from tagnid.phonetics import phonetic_key
+
+
+def populate_name_keys(apps, schema_editor):
+    Registration = apps.get_model('tagnid', 'Registration')
+    batch = []
+    for registration in Registration.objects.only('id', 'first_name', 'last_name').iterator(chunk_size=2000):
+        registration.first_name_key = phonetic_key(registration.first_name)
+        registration.last_name_key = phonetic_key(registration.last_name)
+        batch.append(registration)
+        if len(batch) >= 2000:
+            Registration.objects.bulk_update(batch, ['first_name_key', 'last_name_key'])
+            batch = []
+    Registration.objects.bulk_update(batch, ['first_name_key', 'last_name_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tagnid', '0011_registration_dob_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+    
+    operations = [
+        migrations.CreateModel(
+            name='DuplicateCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(help_text='Similarity from 0 to 1')),
+                ('status', models.CharField(choices=[('pending', 'Pending review'), ('dismissed', 'Not a duplicate')], db_index=True, default='pending', max_length=10)),
+                ('reviewed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Duplicate Candidate',
+                'verbose_name_plural': 'Duplicate Candidates',
+                'ordering': ['-score', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='first_name_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=8),
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='last_name_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=8),
+        ),
+        migrations.RunPython(populate_name_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['last_name_key', 'dob'], name='registration_last_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['first_name_key', 'dob'], name='registration_first_key_idx'),
+        ),
+        migrations.AddField(
+            model_name='duplicatecandidate',
+            name='duplicate',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tagnid.registration'),
+        ),
+        migrations.AddField(
+            model_name='duplicatecandidate',
+            name='registration',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_candidates', to='tagnid.registration'),
+        ),
+        migrations.AddField(
+            model_name='duplicatecandidate',
+            name='reviewed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='duplicatecandidate',
+            constraint=models.UniqueConstraint(fields=('registration', 'duplicate'), name='unique_duplicate_pair'),
+        ),
+    ]
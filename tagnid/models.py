@@ -1,49 +1,233 @@
-from django.db import models
+from django.db import models, connections, router, transaction, IntegrityError
+from django.db.models import Case, CharField, Count, F, IntegerField, Q, Value, When
+from django.db.models.functions import ExtractYear, Length
+from django.conf import settings
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
+from collections import defaultdict
 from datetime import date
+from .phonetics import phonetic_key
 
 
-class RegistrationManager(models.Manager):
+# Default number of rows written per bulk_update when backfilling codes
+BACKFILL_BATCH_SIZE = 1000
+
+# Number of times save() re-allocates a code after a unique_code collision
+CODE_ALLOCATION_RETRIES = 3
+
+# Values of the `eligibility` annotation added by RegistrationQuerySet.with_eligibility()
+ELIGIBILITY_STATUSES = {
+    'eligible': 'Eligible',
+    'too_young': 'Too young',
+    'too_old': 'Too old',
+    'missing_dob': 'No date of birth',
+}
+
+
+def calculate_age(dob, today=None):
+    """Calculate age in whole years from a date of birth (None if dob is unknown)"""
+    if not dob:
+        return None
+    today = today or date.today()
+    return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+
+
+def auxiliary_body_age_error(auxiliary_body, age):
+    """Return an error message if `age` is outside the eligible range of `auxiliary_body`, else None"""
+    min_age, max_age = Registration.AUXILIARY_BODY_AGE_RANGES.get(auxiliary_body, (None, None))
+    if age is None or ((min_age is None or age >= min_age) and (max_age is None or age <= max_age)):
+        return None
+    eligible = f"{min_age}-{max_age}" if max_age is not None else f"{min_age} and over"
+    return f"Age {age} is outside the {auxiliary_body} age range ({eligible})."
+
+
+def years_before(day, years):
+    """The date `years` years before `day` (Feb 29 becomes Feb 28 in non-leap years)"""
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        return day.replace(year=day.year - years, day=28)
+
+
+def format_unique_code(year, number):
+    """Format a year and sequence number as a unique code (e.g., 2025-0001)"""
+    return f"{year}-{number:04d}"
+
+
+def parse_unique_code_number(code):
+    """Return the sequence number part of a YEAR-NNNN code, or None if malformed"""
+    try:
+        return int(code.split('-')[1])
+    except (AttributeError, ValueError, IndexError):
+        return None
+
+
+class CodeSequenceManager(models.Manager):
+    """Custom manager for CodeSequence model"""
+    
+    def allocate(self, year, count=1):
+        """
+        Reserve `count` consecutive code numbers for `year` and return the first one.
+        
+        The counter row is incremented with a single UPDATE, which holds the row
+        lock (PostgreSQL) or the database write lock (SQLite) until the surrounding
+        transaction ends, so concurrent workers can never be handed the same number.
+        """
+        with transaction.atomic(using=self.db):
+            last_number = self._increment(year, count)
+            if last_number is None:
+                self._create_for_year(year)
+                last_number = self._increment(year, count)
+        return last_number - count + 1
+    
+    def _increment(self, year, count):
+        """Bump the counter for `year` and return the new value (None if no row yet)"""
+        connection = connections[self.db]
+        if connection.features.can_return_columns_from_insert:
+            # PostgreSQL and SQLite >= 3.35 support UPDATE ... RETURNING
+            quote = connection.ops.quote_name
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {quote(self.model._meta.db_table)} "
+                    f"SET {quote('last_number')} = {quote('last_number')} + %s "
+                    f"WHERE {quote('year')} = %s RETURNING {quote('last_number')}",
+                    [count, year],
+                )
+                row = cursor.fetchone()
+            return row[0] if row else None
+        
+        if not self.filter(year=year).update(last_number=F('last_number') + count):
+            return None
+        return self.filter(year=year).values_list('last_number', flat=True).get()
+    
+    def _create_for_year(self, year):
+        """Create the counter row for `year`, seeded from the highest existing code"""
+        last_code = Registration.objects.db_manager(self.db).filter(
+            unique_code__startswith=f"{year}-"
+        ).order_by(Length('unique_code').desc(), '-unique_code').values_list(
+            'unique_code', flat=True
+        ).first()
+        try:
+            with transaction.atomic(using=self.db):
+                self.create(year=year, last_number=parse_unique_code_number(last_code) or 0)
+        except IntegrityError:
+            # Another worker created the row first; its seed is just as good
+            pass
+
+
+class RegistrationQuerySet(models.QuerySet):
+    """Custom queryset for Registration model with database-side age helpers"""
+    
+    def with_age(self, today=None):
+        """
+        Annotate each registration with `current_age`, computed in SQL like calculate_age()
+        
+        Rows without a date of birth get NULL.
+        """
+        today = today or date.today()
+        birthday_pending = Q(dob__month__gt=today.month) | Q(dob__month=today.month, dob__day__gt=today.day)
+        return self.annotate(current_age=Case(
+            When(dob__isnull=True, then=Value(None)),
+            When(birthday_pending, then=Value(today.year - 1) - ExtractYear('dob')),
+            default=Value(today.year) - ExtractYear('dob'),
+            output_field=IntegerField(),
+        ))
+    
+    def with_eligibility(self, today=None):
+        """
+        Annotate `current_age` and `eligibility`, one of ELIGIBILITY_STATUSES
+        
+        The check is a single CASE over every auxiliary body's age range, so a
+        whole-table report is one GROUP BY query.
+        """
+        whens = [When(dob__isnull=True, then=Value('missing_dob'))]
+        for auxiliary_body, (min_age, max_age) in Registration.AUXILIARY_BODY_AGE_RANGES.items():
+            if min_age is not None:
+                whens.append(When(auxiliary_body=auxiliary_body, current_age__lt=min_age, then=Value('too_young')))
+            if max_age is not None:
+                whens.append(When(auxiliary_body=auxiliary_body, current_age__gt=max_age, then=Value('too_old')))
+        return self.with_age(today).annotate(
+            eligibility=Case(*whens, default=Value('eligible'), output_field=CharField())
+        )
+    
+    def filter_age(self, min_age=None, max_age=None, today=None):
+        """
+        Keep registrations aged between `min_age` and `max_age` (inclusive)
+        
+        The bounds are turned into a date of birth range, so the filter is an
+        indexed range on dob rather than a per-row age calculation. Registrations
+        without a date of birth never match.
+        """
+        today = today or date.today()
+        registrations = self
+        if min_age is not None:
+            registrations = registrations.filter(dob__lte=years_before(today, min_age))
+        if max_age is not None:
+            registrations = registrations.filter(dob__gt=years_before(today, max_age + 1))
+        return registrations
+
+
+class RegistrationManager(models.Manager.from_queryset(RegistrationQuerySet)):
     """Custom manager for Registration model"""
     
-    def backfill_unique_codes(self):
-        """Backfill unique codes for registrations that don't have one"""
-        from django.db import transaction
+    def backfill_unique_codes(self, batch_size=BACKFILL_BATCH_SIZE, progress=None, on_batch=None):
+        """
+        Backfill unique codes for registrations that don't have one
         
-        registrations = self.filter(unique_code__isnull=True).order_by('created_at', 'id')
-        count = 0
+        Rows are streamed oldest first and written back with bulk_update, one
+        transaction per batch. Each batch reserves its numbers from CodeSequence,
+        so codes stay sequential per year and never clash with new registrations.
         
-        # Group by year for proper sequential numbering
-        from collections import defaultdict
-        by_year = defaultdict(list)
+        Args:
+            batch_size: Number of rows fetched and updated per batch
+            progress: Optional callable receiving the running count after each batch
+            on_batch: Optional callable receiving the pks of each committed batch
         
-        for registration in registrations:
-            year = registration.created_at.year if registration.created_at else 2025
-            by_year[year].append(registration)
+        Returns:
+            Number of registrations updated
+        """
+        rows = self.filter(unique_code__isnull=True).order_by(
+            'created_at', 'id'
+        ).values_list('id', 'created_at').iterator(chunk_size=batch_size)
         
-        with transaction.atomic():
-            for year, year_registrations in sorted(by_year.items()):
-                # Get the highest number for this year
-                existing_codes = self.filter(
-                    unique_code__startswith=f"{year}-"
-                ).exclude(unique_code__isnull=True).values_list('unique_code', flat=True)
-                
-                max_num = 0
-                for code in existing_codes:
-                    try:
-                        num = int(code.split('-')[1])
-                        max_num = max(max_num, num)
-                    except (ValueError, IndexError):
-                        pass
-                
-                # Assign sequential numbers starting from max_num + 1
-                for i, registration in enumerate(year_registrations, start=1):
-                    next_num = max_num + i
-                    registration.unique_code = f"{year}-{next_num:04d}"
-                    registration.save(update_fields=['unique_code'])
-                    count += 1
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                count += self._backfill_batch(batch, on_batch)
+                batch = []
+                if progress:
+                    progress(count)
+        if batch:
+            count += self._backfill_batch(batch, on_batch)
+            if progress:
+                progress(count)
         
         return count
+    
+    def _backfill_batch(self, rows, on_batch=None):
+        """Assign codes to a batch of (id, created_at) rows and write them in bulk"""
+        # Group by year for proper sequential numbering
+        by_year = defaultdict(list)
+        for pk, created_at in rows:
+            year = created_at.year if created_at else 2025
+            by_year[year].append(pk)
+        
+        updates = []
+        with transaction.atomic(using=self.db):
+            for year, pks in sorted(by_year.items()):
+                first = CodeSequence.objects.db_manager(self.db).allocate(year, count=len(pks))
+                for i, pk in enumerate(pks):
+                    updates.append(self.model(pk=pk, unique_code=format_unique_code(year, first + i)))
+            self.bulk_update(updates, ['unique_code'], batch_size=len(updates))
+            # bulk_update skips auto_now; bump updated_at in one statement so the
+            # page ETags and export data versions see the new codes
+            pks = [update.pk for update in updates]
+            self.filter(pk__in=pks).update(updated_at=timezone.now())
+        if on_batch:
+            on_batch(pks)
+        return len(updates)
 
 
 class Registration(models.Model):
@@ -64,12 +248,30 @@ class Registration(models.Model):
         ('Guest', 'Guest'),
     ]
     
+    # Eligible ages (inclusive, None = unbounded) per auxiliary body; neighbouring
+    # ranges share their boundary year, in which members move up. Guests have none.
+    AUXILIARY_BODY_AGE_RANGES = {
+        'Atfal': (7, 15),
+        'Khuddam': (15, 40),
+        'Ansar': (40, None),
+    }
+    
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
     dob = models.DateField(null=True, blank=True, verbose_name='Date of Birth')
     region = models.CharField(max_length=20, choices=REGION_CHOICES)
     auxiliary_body = models.CharField(max_length=20, choices=AUXILIARY_BODY_CHOICES, verbose_name='Auxiliary Body')
     unique_code = models.CharField(max_length=20, unique=True, null=True, blank=True, verbose_name='Unique Registration Code')
+    # Phonetic keys of the names, used to block candidate pairs for duplicate detection
+    first_name_key = models.CharField(max_length=8, blank=True, default='', editable=False)
+    last_name_key = models.CharField(max_length=8, blank=True, default='', editable=False)
+    client_uuid = models.UUIDField(
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text='Identifier assigned by an offline device; makes sync retries idempotent'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -79,58 +281,198 @@ class Registration(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Registration'
         verbose_name_plural = 'Registrations'
+        indexes = [
+            # Newest-first listing, keyset pagination and exports without filters
+            models.Index(fields=['created_at', 'id'], name='registration_created_id_idx'),
+            # List/export filtered by region, newest first
+            models.Index(fields=['region', 'created_at'], name='registration_region_idx'),
+            # List/export filtered by region and auxiliary body, newest first
+            models.Index(fields=['region', 'auxiliary_body', 'created_at'], name='registration_region_aux_idx'),
+            # List/export filtered by auxiliary body only
+            models.Index(fields=['auxiliary_body', 'created_at'], name='registration_aux_created_idx'),
+            # MAX(updated_at) fingerprint used to reuse cached exports
+            models.Index(fields=['updated_at'], name='registration_updated_idx'),
+            # Age band filters become a range on dob
+            models.Index(fields=['dob'], name='registration_dob_idx'),
+            # Duplicate detection blocks on a phonetic name key plus birth year
+            models.Index(fields=['last_name_key', 'dob'], name='registration_last_key_idx'),
+            models.Index(fields=['first_name_key', 'dob'], name='registration_first_key_idx'),
+        ]
     
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
     
-    def generate_unique_code(self):
+    def generate_unique_code(self, using=None):
         """Generate a unique code in format: YEAR-NNNN (e.g., 2025-0001)"""
         if self.unique_code:
             return self.unique_code
         
         year = self.created_at.year if self.created_at else date.today().year
-        
-        # Find the highest number for this year
-        last_reg = Registration.objects.filter(
-            unique_code__startswith=f"{year}-"
-        ).exclude(pk=self.pk if self.pk else None).order_by('-unique_code').first()
-        
-        if last_reg and last_reg.unique_code:
-            try:
-                last_num = int(last_reg.unique_code.split('-')[1])
-                next_num = last_num + 1
-            except (ValueError, IndexError):
-                # If parsing fails, count existing registrations for this year
-                year_count = Registration.objects.filter(
-                    created_at__year=year
-                ).exclude(pk=self.pk if self.pk else None).count()
-                next_num = year_count + 1
-        else:
-            # No existing codes for this year, start from 1
-            next_num = 1
-        
-        # Ensure uniqueness by checking if code already exists
-        proposed_code = f"{year}-{next_num:04d}"
-        while Registration.objects.filter(unique_code=proposed_code).exclude(pk=self.pk if self.pk else None).exists():
-            next_num += 1
-            proposed_code = f"{year}-{next_num:04d}"
-        
-        self.unique_code = proposed_code
+        self.unique_code = format_unique_code(year, CodeSequence.objects.db_manager(using).allocate(year))
         return self.unique_code
     
+    def set_name_keys(self):
+        """Refresh the phonetic name keys (bulk_create callers must call this themselves)"""
+        self.first_name_key = phonetic_key(self.first_name)
+        self.last_name_key = phonetic_key(self.last_name)
+    
     def save(self, *args, **kwargs):
-        """Override save to auto-generate unique code if not set"""
-        if not self.unique_code:
-            self.generate_unique_code()
-        super().save(*args, **kwargs)
+        """Override save to keep the name keys current and auto-generate unique code if not set"""
+        self.set_name_keys()
+        if self.unique_code:
+            super().save(*args, **kwargs)
+            return
+        
+        # The database this row is written to; the sequence and the collision
+        # check must use the same one
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        for attempt in range(CODE_ALLOCATION_RETRIES):
+            self.generate_unique_code(using=using)
+            try:
+                with transaction.atomic(using=using):
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                # Safety net: a code assigned outside the sequence (e.g. by hand)
+                # can still collide, so allocate the next one and try again.
+                collided = Registration.objects.using(using).filter(
+                    unique_code=self.unique_code
+                ).exclude(pk=self.pk).exists()
+                self.unique_code = None
+                if not collided or attempt == CODE_ALLOCATION_RETRIES - 1:
+                    raise
     
     @property
     def age(self):
-        """Calculate age from date of birth"""
-        if self.dob:
-            today = date.today()
-            return today.year - self.dob.year - ((today.month, today.day) < (self.dob.month, self.dob.day))
-        return None
+        """Calculate age from date of birth (uses the with_age() annotation when present)"""
+        if 'current_age' in self.__dict__:
+            return self.current_age
+        return calculate_age(self.dob)
+    
+    @property
+    def region_label(self):
+        """Display label of the region (like get_region_display(), without rebuilding the choices dict)"""
+        return REGION_LABELS.get(self.region, self.region)
+    
+    @property
+    def auxiliary_body_label(self):
+        """Display label of the auxiliary body"""
+        return AUXILIARY_BODY_LABELS.get(self.auxiliary_body, self.auxiliary_body)
+
+
+# Value -> label maps built once per process, for exports, the dashboard and
+# templates (get_FOO_display() builds a new dict on every call)
+REGION_LABELS = dict(Registration.REGION_CHOICES)
+AUXILIARY_BODY_LABELS = dict(Registration.AUXILIARY_BODY_CHOICES)
+
+
+class CodeSequence(models.Model):
+    """Per-year counter used to hand out unique registration codes"""
+    year = models.PositiveIntegerField(primary_key=True)
+    last_number = models.PositiveIntegerField(default=0)
+    
+    objects = CodeSequenceManager()
+    
+    class Meta:
+        verbose_name = 'Code Sequence'
+        verbose_name_plural = 'Code Sequences'
+    
+    def __str__(self):
+        return f"{self.year}: {self.last_number}"
+
+
+class RegistrationCounterManager(models.Manager):
+    """Custom manager for RegistrationCounter model"""
+    
+    def adjust(self, region, auxiliary_body, year, delta):
+        """Add `delta` to the counter for (region, auxiliary_body, year), creating it if needed"""
+        key = {'region': region, 'auxiliary_body': auxiliary_body, 'year': year}
+        if self.filter(**key).update(count=F('count') + delta):
+            return
+        try:
+            with transaction.atomic(using=self.db):
+                self.create(count=max(delta, 0), **key)
+        except IntegrityError:
+            # Another worker created the row first; apply our delta to it
+            self.filter(**key).update(count=F('count') + delta)
+    
+    def expected_counts(self):
+        """Aggregate the true counts from the Registration table, keyed by (region, auxiliary_body, year)"""
+        rows = Registration.objects.db_manager(self.db).order_by().values(
+            'region', 'auxiliary_body', year=ExtractYear('created_at')
+        ).annotate(total=Count('id'))
+        return {(row['region'], row['auxiliary_body'], row['year']): row['total'] for row in rows}
+    
+    def rebuild(self):
+        """Recompute every counter from the Registration table; returns the number of rows written"""
+        expected = self.expected_counts()
+        with transaction.atomic(using=self.db):
+            self.all().delete()
+            self.bulk_create([
+                self.model(region=region, auxiliary_body=auxiliary_body, year=year, count=count)
+                for (region, auxiliary_body, year), count in expected.items()
+            ])
+        return len(expected)
+    
+    def verify(self):
+        """Return a list of (key, stored, expected) tuples for counters that disagree with the source table"""
+        expected = self.expected_counts()
+        stored = {
+            (row.region, row.auxiliary_body, row.year): row.count
+            for row in self.all()
+        }
+        mismatches = []
+        for key in sorted(set(expected) | set(stored), key=str):
+            if stored.get(key, 0) != expected.get(key, 0):
+                mismatches.append((key, stored.get(key, 0), expected.get(key, 0)))
+        return mismatches
+
+
+class RegistrationCounter(models.Model):
+    """Denormalized registration count per region, auxiliary body and year"""
+    region = models.CharField(max_length=20, choices=Registration.REGION_CHOICES)
+    auxiliary_body = models.CharField(max_length=20, choices=Registration.AUXILIARY_BODY_CHOICES)
+    year = models.PositiveIntegerField()
+    count = models.IntegerField(default=0)
+    
+    objects = RegistrationCounterManager()
+    
+    class Meta:
+        verbose_name = 'Registration Counter'
+        verbose_name_plural = 'Registration Counters'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['region', 'auxiliary_body', 'year'],
+                name='unique_registration_counter'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.region} / {self.auxiliary_body} / {self.year}: {self.count}"
+
+
+class RegistrationSearchGram(models.Model):
+    """
+    Application-side trigram index of registration names and codes.
+    
+    Only maintained on databases without pg_trgm (e.g. SQLite); see tagnid/search.py.
+    """
+    registration = models.ForeignKey(
+        Registration,
+        on_delete=models.CASCADE,
+        related_name='search_grams'
+    )
+    gram = models.CharField(max_length=3)
+    
+    class Meta:
+        verbose_name = 'Registration Search Gram'
+        verbose_name_plural = 'Registration Search Grams'
+        indexes = [
+            models.Index(fields=['gram', 'registration'], name='registration_search_gram_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.gram} -> {self.registration_id}"
 
 
 class Vitals(models.Model):
@@ -174,3 +516,106 @@ class Vitals(models.Model):
     
     def __str__(self):
         return f"Vitals for {self.registration.first_name} {self.registration.last_name}"
+
+
+class ExportJob(models.Model):
+    """A background export request processed by the run_export_jobs worker"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
+    FORMAT_PDF = 'pdf'
+    
+    FORMAT_CHOICES = [
+        (FORMAT_PDF, 'PDF'),
+    ]
+    
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default=FORMAT_PDF)
+    params = models.JSONField(default=dict, blank=True, help_text='Normalized filter parameters')
+    filter_key = models.CharField(max_length=64, db_index=True, help_text='Hash of format and params')
+    data_version = models.CharField(max_length=100, help_text='Registration data fingerprint at request time')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    file = models.FileField(upload_to='exports/', blank=True)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='export_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Export Job'
+        verbose_name_plural = 'Export Jobs'
+    
+    def __str__(self):
+        return f"{self.get_format_display()} export #{self.pk} ({self.status})"
+    
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+
+class DuplicateCandidate(models.Model):
+    """A pair of registrations that may be the same person, awaiting staff review"""
+    STATUS_PENDING = 'pending'
+    STATUS_DISMISSED = 'dismissed'
+    
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending review'),
+        (STATUS_DISMISSED, 'Not a duplicate'),
+    ]
+    
+    # registration_id is always the lower id of the pair
+    registration = models.ForeignKey(
+        Registration,
+        on_delete=models.CASCADE,
+        related_name='duplicate_candidates'
+    )
+    duplicate = models.ForeignKey(
+        Registration,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.FloatField(help_text='Similarity from 0 to 1')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    reviewed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    reviewed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-score', 'id']
+        verbose_name = 'Duplicate Candidate'
+        verbose_name_plural = 'Duplicate Candidates'
+        constraints = [
+            models.UniqueConstraint(fields=['registration', 'duplicate'], name='unique_duplicate_pair'),
+        ]
+    
+    def __str__(self):
+        return f"{self.registration} / {self.duplicate} ({self.score:.2f})"
+    
+    def dismiss(self, user):
+        """Record that the pair are different people; find_duplicates will not raise it again"""
+        self.status = self.STATUS_DISMISSED
+        self.reviewed_by = user
+        self.reviewed_at = timezone.now()
+        self.save(update_fields=['status', 'reviewed_by', 'reviewed_at'])
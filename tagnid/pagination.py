@@ -0,0 +1,90 @@
+"""
+Keyset (cursor) pagination for registration lists.
+
+Pages are addressed by an opaque cursor holding the (created_at, id) of the
+row at the page boundary, so fetching any page is a single indexed range scan
+with no COUNT(*) and no OFFSET, no matter how deep the coordinator pages.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class KeysetPage:
+    """One page of results plus the cursors needed to move to its neighbours"""
+    
+    def __init__(self, object_list, has_next, has_previous, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+    
+    def __iter__(self):
+        return iter(self.object_list)
+    
+    def __len__(self):
+        return len(self.object_list)
+    
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+class KeysetPaginator:
+    """Paginate a queryset newest first on (created_at, id)"""
+    
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+    
+    def page(self, cursor=None):
+        """Return the page addressed by `cursor` (the first page if missing or invalid)"""
+        position = decode_cursor(cursor)
+        
+        if position is None:
+            rows = list(self.queryset.order_by('-created_at', '-id')[:self.per_page + 1])
+            has_next, has_previous = len(rows) > self.per_page, False
+            rows = rows[:self.per_page]
+        else:
+            direction, created_at, pk = position
+            if direction == 'next':
+                rows = list(self.queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+                ).order_by('-created_at', '-id')[:self.per_page + 1])
+                has_next, has_previous = len(rows) > self.per_page, True
+                rows = rows[:self.per_page]
+            else:
+                rows = list(self.queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+                ).order_by('created_at', 'id')[:self.per_page + 1])
+                has_next, has_previous = True, len(rows) > self.per_page
+                rows = rows[:self.per_page][::-1]
+        
+        return KeysetPage(
+            rows,
+            has_next=has_next,
+            has_previous=has_previous,
+            next_cursor=encode_cursor('next', rows[-1]) if has_next and rows else None,
+            previous_cursor=encode_cursor('previous', rows[0]) if has_previous and rows else None,
+        )
+
+
+def encode_cursor(direction, obj):
+    """Build an opaque cursor pointing past `obj` in the given direction"""
+    raw = f"{direction}|{obj.created_at.isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (direction, created_at, id) for a cursor, or None if it is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        direction, created_at, pk = raw.split('|')
+        if direction not in ('next', 'previous'):
+            return None
+        return direction, datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
@@ -0,0 +1,109 @@
+"""
+Phonetic name keys and name similarity for duplicate detection.
+
+Plain Python with no Django imports, so the model, its migrations and the
+duplicate finder all share exactly the same rules.
+"""
+import re
+import unicodedata
+
+
+PHONETIC_KEY_LENGTH = 4
+
+# Spelling variants common in Gambian names (Ceesay/Sisay, Jallow/Jalloh,
+# Tijan/Tijjan), applied before the Soundex coding
+PHONETIC_RULES = [
+    (re.compile(r'ph'), 'f'),
+    (re.compile(r'c(?=[eiy])'), 's'),
+    (re.compile(r'ck'), 'k'),
+    (re.compile(r'[cq]'), 'k'),
+    (re.compile(r'x'), 'ks'),
+    (re.compile(r'z'), 's'),
+    (re.compile(r'([dgkst])h'), r'\1'),
+]
+
+SOUNDEX_CODES = {
+    letter: digit
+    for digit, letters in (('1', 'bfpv'), ('2', 'cgjkqsxz'), ('3', 'dt'), ('4', 'l'), ('5', 'mn'), ('6', 'r'))
+    for letter in letters
+}
+
+VOWELS = 'aeiouy'
+
+
+def normalize_name(name):
+    """Lowercase ASCII letters only (accents stripped, spaces and punctuation removed)"""
+    name = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z]', '', name.lower())
+
+
+def phonetic_key(name):
+    """
+    Soundex-style key of a name, e.g. "Ceesay" and "Sisay" both give "S200"
+    
+    Leading vowels all code as "A" so that Ousman/Usman share a key.
+    """
+    name = normalize_name(name)
+    if not name:
+        return ''
+    for pattern, replacement in PHONETIC_RULES:
+        name = pattern.sub(replacement, name)
+    
+    first = 'A' if name[0] in VOWELS else name[0].upper()
+    digits = []
+    previous = SOUNDEX_CODES.get(name[0], '')
+    for letter in name[1:]:
+        code = SOUNDEX_CODES.get(letter, '')
+        if code and code != previous:
+            digits.append(code)
+        if letter not in 'hw':
+            previous = code
+    return (first + ''.join(digits))[:PHONETIC_KEY_LENGTH].ljust(PHONETIC_KEY_LENGTH, '0')
+
+
+def jaro_winkler(a, b):
+    """Jaro-Winkler similarity of two strings, from 0.0 (nothing alike) to 1.0 (equal)"""
+    if a == b:
+        return 1.0 if a else 0.0
+    if not a or not b:
+        return 0.0
+    
+    window = max(max(len(a), len(b)) // 2 - 1, 0)
+    a_matched = [False] * len(a)
+    b_matched = [False] * len(b)
+    matches = 0
+    for i, letter in enumerate(a):
+        for j in range(max(0, i - window), min(i + window + 1, len(b))):
+            if not b_matched[j] and b[j] == letter:
+                a_matched[i] = b_matched[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+    
+    transpositions = 0
+    j = 0
+    for i, letter in enumerate(a):
+        if a_matched[i]:
+            while not b_matched[j]:
+                j += 1
+            if letter != b[j]:
+                transpositions += 1
+            j += 1
+    
+    jaro = (matches / len(a) + matches / len(b) + (matches - transpositions / 2) / matches) / 3
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+
+def name_similarity(a, b):
+    """Similarity of two names; names that sound alike score at least 0.9"""
+    a, b = normalize_name(a), normalize_name(b)
+    similarity = jaro_winkler(a, b)
+    if similarity < 0.9 and a and phonetic_key(a) == phonetic_key(b):
+        similarity = 0.9
+    return similarity
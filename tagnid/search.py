@@ -0,0 +1,129 @@
+"""
+Registrant search backend.
+
+The list and exports search first name, last name and unique code by substring.
+A plain `icontains` is a `LIKE '%x%'` scan of the whole table, so:
+
+- Codes typed as YEAR-NNNN (or a prefix of one) become a range lookup on the
+  unique_code btree index.
+- On PostgreSQL, pg_trgm GIN indexes on UPPER(first_name/last_name/unique_code)
+  (created by migration 0009) make the same `icontains` lookups index-assisted.
+- Elsewhere (SQLite), the RegistrationSearchGram table holds every trigram of each
+  registration's names and code; a search only verifies the rows whose grams cover
+  all of the query's grams.
+"""
+import re
+
+from django.db import connections, transaction
+from django.db.models import Count, Q
+
+from .models import Registration, RegistrationSearchGram
+
+
+NGRAM_SIZE = 3
+
+# Rows indexed per bulk_create when rebuilding the gram table
+INDEX_BATCH_SIZE = 2000
+
+# A full or partial unique code, e.g. "2025-" or "2025-004"
+CODE_PREFIX_RE = re.compile(r'^\d{4}-\d*$')
+
+
+def uses_trigram_indexes(using='default'):
+    """True when the database answers substring searches with pg_trgm indexes"""
+    return connections[using].vendor == 'postgresql'
+
+
+def ngrams(text):
+    """Set of lowercase trigrams in `text`"""
+    text = (text or '').lower()
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+def registration_ngrams(first_name, last_name, unique_code):
+    """Trigrams indexed for one registration"""
+    return ngrams(first_name) | ngrams(last_name) | ngrams(unique_code)
+
+
+def search_registrations(registrations, query):
+    """Filter `registrations` to those whose name or unique code contains `query`"""
+    query = query.strip()
+    if not query:
+        return registrations
+    
+    if CODE_PREFIX_RE.match(query):
+        # Index range scan instead of LIKE, e.g. "2025-00" -> ["2025-00", "2025-01")
+        upper = query[:-1] + chr(ord(query[-1]) + 1)
+        return registrations.filter(unique_code__gte=query, unique_code__lt=upper)
+    
+    matches = (
+        Q(first_name__icontains=query) |
+        Q(last_name__icontains=query) |
+        Q(unique_code__icontains=query)
+    )
+    grams = ngrams(query)
+    if uses_trigram_indexes(registrations.db) or not grams:
+        return registrations.filter(matches)
+    
+    # Candidates hold every gram of the query; the icontains check drops false positives
+    candidates = RegistrationSearchGram.objects.filter(gram__in=grams).values(
+        'registration_id'
+    ).annotate(matched=Count('gram', distinct=True)).filter(
+        matched=len(grams)
+    ).values('registration_id')
+    return registrations.filter(id__in=candidates).filter(matches)
+
+
+def index_registration(registration):
+    """Refresh the search grams of one registration (no-op with pg_trgm)"""
+    if uses_trigram_indexes():
+        return
+    RegistrationSearchGram.objects.filter(registration_id=registration.pk).delete()
+    RegistrationSearchGram.objects.bulk_create([
+        RegistrationSearchGram(registration_id=registration.pk, gram=gram)
+        for gram in registration_ngrams(registration.first_name, registration.last_name, registration.unique_code)
+    ])
+
+
+def rebuild_search_index(registrations=None, batch_size=INDEX_BATCH_SIZE, using='default'):
+    """
+    Rebuild the search grams for `registrations` (default: all) and return the row count
+    
+    Needed after bulk writes that bypass the post_save signal (bulk_create, update()).
+    Grams are written with executemany on plain tuples rather than model instances,
+    which keeps rebuilding millions of rows (e.g. after seeding) fast.
+    """
+    if registrations is not None:
+        using = registrations.db
+    if uses_trigram_indexes(using):
+        return 0
+    
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    insert = (
+        f"INSERT INTO {quote(RegistrationSearchGram._meta.db_table)} "
+        f"({quote('registration_id')}, {quote('gram')}) VALUES (%s, %s)"
+    )
+    
+    count = 0
+    with transaction.atomic(using=using):
+        if registrations is None:
+            registrations = Registration.objects.db_manager(using).all()
+            RegistrationSearchGram.objects.using(using).all().delete()
+        else:
+            RegistrationSearchGram.objects.using(using).filter(registration__in=registrations).delete()
+        
+        grams = []
+        rows = registrations.order_by().values_list(
+            'id', 'first_name', 'last_name', 'unique_code'
+        ).iterator(chunk_size=batch_size)
+        with connection.cursor() as cursor:
+            for pk, first_name, last_name, unique_code in rows:
+                grams.extend((pk, gram) for gram in registration_ngrams(first_name, last_name, unique_code))
+                count += 1
+                if len(grams) >= batch_size * 10:
+                    cursor.executemany(insert, grams)
+                    grams = []
+            if grams:
+                cursor.executemany(insert, grams)
+    return count
@@ -0,0 +1,235 @@
+"""
+Synthetic registration data for performance testing.
+
+Rows (and vitals for most of them) are generated deterministically from a
+seed and written with bulk_create, with unique codes reserved in blocks from
+CodeSequence, so large datasets can be built in seconds rather than through
+create_registration() one at a time.
+"""
+import random
+from datetime import timedelta
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import Registration, RegistrationCounter, Vitals, CodeSequence, format_unique_code
+from .phonetics import phonetic_key
+from .search import rebuild_search_index
+from .service import invalidate_dashboard_stats
+
+
+SEED_BATCH_SIZE = 5000
+
+# Rough share of members per region and auxiliary body
+REGION_WEIGHTS = {
+    'URR': 10,
+    'LRR': 12,
+    'CRR': 14,
+    'NBR1': 11,
+    'NBR2': 9,
+    'BANJUL_KOMBO': 34,
+    'FONI': 10,
+}
+
+AUXILIARY_BODY_WEIGHTS = {
+    'Atfal': 30,
+    'Khuddam': 40,
+    'Ansar': 25,
+    'Guest': 5,
+}
+
+# Age range (inclusive) used to draw a date of birth for each auxiliary body
+AUXILIARY_BODY_AGES = {
+    'Atfal': (7, 15),
+    'Khuddam': (15, 40),
+    'Ansar': (40, 85),
+    'Guest': (10, 70),
+}
+
+# Share of registrations that get a Vitals row
+VITALS_RATIO = 0.7
+
+BLOOD_GROUP_WEIGHTS = {
+    'O+': 45,
+    'A+': 22,
+    'B+': 20,
+    'AB+': 4,
+    'O-': 4,
+    'A-': 2,
+    'B-': 2,
+    'AB-': 1,
+}
+
+# Height range in cm (inclusive) per auxiliary body
+AUXILIARY_BODY_HEIGHTS = {
+    'Atfal': (115, 170),
+    'Khuddam': (155, 195),
+    'Ansar': (155, 190),
+    'Guest': (130, 190),
+}
+
+FIRST_NAMES = [
+    'Abdoulie', 'Ebrima', 'Lamin', 'Modou', 'Omar', 'Alieu', 'Musa', 'Ousman', 'Bakary', 'Sulayman',
+    'Momodou', 'Yusupha', 'Kebba', 'Malick', 'Saikou', 'Babucarr', 'Ismaila', 'Pa', 'Sheriff', 'Tijan',
+    'Ahmad', 'Mahmood', 'Nasir', 'Rashid', 'Tahir', 'Bilal', 'Hamza', 'Idris', 'Yahya', 'Zakariya',
+]
+
+LAST_NAMES = [
+    'Jallow', 'Ceesay', 'Bah', 'Njie', 'Sanneh', 'Touray', 'Jammeh', 'Darboe', 'Sowe', 'Camara',
+    'Drammeh', 'Jobe', 'Manneh', 'Sarr', 'Jarju', 'Fofana', 'Sonko', 'Faye', 'Gaye', 'Saidy',
+    'Badjie', 'Colley', 'Kinteh', 'Marong', 'Sillah', 'Kujabi', 'Bojang', 'Conteh', 'Trawally', 'Jatta',
+]
+
+
+def _bulk_create_with_timestamps(model, objs, using, batch_size):
+    """
+    bulk_create `objs` keeping the created_at/updated_at values we generated
+    
+    auto_now/auto_now_add overwrite them on insert, so they are written back
+    afterwards with one parameterized UPDATE per row (executemany, far cheaper
+    than bulk_update's CASE expressions), leaving the model fields untouched.
+    """
+    timestamps = [(obj.created_at, obj.updated_at) for obj in objs]
+    model.objects.using(using).bulk_create(objs, batch_size=batch_size)
+    
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    adapt = connection.ops.adapt_datetimefield_value
+    opts = model._meta
+    sql = 'UPDATE {} SET {} = %s, {} = %s WHERE {} = %s'.format(
+        quote(opts.db_table),
+        quote(opts.get_field('created_at').column),
+        quote(opts.get_field('updated_at').column),
+        quote(opts.pk.column),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            (adapt(created_at), adapt(updated_at), obj.pk)
+            for obj, (created_at, updated_at) in zip(objs, timestamps)
+        ])
+    for obj, (created_at, updated_at) in zip(objs, timestamps):
+        obj.created_at, obj.updated_at = created_at, updated_at
+
+
+def generate_registrations(count, seed=0, days=365, end=None):
+    """
+    Yield `count` unsaved Registration objects, oldest first, spread over the `days` days before `end`
+    
+    The same seed and `end` always produce the same rows (ages are relative to `end`).
+    """
+    rng = random.Random(seed)
+    end = end or timezone.now()
+    start = end - timedelta(days=days)
+    step = timedelta(days=days) / max(count, 1)
+    today = end.date()
+    
+    name_keys = {name: phonetic_key(name) for name in FIRST_NAMES + LAST_NAMES}
+    regions, region_weights = zip(*REGION_WEIGHTS.items())
+    auxiliary_bodies, auxiliary_body_weights = zip(*AUXILIARY_BODY_WEIGHTS.items())
+    
+    for i in range(count):
+        auxiliary_body = rng.choices(auxiliary_bodies, auxiliary_body_weights)[0]
+        min_age, max_age = AUXILIARY_BODY_AGES[auxiliary_body]
+        dob = None
+        if rng.random() < 0.9:
+            dob = today - timedelta(days=rng.randint(min_age * 365, max_age * 365 + 364))
+        created_at = start + step * i
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        yield Registration(
+            first_name=first_name,
+            last_name=last_name,
+            first_name_key=name_keys[first_name],
+            last_name_key=name_keys[last_name],
+            dob=dob,
+            region=rng.choices(regions, region_weights)[0],
+            auxiliary_body=auxiliary_body,
+            created_at=created_at,
+            updated_at=created_at,
+        )
+
+
+def generate_vitals(registrations, rng, ratio=VITALS_RATIO):
+    """Return unsaved Vitals for roughly `ratio` of the given (saved) registrations"""
+    blood_groups, blood_group_weights = zip(*BLOOD_GROUP_WEIGHTS.items())
+    vitals = []
+    for registration in registrations:
+        if rng.random() >= ratio:
+            continue
+        min_height, max_height = AUXILIARY_BODY_HEIGHTS[registration.auxiliary_body]
+        vitals.append(Vitals(
+            registration_id=registration.pk,
+            blood_group=rng.choices(blood_groups, blood_group_weights)[0] if rng.random() < 0.8 else None,
+            height=rng.randint(min_height * 10, max_height * 10) / 10,
+            created_at=registration.created_at,
+            updated_at=registration.created_at,
+        ))
+    return vitals
+
+
+def seed_registrations(count, seed=0, batch_size=SEED_BATCH_SIZE, days=365, end=None,
+                       vitals_ratio=VITALS_RATIO, progress=None, using='default'):
+    """
+    Insert `count` synthetic registrations in batches and return the number inserted
+    
+    Each batch reserves its unique codes per year from CodeSequence in one
+    statement and writes its vitals with a second bulk_create; the registration
+    counters and search grams are rebuilt once at the end. On an empty database
+    the same seed and `end` always produce the same rows and codes.
+    
+    Args:
+        count: Number of registrations to insert
+        seed: Random seed for names, regions, dates of birth and vitals
+        batch_size: Registrations written per transaction
+        days: Spread created_at over this many days before `end`
+        end: Latest created_at (default: now)
+        vitals_ratio: Share of registrations that get vitals
+        progress: Optional callable receiving the running count after each batch
+        using: Database alias to write to
+    
+    Returns:
+        Number of registrations inserted
+    """
+    inserted = 0
+    batch = []
+    vitals_rng = random.Random(f'{seed}-vitals')
+    
+    def flush():
+        by_year = {}
+        for registration in batch:
+            by_year.setdefault(registration.created_at.year, []).append(registration)
+        with transaction.atomic(using=using):
+            for year, registrations in sorted(by_year.items()):
+                first = CodeSequence.objects.db_manager(using).allocate(year, count=len(registrations))
+                for i, registration in enumerate(registrations):
+                    registration.unique_code = format_unique_code(year, first + i)
+            _bulk_create_with_timestamps(Registration, batch, using, batch_size)
+            if any(registration.pk is None for registration in batch):
+                # Backends that cannot return ids from bulk inserts: look them up by code
+                ids = dict(Registration.objects.using(using).filter(
+                    unique_code__in=[registration.unique_code for registration in batch]
+                ).values_list('unique_code', 'id'))
+                for registration in batch:
+                    registration.pk = ids[registration.unique_code]
+            _bulk_create_with_timestamps(
+                Vitals, generate_vitals(batch, vitals_rng, ratio=vitals_ratio), using, batch_size
+            )
+    
+    for registration in generate_registrations(count, seed=seed, days=days, end=end):
+        batch.append(registration)
+        if len(batch) >= batch_size:
+            flush()
+            inserted += len(batch)
+            batch = []
+            if progress:
+                progress(inserted)
+    if batch:
+        flush()
+        inserted += len(batch)
+        if progress:
+            progress(inserted)
+    
+    RegistrationCounter.objects.db_manager(using).rebuild()
+    rebuild_search_index(using=using)
+    invalidate_dashboard_stats()
+    return inserted
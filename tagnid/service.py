@@ -1,8 +1,316 @@
-from .models import Registration, Vitals
+from .models import Registration, RegistrationCounter, Vitals, CodeSequence, BACKFILL_BATCH_SIZE, ELIGIBILITY_STATUSES, REGION_LABELS, AUXILIARY_BODY_LABELS, format_unique_code
+from .search import rebuild_search_index, search_registrations
+from .duplicates import find_possible_duplicates
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from collections import defaultdict
+from datetime import date
 
 
-def create_registration(first_name, last_name, region, auxiliary_body, dob=None):
+# Query parameters understood by filter_registrations()
+FILTER_PARAMS = ('search', 'region', 'auxiliary_body', 'min_age', 'max_age')
+
+# Dashboard statistics are cached until a registration changes (see signals.py);
+# the timeout only bounds staleness if a bulk write bypasses the signals.
+DASHBOARD_STATS_CACHE_KEY = 'tagnid:dashboard_stats'
+DASHBOARD_STATS_TIMEOUT = 300
+
+# Fields returned for each registration by lookup_registrations_by_code()
+LOOKUP_FIELDS = (
+    'id', 'unique_code', 'first_name', 'last_name', 'dob', 'region', 'auxiliary_body',
+    'vitals__blood_group', 'vitals__height', 'updated_at', 'vitals__updated_at',
+)
+
+
+def parse_age(value):
+    """Return an age filter value as a non-negative int, or None if missing or invalid"""
+    try:
+        age = int(value)
+    except (TypeError, ValueError):
+        return None
+    return age if age >= 0 else None
+
+
+def filter_registrations(params):
+    """
+    Service function to filter registrations by search term, region, auxiliary body and age band
+    
+    Args:
+        params: Mapping (e.g. request.GET) holding any of FILTER_PARAMS
+    
+    Returns:
+        QuerySet of matching registrations, newest first
+    """
+    registrations = Registration.objects.select_related('vitals').all()
+    
+    # Search functionality
+    search_query = params.get('search', '')
+    if search_query:
+        registrations = search_registrations(registrations, search_query)
+    
+    # Filter by region
+    region_filter = params.get('region', '')
+    if region_filter:
+        registrations = registrations.filter(region=region_filter)
+    
+    # Filter by auxiliary body
+    auxiliary_body_filter = params.get('auxiliary_body', '')
+    if auxiliary_body_filter:
+        registrations = registrations.filter(auxiliary_body=auxiliary_body_filter)
+    
+    # Filter by age band (a dob range, computed in the database)
+    min_age = parse_age(params.get('min_age'))
+    max_age = parse_age(params.get('max_age'))
+    if min_age is not None or max_age is not None:
+        registrations = registrations.filter_age(min_age, max_age)
+    
+    return registrations.order_by('-created_at')
+
+
+def lookup_registrations_by_code(codes):
+    """
+    Service function to resolve many unique codes in a single query
+    
+    Args:
+        codes: Iterable of unique codes
+    
+    Returns:
+        Dict mapping each code that exists to a dict of LOOKUP_FIELDS values
+    """
+    rows = Registration.objects.filter(unique_code__in=set(codes)).order_by().values(*LOOKUP_FIELDS)
+    return {row['unique_code']: row for row in rows}
+
+
+def get_dashboard_stats():
+    """
+    Service function to get the dashboard statistics, served from the cache when possible
+    
+    Returns:
+        Dict with total_registrations, region_stats and auxiliary_body_stats
+    """
+    stats = cache.get(DASHBOARD_STATS_CACHE_KEY)
+    if stats is None:
+        stats = _compute_dashboard_stats()
+        cache.set(DASHBOARD_STATS_CACHE_KEY, stats, DASHBOARD_STATS_TIMEOUT)
+    return stats
+
+
+def invalidate_dashboard_stats():
+    """Service function to drop the cached dashboard statistics"""
+    cache.delete(DASHBOARD_STATS_CACHE_KEY)
+
+
+def _compute_dashboard_stats():
+    """Aggregate the dashboard statistics from the RegistrationCounter table"""
+    # Statistics by region
+    region_stats = RegistrationCounter.objects.values('region').annotate(
+        count=Sum('count')
+    ).filter(count__gt=0).order_by('-count')
+    
+    # Statistics by auxiliary body
+    auxiliary_body_stats = RegistrationCounter.objects.values('auxiliary_body').annotate(
+        count=Sum('count')
+    ).filter(count__gt=0).order_by('-count')
+    
+    # Get display names for regions and auxiliary body
+    region_data = [
+        {'name': REGION_LABELS.get(stat['region'], stat['region']), 'count': stat['count']}
+        for stat in region_stats
+    ]
+    auxiliary_body_data = [
+        {'name': AUXILIARY_BODY_LABELS.get(stat['auxiliary_body'], stat['auxiliary_body']), 'count': stat['count']}
+        for stat in auxiliary_body_stats
+    ]
+    
+    return {
+        'total_registrations': sum(stat['count'] for stat in region_data),
+        'region_stats': region_data,
+        'auxiliary_body_stats': auxiliary_body_data,
+    }
+
+
+def count_registrations(params):
+    """
+    Service function to count the registrations matching the given filters
+    
+    Region and auxiliary body filters are answered from RegistrationCounter;
+    only a search term or age band requires counting the Registration table itself.
+    
+    Args:
+        params: Mapping (e.g. request.GET) holding any of FILTER_PARAMS
+    
+    Returns:
+        Number of matching registrations
+    """
+    if params.get('search') or parse_age(params.get('min_age')) is not None or parse_age(params.get('max_age')) is not None:
+        return filter_registrations(params).count()
+    
+    counters = RegistrationCounter.objects.all()
+    if params.get('region'):
+        counters = counters.filter(region=params.get('region'))
+    if params.get('auxiliary_body'):
+        counters = counters.filter(auxiliary_body=params.get('auxiliary_body'))
+    return counters.aggregate(total=Sum('count'))['total'] or 0
+
+
+def eligibility_report(today=None):
+    """
+    Service function to count registrations by auxiliary body and age eligibility
+    
+    The whole table is checked in one GROUP BY query over the eligibility CASE.
+    
+    Returns:
+        Dict mapping each auxiliary body to a dict of ELIGIBILITY_STATUSES counts
+    """
+    report = {
+        auxiliary_body: dict.fromkeys(ELIGIBILITY_STATUSES, 0)
+        for auxiliary_body, _ in Registration.AUXILIARY_BODY_CHOICES
+    }
+    rows = Registration.objects.with_eligibility(today).order_by().values(
+        'auxiliary_body', 'eligibility'
+    ).annotate(total=Count('id'))
+    for row in rows:
+        report.setdefault(row['auxiliary_body'], dict.fromkeys(ELIGIBILITY_STATUSES, 0))
+        report[row['auxiliary_body']][row['eligibility']] = row['total']
+    return report
+
+
+def ineligible_registrations(today=None):
+    """
+    Service function to get registrations whose age is outside their auxiliary body's range
+    
+    Returns:
+        QuerySet annotated with current_age and eligibility, oldest first
+    """
+    return Registration.objects.with_eligibility(today).filter(
+        eligibility__in=['too_young', 'too_old']
+    ).order_by('created_at', 'id')
+
+
+def _counter_key(region, auxiliary_body, created_at):
+    """RegistrationCounter key for a registration's region, auxiliary body and creation year"""
+    year = created_at.year if created_at else date.today().year
+    return (region, auxiliary_body, year)
+
+
+def save_registration(registration):
+    """
+    Service function to save a new or changed registration
+    
+    The matching RegistrationCounter rows are adjusted in the same transaction.
+    
+    Args:
+        registration: Registration instance (saved or unsaved)
+    
+    Returns:
+        Saved Registration object
+    """
+    with transaction.atomic():
+        old_key = None
+        if registration.pk:
+            old = Registration.objects.select_for_update().filter(pk=registration.pk).values(
+                'region', 'auxiliary_body', 'created_at'
+            ).first()
+            if old:
+                old_key = _counter_key(old['region'], old['auxiliary_body'], old['created_at'])
+        
+        registration.save()
+        
+        new_key = _counter_key(registration.region, registration.auxiliary_body, registration.created_at)
+        if old_key != new_key:
+            if old_key:
+                RegistrationCounter.objects.adjust(*old_key, delta=-1)
+            RegistrationCounter.objects.adjust(*new_key, delta=1)
+    return registration
+
+
+def delete_registrations(registrations):
+    """
+    Service function to delete a queryset of registrations
+    
+    Args:
+        registrations: QuerySet of registrations to delete
+    
+    Returns:
+        Number of registrations deleted
+    """
+    with transaction.atomic():
+        rows = list(registrations.values_list('region', 'auxiliary_body', 'created_at'))
+        registrations.delete()
+        
+        deltas = {}
+        for region, auxiliary_body, created_at in rows:
+            key = _counter_key(region, auxiliary_body, created_at)
+            deltas[key] = deltas.get(key, 0) - 1
+        for key, delta in deltas.items():
+            RegistrationCounter.objects.adjust(*key, delta=delta)
+    return len(rows)
+
+
+def bulk_create_registrations(pairs):
+    """
+    Service function to insert many new registrations (and their vitals) at once
+    
+    One block of unique codes is reserved from CodeSequence, the registrations and
+    vitals are each written with one bulk_create, and the counters and search grams
+    are updated for the batch. The caller invalidates the dashboard cache.
+    
+    Args:
+        pairs: List of (unsaved Registration, unsaved Vitals or None)
+    
+    Returns:
+        The saved Registration objects, in the order given
+    """
+    # created_at is set to now by bulk_create, so codes and counters use this year
+    year = timezone.now().year
+    registrations = [registration for registration, _ in pairs]
+    if not registrations:
+        return registrations
+    
+    with transaction.atomic():
+        first = CodeSequence.objects.allocate(year, count=len(registrations))
+        for i, registration in enumerate(registrations):
+            registration.unique_code = format_unique_code(year, first + i)
+            registration.set_name_keys()
+        Registration.objects.bulk_create(registrations)
+        
+        if any(registration.pk is None for registration in registrations):
+            # Backends that cannot return ids from bulk inserts: look them up by code
+            ids = dict(Registration.objects.filter(
+                unique_code__in=[registration.unique_code for registration in registrations]
+            ).values_list('unique_code', 'id'))
+            for registration in registrations:
+                registration.pk = ids[registration.unique_code]
+        
+        vitals = []
+        for registration, registration_vitals in pairs:
+            if registration_vitals is not None:
+                registration_vitals.registration = registration
+                vitals.append(registration_vitals)
+        Vitals.objects.bulk_create(vitals)
+        
+        deltas = defaultdict(int)
+        for registration in registrations:
+            deltas[(registration.region, registration.auxiliary_body, year)] += 1
+        for key, delta in deltas.items():
+            RegistrationCounter.objects.adjust(*key, delta=delta)
+        
+        rebuild_search_index(Registration.objects.filter(pk__in=[registration.pk for registration in registrations]))
+    
+    return registrations
+
+
+class PossibleDuplicateError(ValueError):
+    """Raised by create_registration(check_duplicates=True) when the person looks already registered"""
+    
+    def __init__(self, candidates):
+        self.candidates = candidates
+        super().__init__(f"{len(candidates)} existing registration(s) look like the same person")
+
+
+def create_registration(first_name, last_name, region, auxiliary_body, dob=None, check_duplicates=False):
     """
     Service function to create a new registration
     
@@ -12,18 +320,27 @@ def create_registration(first_name, last_name, region, auxiliary_body, dob=None)
         region: Region choice (URR, LRR, CRR, etc.)
         auxiliary_body: Auxiliary Body choice (Atfal, Khuddam, Ansar, Guest)
         dob: Date of birth (optional)
+        check_duplicates: Refuse to create the registration if it looks like an existing one
     
     Returns:
         Registration object
+    
+    Raises:
+        PossibleDuplicateError: If check_duplicates is set and likely duplicates exist
     """
-    registration = Registration.objects.create(
+    if check_duplicates:
+        candidates = find_possible_duplicates(first_name, last_name, dob=dob, region=region)
+        if candidates:
+            raise PossibleDuplicateError(candidates)
+    
+    registration = Registration(
         first_name=first_name,
         last_name=last_name,
         region=region,
         auxiliary_body=auxiliary_body,
         dob=dob
     )
-    return registration
+    return save_registration(registration)
 
 
 def update_registration(registration_id, **kwargs):
@@ -45,8 +362,7 @@ def update_registration(registration_id, **kwargs):
         for key, value in kwargs.items():
             if hasattr(registration, key):
                 setattr(registration, key, value)
-        registration.save()
-        return registration
+        return save_registration(registration)
     except Registration.DoesNotExist:
         raise Registration.DoesNotExist(f"Registration with id {registration_id} does not exist")
 
@@ -64,12 +380,10 @@ def delete_registration(registration_id):
     Raises:
         Registration.DoesNotExist: If registration not found
     """
-    try:
-        registration = Registration.objects.get(id=registration_id)
-        registration.delete()
+    registrations = Registration.objects.filter(id=registration_id)
+    if delete_registrations(registrations):
         return True
-    except Registration.DoesNotExist:
-        raise Registration.DoesNotExist(f"Registration with id {registration_id} does not exist")
+    raise Registration.DoesNotExist(f"Registration with id {registration_id} does not exist")
 
 
 def create_vitals(registration_id, blood_group=None, height=None):
@@ -151,13 +465,21 @@ def delete_vitals(registration_id):
         raise Vitals.DoesNotExist(f"Vitals for registration {registration_id} does not exist")
 
 
-def backfill_unique_codes():
+def backfill_unique_codes(batch_size=BACKFILL_BATCH_SIZE, progress=None):
     """
     Service function to backfill unique codes for all registrations that don't have one
     
+    Args:
+        batch_size: Number of registrations updated per batch (each batch is its own transaction)
+        progress: Optional callable receiving the running count after each batch
+    
     Returns:
         Number of registrations updated
     """
-    with transaction.atomic():
-        return Registration.objects.backfill_unique_codes()
-
+    # bulk_update bypasses post_save, so refresh the search grams of each batch
+    # as it lands rather than rebuilding the whole table afterwards
+    return Registration.objects.backfill_unique_codes(
+        batch_size=batch_size,
+        progress=progress,
+        on_batch=lambda pks: rebuild_search_index(Registration.objects.filter(pk__in=pks)),
+    )
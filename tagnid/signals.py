@@ -0,0 +1,36 @@
+"""
+Signal handlers keeping cached statistics, search grams and cached users in step with the database.
+"""
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .authentication import invalidate_cached_user
+from .models import Registration
+from .search import index_registration
+from .service import invalidate_dashboard_stats
+
+
+@receiver(post_save, sender=Registration)
+@receiver(post_delete, sender=Registration)
+def registration_changed(sender, instance, **kwargs):
+    """Drop the cached dashboard statistics once the change is committed"""
+    transaction.on_commit(invalidate_dashboard_stats)
+
+
+@receiver(post_save, sender=Registration)
+def index_registration_for_search(sender, instance, raw=False, **kwargs):
+    """Keep the application-side search grams in step with names and codes"""
+    if not raw:
+        index_registration(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """Drop the cached user now, and again once committed in case a request re-cached the old row"""
+    invalidate_cached_user(instance.pk)
+    transaction.on_commit(partial(invalidate_cached_user, instance.pk))
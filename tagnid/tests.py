@@ -1,7 +1,8 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth.models import User, Group, Permission
 from django.urls import reverse
-from .models import Registration, Vitals
+from .models import Registration, Vitals, CodeSequence, ExportJob, RegistrationCounter, years_before
+from .service import create_registration, update_registration, delete_registration
 from datetime import date
 
 
@@ -62,7 +63,7 @@ class RegistrationCRUDTests(TestCase):
             'last_name': 'Smith',
             'region': 'LRR',
             'auxiliary_body': 'Atfal',
-            'dob': '2000-01-01'
+            'dob': years_before(date.today(), 10).isoformat()
         })
         
         self.assertEqual(response.status_code, 302)  # Redirect after success
@@ -204,7 +205,7 @@ class RegistrationCRUDTests(TestCase):
 
 class VitalsCRUDTests(TestCase):
     """Test CRUD operations for Vitals model"""
-
+    
     def setUp(self):
         """Set up test data"""
         self.client = Client()
@@ -436,3 +437,1485 @@ class ModelTests(TestCase):
             height=175.5
         )
         self.assertEqual(str(vitals), 'Vitals for John Doe')
+
+
+class UniqueCodeTests(TestCase):
+    """Test unique code allocation"""
+    
+    def _create(self, **kwargs):
+        data = {'first_name': 'John', 'last_name': 'Doe', 'region': 'URR', 'auxiliary_body': 'Khuddam'}
+        data.update(kwargs)
+        return Registration.objects.create(**data)
+    
+    def test_codes_are_sequential(self):
+        """Test that new registrations get consecutive codes for the year"""
+        year = date.today().year
+        first = self._create()
+        second = self._create()
+        self.assertEqual(first.unique_code, f'{year}-0001')
+        self.assertEqual(second.unique_code, f'{year}-0002')
+        self.assertEqual(CodeSequence.objects.get(year=year).last_number, 2)
+    
+    def test_sequence_seeded_from_existing_codes(self):
+        """Test that a new year's counter starts after the highest existing code"""
+        year = date.today().year
+        self._create(unique_code=f'{year}-0041')
+        self._create(unique_code=f'{year}-0100')
+        registration = self._create()
+        self.assertEqual(registration.unique_code, f'{year}-0101')
+    
+    def test_allocate_block(self):
+        """Test that allocating a block reserves consecutive numbers"""
+        self.assertEqual(CodeSequence.objects.allocate(2030, count=5), 1)
+        self.assertEqual(CodeSequence.objects.allocate(2030), 6)
+    
+    def test_retry_on_collision(self):
+        """Test that save() skips past a code that was assigned by hand"""
+        year = date.today().year
+        self._create()
+        self._create(unique_code=f'{year}-0002')
+        registration = self._create()
+        self.assertEqual(registration.unique_code, f'{year}-0003')
+    
+    def test_code_allocated_on_the_saving_database(self):
+        """Test that save(using=...) allocates and checks codes on that database"""
+        from unittest import mock
+        
+        registration = Registration(first_name='Ida', last_name='Sarr', region='URR', auxiliary_body='Atfal')
+        with mock.patch.object(CodeSequence.objects, 'db_manager', wraps=CodeSequence.objects.db_manager) as db_manager:
+            registration.save(using='default')
+        db_manager.assert_called_with('default')
+        self.assertIsNotNone(registration.unique_code)
+    
+    def test_backfill_in_batches(self):
+        """Test that backfill assigns sequential codes across several batches"""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        year = date.today().year
+        registrations = [self._create() for _ in range(5)]
+        Registration.objects.update(unique_code=None)
+        CodeSequence.objects.all().delete()
+        
+        out = StringIO()
+        call_command('backfill_unique_codes', batch_size=2, stdout=out)
+        
+        codes = [Registration.objects.get(pk=r.pk).unique_code for r in registrations]
+        self.assertEqual(codes, [f'{year}-{n:04d}' for n in range(1, 6)])
+        self.assertIn('Successfully backfilled unique codes for 5 registrations', out.getvalue())
+        self.assertEqual(self._create().unique_code, f'{year}-0006')
+
+
+class ExportTests(TestCase):
+    """Test CSV and PDF exports"""
+    
+    def setUp(self):
+        """Set up test data"""
+        import tempfile
+        from django.test import override_settings
+        
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media_root.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='test123')
+        self.client.force_login(self.user)
+        
+        self.registration = Registration.objects.create(
+            first_name='John',
+            last_name='Doe',
+            region='BANJUL_KOMBO',
+            auxiliary_body='Khuddam',
+            dob=date(1990, 1, 1)
+        )
+        Vitals.objects.create(registration=self.registration, blood_group='A+', height=175.5)
+        Registration.objects.create(
+            first_name='Jane',
+            last_name='Smith',
+            region='LRR',
+            auxiliary_body='Atfal'
+        )
+    
+    def test_csv_export_streams_rows(self):
+        """Test that the CSV export streams a header plus one line per registration"""
+        import csv
+        
+        response = self.client.get(reverse('tagnid:export_registrations'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0][0], 'Unique Code')
+        self.assertEqual(len(rows), 3)
+        john = next(row for row in rows if row[1] == 'John')
+        self.assertEqual(john[3], '1990-01-01')
+        self.assertEqual(john[5], 'BANJUL KOMBO')
+        self.assertEqual(john[7:9], ['A+', '175.50'])
+    
+    def test_csv_export_applies_filters(self):
+        """Test that the CSV export honours the list filters"""
+        response = self.client.get(reverse('tagnid:export_registrations'), {'region': 'LRR'})
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('Smith', content)
+        self.assertNotIn('Doe', content)
+    
+    def test_pdf_export_runs_as_background_job(self):
+        """Test that a PDF export is queued, processed by the worker and downloadable"""
+        from .exports import process_pending_jobs
+        
+        response = self.client.get(reverse('tagnid:export_registrations_pdf'), {'region': 'LRR'})
+        job = ExportJob.objects.get()
+        self.assertRedirects(response, reverse('tagnid:export_job_detail', args=[job.pk]))
+        self.assertEqual(job.status, ExportJob.STATUS_PENDING)
+        self.assertEqual(job.params, {'region': 'LRR'})
+        
+        self.assertEqual(process_pending_jobs(), 1)
+        
+        status = self.client.get(reverse('tagnid:export_job_status', args=[job.pk])).json()
+        self.assertEqual(status['status'], ExportJob.STATUS_DONE)
+        
+        response = self.client.get(status['download_url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+    
+    def test_pdf_export_reuses_artifact_until_data_changes(self):
+        """Test that identical filters reuse the cached job until a registration changes"""
+        from .exports import process_pending_jobs
+        
+        url = reverse('tagnid:export_registrations_pdf')
+        self.client.get(url, {'region': 'LRR'})
+        process_pending_jobs()
+        first_job = ExportJob.objects.get()
+        
+        self.client.get(url, {'region': 'LRR', 'search': ''})
+        self.assertEqual(ExportJob.objects.count(), 1)
+        
+        self.registration.last_name = 'Changed'
+        self.registration.save()
+        self.client.get(url, {'region': 'LRR'})
+        self.assertEqual(ExportJob.objects.count(), 2)
+        
+        process_pending_jobs()
+        self.assertFalse(ExportJob.objects.filter(pk=first_job.pk).exists())
+    
+    def test_missing_export_file_is_rendered_again(self):
+        """Test that a finished job whose file was wiped 404s and is replaced on the next request"""
+        from .exports import process_pending_jobs, request_export
+        
+        job = request_export({'region': 'LRR'})
+        process_pending_jobs()
+        job.refresh_from_db()
+        job.file.storage.delete(job.file.name)
+        
+        response = self.client.get(reverse('tagnid:export_job_download', args=[job.pk]))
+        self.assertEqual(response.status_code, 404)
+        
+        retry = request_export({'region': 'LRR'})
+        self.assertNotEqual(retry.pk, job.pk)
+        self.assertEqual(retry.status, ExportJob.STATUS_PENDING)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.STATUS_FAILED)
+    
+    def test_pdf_export_not_reused_on_a_later_day(self):
+        """Test that a finished age-band export is rendered again once ages change at midnight"""
+        from datetime import timedelta
+        from unittest import mock
+        from django.utils import timezone
+        from .exports import process_pending_jobs, request_export
+        
+        job = request_export({'min_age': '18', 'max_age': '35'})
+        process_pending_jobs()
+        self.assertEqual(request_export({'min_age': '18', 'max_age': '35'}).pk, job.pk)
+        
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        with mock.patch('tagnid.exports.timezone.localdate', return_value=tomorrow):
+            self.assertNotEqual(request_export({'min_age': '18', 'max_age': '35'}).pk, job.pk)
+    
+    def test_stale_running_job_is_failed_and_requested_again(self):
+        """Test that a job abandoned by a dead worker stops blocking new exports"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from .exports import STALE_JOB_TIMEOUT, claim_next_job, request_export
+        
+        job = request_export({'region': 'LRR'})
+        self.assertEqual(claim_next_job().pk, job.pk)
+        self.assertEqual(request_export({'region': 'LRR'}).pk, job.pk)
+        
+        ExportJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - STALE_JOB_TIMEOUT - timedelta(minutes=1))
+        retry = request_export({'region': 'LRR'})
+        self.assertNotEqual(retry.pk, job.pk)
+        
+        self.assertEqual(claim_next_job().pk, retry.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.STATUS_FAILED)
+    
+    def test_pdf_rendered_as_page_sized_tables(self):
+        """Test that large PDF exports are split into one table per chunk of rows"""
+        import io
+        from unittest import mock
+        from reportlab.platypus import Table
+        from . import exports
+        
+        Registration.objects.bulk_create([
+            Registration(first_name=f'Member{i}', last_name='Test', region='CRR',
+                         auxiliary_body='Ansar', unique_code=f'2099-{i:04d}')
+            for i in range(exports.PDF_ROWS_PER_TABLE + 5)
+        ])
+        
+        with mock.patch('reportlab.platypus.Table', wraps=Table) as table:
+            output = exports.render_registrations_pdf(io.BytesIO(), {'region': 'CRR'})
+        
+        self.assertEqual(table.call_count, 2)
+        self.assertTrue(output.getvalue().startswith(b'%PDF'))
+    
+    def test_pdf_story_pulls_tables_on_demand(self):
+        """Test that the PDF story only takes the next table once the previous ones are laid out"""
+        from .exports import _LazyStory
+        
+        pending = iter(['first table', 'second table'])
+        story = _LazyStory(['title'], pending)
+        self.assertEqual(len(story), 1)
+        del story[0]
+        self.assertEqual(len(story), 1)
+        self.assertEqual(story[0], 'first table')
+        self.assertEqual(next(pending), 'second table')
+
+
+class DashboardTests(TestCase):
+    """Test dashboard statistics caching"""
+    
+    def setUp(self):
+        """Set up test data"""
+        from django.core.cache import cache
+        cache.clear()
+        
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='test123')
+        self.client.force_login(self.user)
+        
+        create_registration('John', 'Doe', 'URR', 'Khuddam')
+        create_registration('Jane', 'Smith', 'URR', 'Atfal')
+    
+    def test_dashboard_stats(self):
+        """Test that the dashboard shows totals per region and auxiliary body"""
+        response = self.client.get(reverse('tagnid:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_registrations'], 2)
+        self.assertEqual(response.context['region_stats'], [{'name': 'URR', 'count': 2}])
+    
+    def test_dashboard_served_from_cache(self):
+        """Test that a second dashboard load runs no aggregate queries"""
+        from .service import get_dashboard_stats
+        
+        get_dashboard_stats()
+        with self.assertNumQueries(0):
+            get_dashboard_stats()
+    
+    def test_cache_invalidated_on_change(self):
+        """Test that creating or deleting a registration refreshes the statistics"""
+        from .service import get_dashboard_stats
+        
+        self.assertEqual(get_dashboard_stats()['total_registrations'], 2)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            registration = create_registration('Bob', 'Johnson', 'CRR', 'Ansar')
+        self.assertEqual(get_dashboard_stats()['total_registrations'], 3)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_registration(registration.pk)
+        self.assertEqual(get_dashboard_stats()['total_registrations'], 2)
+
+
+class RegistrationCounterTests(TestCase):
+    """Test the denormalized registration counters"""
+    
+    def _counts(self):
+        return {
+            (c.region, c.auxiliary_body): c.count
+            for c in RegistrationCounter.objects.filter(count__gt=0)
+        }
+    
+    def test_counters_follow_service_writes(self):
+        """Test that create, update and delete keep the counters in step"""
+        registration = create_registration('John', 'Doe', 'URR', 'Khuddam')
+        create_registration('Jane', 'Smith', 'URR', 'Khuddam')
+        self.assertEqual(self._counts(), {('URR', 'Khuddam'): 2})
+        
+        update_registration(registration.pk, region='LRR')
+        self.assertEqual(self._counts(), {('URR', 'Khuddam'): 1, ('LRR', 'Khuddam'): 1})
+        
+        delete_registration(registration.pk)
+        self.assertEqual(self._counts(), {('URR', 'Khuddam'): 1})
+        self.assertEqual(RegistrationCounter.objects.verify(), [])
+    
+    def test_views_update_counters(self):
+        """Test that the registration views go through the service layer"""
+        client = Client()
+        client.force_login(User.objects.create_user(username='admin', password='admin123', is_staff=True))
+        
+        client.post(reverse('tagnid:registration_create'), {
+            'first_name': 'Jane', 'last_name': 'Smith', 'region': 'LRR', 'auxiliary_body': 'Atfal'
+        })
+        registration = Registration.objects.get(first_name='Jane')
+        self.assertEqual(self._counts(), {('LRR', 'Atfal'): 1})
+        
+        client.post(reverse('tagnid:registration_delete', args=[registration.pk]))
+        self.assertEqual(self._counts(), {})
+    
+    def test_rebuild_command(self):
+        """Test that the rebuild command repairs drifted counters"""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        create_registration('John', 'Doe', 'URR', 'Khuddam')
+        Registration.objects.create(first_name='Jane', last_name='Smith', region='CRR', auxiliary_body='Ansar')
+        
+        out = StringIO()
+        call_command('rebuild_registration_counters', verify=True, stdout=out)
+        self.assertIn('1 counter(s) out of step', out.getvalue())
+        
+        call_command('rebuild_registration_counters', stdout=StringIO())
+        self.assertEqual(self._counts(), {('URR', 'Khuddam'): 1, ('CRR', 'Ansar'): 1})
+        self.assertEqual(RegistrationCounter.objects.verify(), [])
+    
+    def test_count_registrations_uses_counters(self):
+        """Test that filter counts without a search term come from the counters"""
+        from .service import count_registrations
+        
+        create_registration('John', 'Doe', 'URR', 'Khuddam')
+        create_registration('Jane', 'Smith', 'URR', 'Atfal')
+        with self.assertNumQueries(1):
+            self.assertEqual(count_registrations({'region': 'URR'}), 2)
+        self.assertEqual(count_registrations({'region': 'URR', 'search': 'Jane'}), 1)
+
+
+class KeysetPaginationTests(TestCase):
+    """Test cursor pagination of the registration list"""
+    
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='test123')
+        self.client.force_login(self.user)
+        
+        for i in range(45):
+            Registration.objects.create(
+                first_name=f'Member{i:02d}', last_name='Test', region='URR' if i % 2 else 'LRR', auxiliary_body='Khuddam'
+            )
+    
+    def _names(self, response):
+        return [r.first_name for r in response.context['registrations']]
+    
+    def test_walk_forward_and_back(self):
+        """Test that next/previous cursors visit every row exactly once"""
+        url = reverse('tagnid:registration_list')
+        
+        first = self.client.get(url)
+        page = first.context['registrations']
+        self.assertFalse(page.has_previous)
+        self.assertTrue(page.has_next)
+        
+        second = self.client.get(url, {'cursor': page.next_cursor})
+        third = self.client.get(url, {'cursor': second.context['registrations'].next_cursor})
+        self.assertFalse(third.context['registrations'].has_next)
+        
+        seen = self._names(first) + self._names(second) + self._names(third)
+        self.assertEqual(len(seen), 45)
+        self.assertEqual(len(set(seen)), 45)
+        self.assertEqual(seen[0], 'Member44')
+        
+        back = self.client.get(url, {'cursor': third.context['registrations'].previous_cursor})
+        self.assertEqual(self._names(back), self._names(second))
+    
+    def test_cursor_keeps_filters(self):
+        """Test that cursor links carry the filter query string"""
+        url = reverse('tagnid:registration_list')
+        response = self.client.get(url, {'region': 'URR'})
+        page = response.context['registrations']
+        self.assertEqual(len(page), 20)
+        self.assertContains(response, f'region=URR&cursor={page.next_cursor}')
+        
+        response = self.client.get(url, {'region': 'URR', 'cursor': page.next_cursor})
+        self.assertEqual(len(response.context['registrations']), 2)
+        self.assertTrue(all(r.region == 'URR' for r in response.context['registrations']))
+    
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        """Test that a malformed cursor shows the first page"""
+        response = self.client.get(reverse('tagnid:registration_list'), {'cursor': 'garbage!'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._names(response)[0], 'Member44')
+
+
+class BenchmarkCommandTests(TestCase):
+    """Test the benchmark commands"""
+    
+    def test_benchmark_queries_with_and_without_indexes(self):
+        """Test that the benchmark seeds rows, reports plans and restores the indexes"""
+        from io import StringIO
+        from django.core.management import call_command
+        from django.db import connection
+        
+        out = StringIO()
+        call_command('benchmark_queries', seed=50, repeat=1, without_indexes=True, stdout=out)
+        
+        output = out.getvalue()
+        self.assertIn('Registrations in table: 50', output)
+        self.assertIn('Without indexes', output)
+        self.assertIn('list by region:', output)
+        self.assertEqual(RegistrationCounter.objects.verify(), [])
+        
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Registration._meta.db_table)
+        self.assertIn('registration_created_id_idx', constraints)
+    
+    def test_run_benchmarks_report(self):
+        """Test that the suite writes a JSON report and flags regressions against an earlier one"""
+        import json
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        
+        output = tempfile.NamedTemporaryFile(suffix='.json', delete=False)
+        output.close()
+        self.addCleanup(__import__('os').unlink, output.name)
+        
+        # An existing account with the old fixed benchmark name is left alone
+        User.objects.create_user(username='_benchmark', password='keep-me-123')
+        call_command(
+            'run_benchmarks', seed=60, repeat=1, threads=1, allocations=5, backfill_rows=10,
+            output=output.name, stdout=StringIO(),
+        )
+        with open(output.name) as f:
+            report = json.load(f)
+        
+        self.assertEqual(report['environment']['registrations'], 60)
+        self.assertGreater(report['environment']['vitals'], 0)
+        results = report['results']
+        self.assertIn('registration_list deep keyset page', results)
+        self.assertGreater(results['registration_list first page']['queries'], 0)
+        self.assertEqual(results['code allocation']['allocated'], 5)
+        self.assertFalse(results['code allocation']['gaps_or_duplicates'])
+        self.assertEqual(results['unique code backfill']['rows'], 10)
+        self.assertFalse(Registration.objects.filter(unique_code=None).exists())
+        self.assertEqual(User.objects.filter(username__startswith='_benchmark').count(), 1)
+        self.assertTrue(User.objects.get(username='_benchmark').check_password('keep-me-123'))
+        
+        for result in report['results'].values():
+            if 'median_ms' in result:
+                result['median_ms'] = result['median_ms'] / 10
+        with open(output.name, 'w') as f:
+            json.dump(report, f)
+        with self.assertRaises(CommandError):
+            call_command(
+                'run_benchmarks', repeat=1, only=['dashboard'], compare=output.name,
+                fail_on_regression=True, stdout=StringIO(),
+            )
+
+
+class SearchTests(TestCase):
+    """Test registrant search"""
+    
+    def setUp(self):
+        """Set up test data"""
+        self.john = Registration.objects.create(first_name='John', last_name='Jallow', region='URR', auxiliary_body='Khuddam')
+        self.jane = Registration.objects.create(first_name='Jane', last_name='Ceesay', region='LRR', auxiliary_body='Atfal')
+        self.omar = Registration.objects.create(first_name='Omar', last_name='Njie', region='CRR', auxiliary_body='Ansar')
+    
+    def _search(self, query):
+        from .search import search_registrations
+        return set(search_registrations(Registration.objects.all(), query))
+    
+    def test_substring_search(self):
+        """Test that name substrings match case-insensitively"""
+        self.assertEqual(self._search('jallo'), {self.john})
+        self.assertEqual(self._search('AY'), {self.jane})
+        self.assertEqual(self._search('ja'), {self.john, self.jane})
+        self.assertEqual(self._search('xyz'), set())
+    
+    def test_code_prefix_search(self):
+        """Test that YEAR-NNNN queries are answered by a code range lookup"""
+        self.assertEqual(self._search(self.jane.unique_code), {self.jane})
+        year = self.john.unique_code.split('-')[0]
+        self.assertEqual(self._search(f'{year}-'), {self.john, self.jane, self.omar})
+        self.assertEqual(self._search(self.omar.unique_code[-4:]), {self.omar})
+    
+    def test_index_follows_updates(self):
+        """Test that renaming a registration updates the search grams"""
+        self.john.last_name = 'Touray'
+        self.john.save()
+        self.assertEqual(self._search('jallow'), set())
+        self.assertEqual(self._search('touray'), {self.john})
+    
+    def test_rebuild_search_index(self):
+        """Test that rows written in bulk become searchable after a rebuild"""
+        from .search import rebuild_search_index
+        
+        Registration.objects.bulk_create([
+            Registration(first_name='Bakary', last_name='Sanneh', region='URR', auxiliary_body='Ansar', unique_code='2099-0001')
+        ])
+        self.assertEqual(self._search('sanneh'), set())
+        rebuild_search_index()
+        self.assertEqual(len(self._search('sanneh')), 1)
+    
+    def test_backfill_reindexes_only_updated_rows(self):
+        """Test that a code backfill refreshes the grams of the backfilled rows only"""
+        from .service import backfill_unique_codes
+        
+        Registration.objects.bulk_create([
+            Registration(first_name='Bakary', last_name='Sanneh', region='URR', auxiliary_body='Ansar', unique_code='2099-0001')
+        ])
+        Registration.objects.filter(pk=self.jane.pk).update(unique_code=None)
+        self.assertEqual(backfill_unique_codes(), 1)
+        
+        self.jane.refresh_from_db()
+        self.assertEqual(self._search(self.jane.unique_code), {self.jane})
+        self.assertEqual(self._search('sanneh'), set())
+    
+    def test_list_view_search(self):
+        """Test that the registration list uses the search backend"""
+        client = Client()
+        client.force_login(User.objects.create_user(username='testuser', password='test123'))
+        response = client.get(reverse('tagnid:registration_list'), {'search': 'njie'})
+        self.assertEqual([r.pk for r in response.context['registrations']], [self.omar.pk])
+
+
+class ImportTests(TestCase):
+    """Test bulk import of registrations"""
+    
+    CSV = (
+        'First Name,Last Name,Date of Birth,Region,Auxiliary Body,Blood Group,Height (cm)\n'
+        'John,Jallow,1990-01-01,URR,Khuddam,A+,175.5\n'
+        'Jane,Ceesay,,BANJUL KOMBO,atfal,,\n'
+        ',Missing,,URR,Khuddam,,\n'
+        'Omar,Njie,2001-02-03,NOWHERE,Ansar,,\n'
+        'Musa,Bah,1970-05-05,CRR,Ansar,,400\n'
+    )
+    
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='test123')
+        self.client.force_login(self.user)
+    
+    def test_import_view(self):
+        """Test that valid rows are imported and invalid rows reported"""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from .search import search_registrations
+        
+        upload = SimpleUploadedFile('members.csv', self.CSV.encode(), content_type='text/csv')
+        response = self.client.post(reverse('tagnid:registration_import'), {'file': upload})
+        
+        self.assertEqual(response.status_code, 200)
+        result = response.context['result']
+        self.assertEqual(result.created, 2)
+        self.assertEqual([row for row, _ in result.errors], [4, 5, 6])
+        
+        john = Registration.objects.get(first_name='John')
+        self.assertEqual(john.vitals.blood_group, 'A+')
+        self.assertTrue(john.unique_code)
+        jane = Registration.objects.get(first_name='Jane')
+        self.assertEqual((jane.region, jane.auxiliary_body), ('BANJUL_KOMBO', 'Atfal'))
+        self.assertFalse(Vitals.objects.filter(registration=jane).exists())
+        
+        self.assertEqual(RegistrationCounter.objects.verify(), [])
+        self.assertEqual(list(search_registrations(Registration.objects.all(), 'ceesay')), [jane])
+    
+    def test_import_command(self):
+        """Test that the management command imports a file in batches"""
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+        
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(self.CSV)
+        self.addCleanup(__import__('os').unlink, f.name)
+        
+        out = StringIO()
+        call_command('import_registrations', f.name, batch_size=1, stdout=out)
+        self.assertIn('Imported 2 registration(s)', out.getvalue())
+        codes = sorted(Registration.objects.values_list('unique_code', flat=True))
+        self.assertEqual(len(set(codes)), 2)
+    
+    def test_missing_columns(self):
+        """Test that a file without the required columns is rejected"""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        
+        upload = SimpleUploadedFile('members.csv', b'Name,Region\nJohn,URR\n', content_type='text/csv')
+        response = self.client.post(reverse('tagnid:registration_import'), {'file': upload}, follow=True)
+        self.assertContains(response, 'Missing required column(s)')
+        self.assertFalse(Registration.objects.exists())
+    
+    def test_import_xlsx(self):
+        """Test that .xlsx uploads are read with openpyxl"""
+        import csv
+        import io
+        from openpyxl import Workbook
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        
+        workbook = Workbook()
+        for row in csv.reader(io.StringIO(self.CSV)):
+            workbook.active.append(row)
+        content = io.BytesIO()
+        workbook.save(content)
+        
+        upload = SimpleUploadedFile('members.xlsx', content.getvalue())
+        response = self.client.post(reverse('tagnid:registration_import'), {'file': upload})
+        self.assertEqual(response.context['result'].created, 2)
+        self.assertEqual(Registration.objects.get(first_name='John').vitals.blood_group, 'A+')
+
+
+class RegistrationAPITests(TestCase):
+    """Test the JSON lookup API used by check-in scanners"""
+    
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='test123')
+        self.client.force_login(self.user)
+        self.first = create_registration(
+            first_name='John', last_name='Doe', region='URR', auxiliary_body='Khuddam', dob=date(1990, 1, 1)
+        )
+        self.second = create_registration(
+            first_name='Jane', last_name='Smith', region='LRR', auxiliary_body='Atfal'
+        )
+        Vitals.objects.create(registration=self.first, blood_group='O+', height=180)
+        self.url = reverse('tagnid:api_registrations')
+    
+    def test_lookup_many_codes_in_one_query(self):
+        """Test that several codes resolve with a single query"""
+        codes = f'{self.second.unique_code},{self.first.unique_code},1999-9999'
+        # The user lookup (sessions and users are cached after that), then
+        # one query for all the codes
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'codes': codes})
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([r['unique_code'] for r in data['results']], [self.second.unique_code, self.first.unique_code])
+        self.assertEqual(data['missing'], ['1999-9999'])
+        self.assertEqual(data['results'][1]['blood_group'], 'O+')
+        self.assertIsNone(data['results'][0]['blood_group'])
+    
+    def test_etag_not_modified(self):
+        """Test that a matching If-None-Match gets a 304 until the data changes"""
+        response = self.client.get(self.url, {'codes': self.first.unique_code})
+        etag = response['ETag']
+        
+        response = self.client.get(self.url, {'codes': self.first.unique_code}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        
+        # Weak validators and "*" match too
+        for header in (f'W/{etag}', '*'):
+            response = self.client.get(self.url, {'codes': self.first.unique_code}, HTTP_IF_NONE_MATCH=header)
+            self.assertEqual(response.status_code, 304)
+        
+        update_registration(self.first.id, last_name='Doe-Jallow')
+        response = self.client.get(self.url, {'codes': self.first.unique_code}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_requires_codes_and_login(self):
+        """Test the 400 and 401 responses"""
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url, {'codes': self.first.unique_code}).status_code, 401)
+
+
+class SyncTests(TestCase):
+    """Test the batched sync endpoint for offline devices"""
+    
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='test123')
+        self.client.force_login(self.user)
+        self.url = reverse('tagnid:api_sync_registrations')
+        self.items = [
+            {'client_uuid': '6f1c2a4e-8f1e-4a5e-9a55-0c1f3b0e0001', 'first_name': 'John', 'last_name': 'Doe',
+             'dob': '1990-01-01', 'region': 'URR', 'auxiliary_body': 'Khuddam', 'blood_group': 'B+', 'height': 172},
+            {'client_uuid': '6f1c2a4e-8f1e-4a5e-9a55-0c1f3b0e0002', 'first_name': 'Jane', 'last_name': 'Smith',
+             'dob': None, 'region': 'LRR', 'auxiliary_body': 'Atfal'},
+            {'client_uuid': '6f1c2a4e-8f1e-4a5e-9a55-0c1f3b0e0003', 'first_name': '', 'last_name': 'Nobody',
+             'region': 'LRR', 'auxiliary_body': 'Atfal'},
+        ]
+    
+    def post(self, items):
+        return self.client.post(self.url, {'registrations': items}, content_type='application/json')
+    
+    def test_sync_creates_batch(self):
+        """Test that valid items are created with codes and invalid ones reported"""
+        response = self.post(self.items)
+        
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([r['status'] for r in results], ['created', 'created', 'invalid'])
+        self.assertIn('First name', results[2]['errors'])
+        john = Registration.objects.get(unique_code=results[0]['unique_code'])
+        self.assertEqual(str(john.client_uuid), self.items[0]['client_uuid'])
+        self.assertEqual(john.vitals.blood_group, 'B+')
+        self.assertEqual(RegistrationCounter.objects.verify(), [])
+    
+    def test_sync_is_idempotent(self):
+        """Test that resending a batch returns the existing codes without duplicates"""
+        first = self.post(self.items[:2]).json()['results']
+        second = self.post(self.items[:2] + self.items[:1]).json()['results']
+        
+        self.assertEqual([r['status'] for r in second], ['existing', 'existing', 'existing'])
+        self.assertEqual([r['unique_code'] for r in second[:2]], [r['unique_code'] for r in first])
+        self.assertEqual(second[2]['unique_code'], first[0]['unique_code'])
+        self.assertEqual(Registration.objects.count(), 2)
+    
+    def test_sync_rejects_bad_body(self):
+        """Test that malformed bodies and items are rejected"""
+        response = self.client.post(self.url, 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        
+        results = self.post([{'client_uuid': 'abc', 'first_name': 'X'}]).json()['results']
+        self.assertEqual(results[0]['status'], 'invalid')
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True)
+class RequestMetricsTests(TestCase):
+    """Test the request instrumentation middleware"""
+    
+    def setUp(self):
+        """Set up test data"""
+        from .middleware import metrics_store
+        
+        metrics_store.reset()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='test123', is_staff=True)
+        self.client.force_login(self.user)
+        create_registration(first_name='John', last_name='Doe', region='URR', auxiliary_body='Khuddam')
+    
+    def test_server_timing_header(self):
+        """Test that responses carry query count and timings"""
+        response = self.client.get(reverse('tagnid:registration_list'))
+        
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('tpl;dur=', timing)
+        self.assertRegex(timing, r'conn;desc="\d+ connects"')
+        self.assertIn('total;dur=', timing)
+    
+    def test_connections_counted(self):
+        """Test that database connections opened during a request are counted"""
+        from django.db import connections
+        from .middleware import RequestMetrics, _current
+        
+        self.client.get(reverse('tagnid:registration_list'))  # connects the signal receiver
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        connection = connections.create_connection('default')
+        try:
+            connection.ensure_connection()
+            connection.ensure_connection()
+        finally:
+            connection.close()
+            _current.reset(token)
+        self.assertEqual(metrics.connect_count, 1)
+    
+    def test_query_timer_removed_after_request(self):
+        """Test that the middleware leaves no execute wrapper behind on the connection"""
+        from django.db import connection
+        
+        wrappers = list(connection.execute_wrappers)
+        self.client.get(reverse('tagnid:registration_list'))
+        self.assertEqual(connection.execute_wrappers, wrappers)
+    
+    def test_percentiles_per_view(self):
+        """Test that samples are aggregated per URL name and served to staff"""
+        for _ in range(3):
+            self.client.get(reverse('tagnid:registration_list'))
+        
+        response = self.client.get(reverse('tagnid:request_metrics'))
+        views = response.json()['views']
+        entry = views['tagnid:registration_list']
+        self.assertEqual(entry['count'], 3)
+        self.assertGreater(entry['queries']['p50'], 0)
+        self.assertGreater(entry['template_ms']['max'], 0)
+        self.assertIn('p99', entry['total_ms'])
+        self.assertIn('connects', entry)
+        self.assertIn('conn_max_age', response.json()['databases']['default'])
+    
+    def test_metrics_staff_only(self):
+        """Test that non-staff users cannot read the metrics"""
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('tagnid:request_metrics')).status_code, 403)
+    
+    @override_settings(REQUEST_METRICS_ENABLED=False)
+    def test_disabled_by_default(self):
+        """Test that the middleware is skipped when the setting is off"""
+        response = self.client.get(reverse('tagnid:registration_list'))
+        self.assertNotIn('Server-Timing', response)
+
+
+class SeedCommandTests(TestCase):
+    """Test the synthetic data generator"""
+    
+    def _snapshot(self):
+        return list(Registration.objects.order_by('unique_code').values_list(
+            'unique_code', 'first_name', 'last_name', 'dob', 'region', 'auxiliary_body',
+            'created_at', 'vitals__blood_group', 'vitals__height',
+        ))
+    
+    def test_seed_is_deterministic(self):
+        """Test that the same seed and end date produce identical data"""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        call_command('seed_registrations', 120, seed=7, end='2025-06-30', batch_size=50, stdout=StringIO())
+        first = self._snapshot()
+        
+        Registration.objects.all().delete()
+        CodeSequence.objects.all().delete()
+        call_command('seed_registrations', 120, seed=7, end='2025-06-30', batch_size=50, stdout=StringIO())
+        
+        self.assertEqual(len(first), 120)
+        self.assertEqual(self._snapshot(), first)
+        self.assertGreater(Vitals.objects.count(), 0)
+        self.assertEqual(RegistrationCounter.objects.verify(), [])
+    
+    def test_seed_options(self):
+        """Test vitals ratio, codes and search index of seeded rows"""
+        from io import StringIO
+        from django.core.management import call_command
+        from .search import search_registrations
+        
+        out = StringIO()
+        call_command('seed_registrations', 40, vitals_ratio=0, stdout=out)
+        self.assertIn('Inserted 40 registrations', out.getvalue())
+        self.assertFalse(Vitals.objects.exists())
+        self.assertFalse(Registration.objects.filter(unique_code=None).exists())
+        
+        registration = Registration.objects.first()
+        found = search_registrations(Registration.objects.all(), registration.last_name)
+        self.assertIn(registration, found)
+    
+    def test_seed_keeps_generated_timestamps(self):
+        """Test that seeded rows keep their generated dates without touching auto_now"""
+        from datetime import datetime, timezone as dt_timezone
+        from .seeding import seed_registrations
+        
+        end = datetime(2025, 6, 30, tzinfo=dt_timezone.utc)
+        seed_registrations(30, end=end, batch_size=10)
+        
+        latest = Registration.objects.order_by('-created_at').values_list('created_at', 'updated_at').first()
+        self.assertLessEqual(latest[0], end)
+        self.assertEqual(latest[0], latest[1])
+        for vitals in Vitals.objects.select_related('registration'):
+            self.assertEqual(vitals.created_at, vitals.registration.created_at)
+        self.assertTrue(Registration._meta.get_field('updated_at').auto_now)
+        self.assertTrue(Vitals._meta.get_field('created_at').auto_now_add)
+
+
+class AgeQueryTests(TestCase):
+    """Test database-side age computation and age band filters"""
+    
+    def setUp(self):
+        """Set up test data"""
+        self.today = date(2025, 3, 1)
+        dobs = [
+            date(2015, 3, 1), date(2015, 3, 2), date(2015, 2, 28), date(2012, 2, 29),
+            date(2010, 12, 31), date(1985, 3, 1), date(1985, 3, 2), None,
+        ]
+        for i, dob in enumerate(dobs):
+            Registration.objects.create(
+                first_name=f'Person{i}', last_name='Test', dob=dob, region='URR', auxiliary_body='Atfal'
+            )
+    
+    def test_with_age_matches_python(self):
+        """Test that the SQL age equals calculate_age for every row"""
+        from .models import calculate_age
+        
+        for registration in Registration.objects.with_age(self.today):
+            self.assertEqual(registration.current_age, calculate_age(registration.dob, self.today), registration.dob)
+            self.assertEqual(registration.age, registration.current_age)
+    
+    def test_filter_age_band(self):
+        """Test that the dob range gives the same rows as filtering on age"""
+        from .models import calculate_age
+        
+        for min_age, max_age in [(10, 10), (7, 15), (40, None), (None, 9), (12, 13)]:
+            expected = {
+                r.pk for r in Registration.objects.all()
+                if calculate_age(r.dob, self.today) is not None
+                and (min_age is None or calculate_age(r.dob, self.today) >= min_age)
+                and (max_age is None or calculate_age(r.dob, self.today) <= max_age)
+            }
+            found = set(Registration.objects.filter_age(min_age, max_age, today=self.today).values_list('pk', flat=True))
+            self.assertEqual(found, expected, (min_age, max_age))
+    
+    def test_list_and_export_age_filters(self):
+        """Test that the list and CSV export accept min_age/max_age"""
+        user = User.objects.create_user(username='testuser', password='test123')
+        self.client.force_login(user)
+        adults = Registration.objects.filter_age(min_age=18).count()
+        
+        response = self.client.get(reverse('tagnid:registration_list'), {'min_age': 18, 'max_age': 'abc'})
+        self.assertEqual(len(response.context['registrations']), adults)
+        
+        response = self.client.get(reverse('tagnid:export_registrations'), {'min_age': 18})
+        lines = b''.join(response.streaming_content).decode().strip().splitlines()
+        self.assertEqual(len(lines), adults + 1)
+        self.assertTrue(all(int(line.split(',')[4]) >= 18 for line in lines[1:]))
+
+
+class EligibilityTests(TestCase):
+    """Test auxiliary body age eligibility checks"""
+    
+    def setUp(self):
+        """Set up test data"""
+        today = date.today()
+        self.rows = [
+            ('Atfal', 10, 'eligible'),
+            ('Atfal', 20, 'too_old'),
+            ('Khuddam', 12, 'too_young'),
+            ('Khuddam', 15, 'eligible'),
+            ('Ansar', 39, 'too_young'),
+            ('Ansar', 70, 'eligible'),
+            ('Guest', 3, 'eligible'),
+        ]
+        for i, (auxiliary_body, age, _) in enumerate(self.rows):
+            Registration.objects.create(
+                first_name=f'Person{i}', last_name='Test', region='URR',
+                auxiliary_body=auxiliary_body, dob=years_before(today, age),
+            )
+        Registration.objects.create(first_name='No', last_name='Dob', region='URR', auxiliary_body='Atfal')
+    
+    def test_report_single_query(self):
+        """Test that the whole-table report is one query with the right counts"""
+        from .service import eligibility_report
+        
+        with self.assertNumQueries(1):
+            report = eligibility_report()
+        
+        self.assertEqual(report['Atfal'], {'eligible': 1, 'too_young': 0, 'too_old': 1, 'missing_dob': 1})
+        self.assertEqual(report['Khuddam']['too_young'], 1)
+        self.assertEqual(report['Ansar']['too_young'], 1)
+        self.assertEqual(report['Guest']['eligible'], 1)
+        
+        statuses = dict(Registration.objects.with_eligibility().values_list('first_name', 'eligibility'))
+        for i, (_, _, expected) in enumerate(self.rows):
+            self.assertEqual(statuses[f'Person{i}'], expected)
+    
+    def test_check_eligibility_command(self):
+        """Test that the command summarizes and lists ineligible registrations"""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        out = StringIO()
+        call_command('check_eligibility', list=True, stdout=out)
+        output = out.getvalue()
+        self.assertIn('3 registration(s) outside', output)
+        self.assertIn('Person1 Test', output)
+        self.assertNotIn('Person0 Test', output)
+    
+    def test_form_rejects_ineligible_age(self):
+        """Test the inline form check for new and edited registrations"""
+        from .forms import RegistrationForm
+        
+        data = {'first_name': 'A', 'last_name': 'B', 'region': 'URR', 'auxiliary_body': 'Atfal',
+                'dob': years_before(date.today(), 30).isoformat()}
+        form = RegistrationForm(data)
+        self.assertFalse(form.is_valid())
+        self.assertIn('outside the Atfal age range', form.errors['auxiliary_body'][0])
+        
+        data['auxiliary_body'] = 'Khuddam'
+        self.assertTrue(RegistrationForm(data).is_valid())
+        
+        data['dob'] = '2999-01-01'
+        self.assertIn('dob', RegistrationForm(data).errors)
+        
+        # Existing members who have aged out can still be edited
+        aged_out = Registration.objects.get(first_name='Person1')
+        data = {'first_name': 'Renamed', 'last_name': 'Test', 'region': 'LRR', 'auxiliary_body': 'Atfal',
+                'dob': aged_out.dob.isoformat()}
+        self.assertTrue(RegistrationForm(data, instance=aged_out).is_valid())
+
+
+class DuplicateTests(TestCase):
+    """Test fuzzy duplicate registration detection"""
+    
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.client = Client()
+        self.client.login(username='staff', password='testpass123')
+        self.original = Registration.objects.create(
+            first_name='Ousman', last_name='Ceesay', region='URR', auxiliary_body='Khuddam', dob=date(1995, 3, 4)
+        )
+        self.other = Registration.objects.create(
+            first_name='Lamin', last_name='Jallow', region='CRR', auxiliary_body='Khuddam', dob=date(1995, 3, 4)
+        )
+    
+    def test_phonetic_keys(self):
+        """Test that spelling variants share a stored phonetic key"""
+        from .phonetics import phonetic_key
+        
+        self.assertEqual(phonetic_key('Ceesay'), phonetic_key('Sisay'))
+        self.assertEqual(phonetic_key('Jallow'), phonetic_key('Jalloh'))
+        self.assertEqual(phonetic_key('Ousman'), phonetic_key('Usman'))
+        self.assertNotEqual(phonetic_key('Ceesay'), phonetic_key('Jallow'))
+        self.assertEqual(self.original.last_name_key, phonetic_key('Ceesay'))
+        self.assertEqual(self.original.first_name_key, phonetic_key('Ousman'))
+    
+    def test_find_duplicates_command(self):
+        """Test that the finder queues misspelt pairs but not different people"""
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import DuplicateCandidate
+        
+        duplicate = Registration.objects.create(
+            first_name='Usman', last_name='Sisay', region='URR', auxiliary_body='Khuddam', dob=date(1995, 4, 3)
+        )
+        Registration.objects.create(
+            first_name='Fatou', last_name='Sisay', region='URR', auxiliary_body='Guest', dob=date(1995, 8, 20)
+        )
+        
+        call_command('find_duplicates', stdout=StringIO())
+        pairs = list(DuplicateCandidate.objects.values_list('registration', 'duplicate'))
+        self.assertEqual(pairs, [(self.original.pk, duplicate.pk)])
+        
+        # Running again does not queue the pair twice
+        out = StringIO()
+        call_command('find_duplicates', stdout=out)
+        self.assertIn('0 pair(s) queued', out.getvalue())
+        self.assertEqual(DuplicateCandidate.objects.count(), 1)
+    
+    def test_record_duplicates_counts_own_inserts(self):
+        """Test that pairs stored concurrently by another process are not counted"""
+        from unittest import mock
+        from . import duplicates
+        from .models import DuplicateCandidate
+        
+        second = Registration.objects.create(first_name='Usman', last_name='Sisay', region='URR', auxiliary_body='Khuddam')
+        third = Registration.objects.create(first_name='Usmaan', last_name='Sise', region='URR', auxiliary_body='Khuddam')
+        DuplicateCandidate.objects.create(registration=self.original, duplicate=second, score=0.9)
+        pairs = {(self.original.pk, second.pk): 0.9, (second.pk, third.pk): 0.95}
+        
+        # The first check misses the pair stored by "another process", so that insert fails and is retried
+        real = duplicates._recorded_pairs
+        with mock.patch.object(duplicates, '_recorded_pairs', side_effect=[set(), real(pairs)]):
+            self.assertEqual(duplicates.record_duplicates(pairs), 1)
+        self.assertEqual(DuplicateCandidate.objects.count(), 2)
+        self.assertEqual(duplicates.record_duplicates(pairs), 0)
+    
+    def test_create_checks_for_duplicates(self):
+        """Test the pre-insert check in the service and the create view"""
+        from .service import PossibleDuplicateError
+        
+        with self.assertRaises(PossibleDuplicateError) as raised:
+            create_registration('Usman', 'Sisay', 'URR', 'Khuddam', dob=date(1995, 3, 4), check_duplicates=True)
+        self.assertEqual([registration for registration, score in raised.exception.candidates], [self.original])
+        
+        data = {'first_name': 'Usman', 'last_name': 'Sisay', 'dob': '1995-03-04', 'region': 'URR', 'auxiliary_body': 'Khuddam'}
+        response = self.client.post(reverse('tagnid:registration_create'), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'may already be registered')
+        self.assertEqual(Registration.objects.count(), 2)
+        
+        response = self.client.post(reverse('tagnid:registration_create'), dict(data, confirm_not_duplicate='1'))
+        self.assertRedirects(response, reverse('tagnid:registration_list'))
+        self.assertEqual(Registration.objects.count(), 3)
+    
+    def test_staff_review(self):
+        """Test that staff can list and dismiss pairs, and others cannot"""
+        from .models import DuplicateCandidate
+        
+        candidate = DuplicateCandidate.objects.create(registration=self.original, duplicate=self.other, score=0.9)
+        response = self.client.get(reverse('tagnid:duplicate_list'))
+        self.assertContains(response, 'Lamin Jallow')
+        
+        response = self.client.post(reverse('tagnid:duplicate_dismiss', args=[candidate.pk]))
+        self.assertRedirects(response, reverse('tagnid:duplicate_list'))
+        candidate.refresh_from_db()
+        self.assertEqual(candidate.status, DuplicateCandidate.STATUS_DISMISSED)
+        self.assertEqual(candidate.reviewed_by, self.user)
+        
+        User.objects.create_user(username='clerk', password='testpass123')
+        self.client.login(username='clerk', password='testpass123')
+        response = self.client.get(reverse('tagnid:duplicate_list'))
+        self.assertRedirects(response, reverse('tagnid:registration_list'))
+
+
+class ChoiceLabelTests(TestCase):
+    """Test the precomputed choice labels and cached filter dropdowns"""
+    
+    def setUp(self):
+        """Set up test data"""
+        User.objects.create_user(username='testuser', password='testpass123')
+        self.client = Client()
+        self.client.login(username='testuser', password='testpass123')
+        self.registration = Registration.objects.create(
+            first_name='Awa', last_name='Touray', region='BANJUL_KOMBO', auxiliary_body='Khuddam'
+        )
+    
+    def test_labels_match_choices(self):
+        """Test that the label maps agree with get_FOO_display()"""
+        from .models import REGION_LABELS, AUXILIARY_BODY_LABELS
+        
+        self.assertEqual(REGION_LABELS, dict(Registration.REGION_CHOICES))
+        self.assertEqual(AUXILIARY_BODY_LABELS, dict(Registration.AUXILIARY_BODY_CHOICES))
+        self.assertEqual(self.registration.region_label, self.registration.get_region_display())
+        self.assertEqual(self.registration.auxiliary_body_label, self.registration.get_auxiliary_body_display())
+    
+    def test_cached_dropdowns_follow_filter(self):
+        """Test that each selected filter value gets its own cached dropdown"""
+        url = reverse('tagnid:registration_list')
+        for _ in range(2):
+            response = self.client.get(url, {'region': 'BANJUL_KOMBO'})
+            self.assertContains(response, '<option value="BANJUL_KOMBO" selected>BANJUL KOMBO</option>', html=True)
+            self.assertContains(response, '<td>BANJUL KOMBO</td>', html=True)
+        
+        response = self.client.get(url, {'region': 'FONI'})
+        self.assertContains(response, '<option value="FONI" selected>FONI</option>', html=True)
+        self.assertContains(response, '<option value="BANJUL_KOMBO">BANJUL KOMBO</option>', html=True)
+        
+        # Unknown values select nothing
+        response = self.client.get(url, {'region': 'NOWHERE'})
+        self.assertNotContains(response, 'selected>')
+
+
+class AsyncViewTests(TestCase):
+    """Test the async read views under ASGI"""
+    
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.registration = create_registration(
+            first_name='Mariama', last_name='Bah', region='URR', auxiliary_body='Khuddam', dob=date(1990, 1, 1)
+        )
+    
+    async def test_read_views(self):
+        """Test that the dashboard, list and detail pages render from an ASGI request"""
+        await self.async_client.aforce_login(self.user)
+        
+        response = await self.async_client.get(reverse('tagnid:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        response = await self.async_client.get(reverse('tagnid:registration_list'), {'region': 'URR'})
+        self.assertContains(response, 'Mariama')
+        response = await self.async_client.get(reverse('tagnid:registration_detail', args=[self.registration.pk]))
+        self.assertContains(response, self.registration.unique_code)
+        
+        # Still login protected
+        await self.async_client.alogout()
+        response = await self.async_client.get(reverse('tagnid:registration_list'))
+        self.assertEqual(response.status_code, 302)
+    
+    async def test_csv_export_async_iterator(self):
+        """Test that ASGI requests stream the CSV export from an async iterator"""
+        await self.async_client.aforce_login(self.user)
+        
+        response = await self.async_client.get(reverse('tagnid:export_registrations'))
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        lines = content.strip().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('Mariama,Bah,1990-01-01', lines[1])
+    
+    @override_settings(REQUEST_METRICS_ENABLED=True)
+    async def test_metrics_count_queries_in_worker_threads(self):
+        """Test that queries run through sync_to_async are attributed to the request"""
+        await self.async_client.aforce_login(self.user)
+        
+        response = await self.async_client.get(reverse('tagnid:registration_list'))
+        self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
+    
+    def test_asgi_middleware_chain_is_not_adapted(self):
+        """Test that no middleware forces the ASGI handler back to sync"""
+        import logging
+        from django.core.handlers.asgi import ASGIHandler
+        
+        # Django only logs adaptations with DEBUG on
+        with self.settings(DEBUG=True), self.assertLogs('django.request', logging.DEBUG) as logs:
+            logging.getLogger('django.request').debug('start')
+            ASGIHandler()
+        self.assertFalse([line for line in logs.output if 'adapted' in line])
+    
+    @override_settings(WHITENOISE_AUTOREFRESH=True, WHITENOISE_USE_FINDERS=True)
+    async def test_static_files_served_async(self):
+        """Test that static files are streamed from an async iterator under ASGI"""
+        from django.test import AsyncClient
+        
+        response = await AsyncClient().get('/static/css/style.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertGreater(len(content), 0)
+
+
+class GunicornConfigTests(TestCase):
+    """Test worker sizing in gunicorn.conf.py"""
+    
+    def load_config(self, **environ):
+        import os
+        import runpy
+        from unittest import mock
+        from django.conf import settings
+        
+        with mock.patch.dict(os.environ, environ):
+            return runpy.run_path(str(settings.BASE_DIR / 'gunicorn.conf.py'))
+    
+    def test_compute_workers(self):
+        """Test that workers follow the CPU count but never outgrow memory"""
+        compute_workers = self.load_config()['compute_workers']
+        
+        self.assertEqual(compute_workers(2, 8192), 5)
+        self.assertEqual(compute_workers(8, 1024), 3)  # (1024 - 256) // 200
+        self.assertEqual(compute_workers(4, 256), 1)
+    
+    def test_environment_overrides(self):
+        """Test that WEB_CONCURRENCY and SERVER_MODE are honoured"""
+        config = self.load_config(WEB_CONCURRENCY='7', GUNICORN_THREADS='2')
+        self.assertEqual(config['workers'], 7)
+        self.assertEqual(config['threads'], 2)
+        self.assertEqual(config['wsgi_app'], 'config.wsgi:application')
+        self.assertTrue(config['preload_app'])
+        
+        config = self.load_config(SERVER_MODE='asgi')
+        self.assertEqual(config['wsgi_app'], 'config.asgi:application')
+        self.assertEqual(config['worker_class'], 'uvicorn_worker.UvicornWorker')
+    
+    def test_asgi_mode_closes_database_connections(self):
+        """Test that ASGI mode never keeps persistent connections unless pooling"""
+        import os
+        import runpy
+        from unittest import mock
+        from django.conf import settings
+        
+        def load_settings(**environ):
+            with mock.patch.dict(os.environ, {'DEBUG': 'False', **environ}):
+                return runpy.run_path(str(settings.BASE_DIR / 'config' / 'settings.py'))['DATABASES']['default']
+        
+        self.assertEqual(load_settings(SERVER_MODE='wsgi')['CONN_MAX_AGE'], 60)
+        self.assertEqual(load_settings(SERVER_MODE='asgi')['CONN_MAX_AGE'], 0)
+        pooled = load_settings(SERVER_MODE='asgi', DB_POOL='true')
+        self.assertEqual(pooled['CONN_MAX_AGE'], 0)
+        self.assertIn('pool', pooled['OPTIONS'])
+
+
+class ConditionalPageTests(TestCase):
+    """Test ETag/Last-Modified revalidation and the rendered list page cache"""
+    
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.registration = create_registration(
+            first_name='Isatou', last_name='Njie', region='URR', auxiliary_body='Khuddam', dob=date(1995, 5, 5)
+        )
+        self.list_url = reverse('tagnid:registration_list')
+        self.detail_url = reverse('tagnid:registration_detail', args=[self.registration.pk])
+    
+    def test_list_revalidation(self):
+        """Test that unchanged list pages get 304s and data changes new ETags"""
+        response = self.client.get(self.list_url, {'region': 'URR'})
+        etag = response['ETag']
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        
+        # Empty and reordered parameters normalize to the same page
+        response = self.client.get(self.list_url + '?search=&region=URR', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        
+        other = create_registration(first_name='Ebrima', last_name='Sowe', region='URR', auxiliary_body='Khuddam')
+        response = self.client.get(self.list_url, {'region': 'URR'}, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Ebrima')
+        
+        etag = response['ETag']
+        delete_registration(other.pk)
+        response = self.client.get(self.list_url, {'region': 'URR'}, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Ebrima')
+    
+    def test_list_has_no_last_modified(self):
+        """Test that list pages revalidate by ETag only, since deletes don't move MAX(updated_at)"""
+        import time
+        from django.utils.http import http_date
+        
+        other = create_registration(first_name='Ebrima', last_name='Sowe', region='URR', auxiliary_body='Khuddam')
+        response = self.client.get(self.list_url)
+        self.assertNotIn('Last-Modified', response)
+        self.assertContains(response, 'Ebrima')
+        
+        delete_registration(other.pk)
+        response = self.client.get(self.list_url, headers={'If-Modified-Since': http_date(time.time())})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Ebrima')
+        self.assertIn('Last-Modified', self.client.get(self.detail_url))
+    
+    def test_detail_revalidation(self):
+        """Test that the detail ETag follows the registration and its vitals"""
+        from .service import create_vitals, delete_vitals
+        
+        etag = self.client.get(self.detail_url)['ETag']
+        self.assertEqual(self.client.get(self.detail_url, headers={'If-None-Match': etag}).status_code, 304)
+        
+        create_vitals(self.registration.pk, blood_group='O+', height=170)
+        response = self.client.get(self.detail_url, headers={'If-None-Match': etag})
+        self.assertContains(response, 'O+')
+        
+        etag = response['ETag']
+        delete_vitals(self.registration.pk)
+        self.assertEqual(self.client.get(self.detail_url, headers={'If-None-Match': etag}).status_code, 200)
+        
+        response = self.client.get(reverse('tagnid:registration_detail', args=[self.registration.pk + 100]))
+        self.assertEqual(response.status_code, 404)
+    
+    def test_etag_per_user(self):
+        """Test that another user never revalidates against this user's page"""
+        etag = self.client.get(self.list_url)['ETag']
+        
+        staff = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(self.list_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'staff')
+    
+    def test_code_backfill_changes_etag(self):
+        """Test that backfilled codes (a bulk update) invalidate list ETags"""
+        from .service import backfill_unique_codes
+        
+        Registration.objects.filter(pk=self.registration.pk).update(unique_code=None)
+        etag = self.client.get(self.list_url)['ETag']
+        
+        self.assertEqual(backfill_unique_codes(), 1)
+        response = self.client.get(self.list_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.registration.refresh_from_db()
+        self.assertContains(response, self.registration.unique_code)
+    
+    def test_list_page_cache(self):
+        """Test that repeated list requests are served from the page cache"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        # Load the (cached) user first so every request below does the same auth work
+        self.client.get(self.list_url)
+        with CaptureQueriesContext(connection) as rendered:
+            first = self.client.get(self.list_url, {'auxiliary_body': 'Khuddam'})
+        with CaptureQueriesContext(connection) as cached:
+            second = self.client.get(self.list_url, {'auxiliary_body': 'Khuddam'})
+        self.assertEqual(first.content, second.content)
+        self.assertLess(len(cached), len(rendered))
+        
+        # Pages live in their own cache, not next to sessions and users
+        from django.core.cache import cache, caches
+        from .conditional import PAGE_CACHE_ALIAS, PAGE_CACHE_PREFIX
+        key = PAGE_CACHE_PREFIX + first['ETag']
+        self.assertIsNotNone(caches[PAGE_CACHE_ALIAS].get(key))
+        self.assertIsNone(cache.get(key))
+        
+        # A hard reload renders the page again
+        with CaptureQueriesContext(connection) as reloaded:
+            self.client.get(self.list_url, {'auxiliary_body': 'Khuddam'}, headers={'Cache-Control': 'no-cache'})
+        self.assertEqual(len(reloaded), len(rendered))
+    
+    def test_pending_messages_render(self):
+        """Test that a page with flash messages is rendered, not revalidated"""
+        etag = self.client.get(self.list_url)['ETag']
+        
+        # Non-staff delete attempt redirects to the list with an error message
+        response = self.client.get(reverse('tagnid:registration_delete', args=[self.registration.pk]), follow=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'You do not have permission')
+        self.assertNotIn('ETag', response)
+        
+        response = self.client.get(self.list_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+
+class AuthenticationCacheTests(TestCase):
+    """Test cached sessions and the cached user backend"""
+    
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('tagnid:api_registrations')
+    
+    def auth_queries(self):
+        """Session and user queries made by one request"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'codes': '1999-9999'})
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in queries if 'django_session' in q['sql'] or 'auth_user' in q['sql']]
+    
+    def test_cached_user_and_session(self):
+        """Test that only the first request loads the user and none read the session table"""
+        self.assertEqual(len(self.auth_queries()), 1)
+        self.assertEqual(self.auth_queries(), [])
+    
+    def test_sessions_from_model_backend_still_valid(self):
+        """Test that sessions logged in before the cached backend are not logged out"""
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(self.client.get(self.url, {'codes': '1999-9999'}).status_code, 200)
+    
+    def test_user_change_invalidates_cache(self):
+        """Test that deactivating a user takes effect on their next request"""
+        self.auth_queries()
+        
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(self.url, {'codes': '1999-9999'})
+        self.assertEqual(response.status_code, 401)
+    
+    def test_other_worker_change_invalidates_cache(self):
+        """Test that only a version token is shared, and a new one makes this worker reload"""
+        from django.core.cache import cache, caches
+        from .authentication import USER_CACHE_ALIAS, user_cache_key, user_version_key
+        
+        self.auth_queries()
+        self.assertIsInstance(cache.get(user_version_key(self.user.pk)), str)
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        self.assertIsNotNone(caches[USER_CACHE_ALIAS].get(user_cache_key(self.user.pk)))
+        
+        # Another worker saved the user: only the shared token changes here
+        cache.set(user_version_key(self.user.pk), 'changed-elsewhere', None)
+        self.assertEqual(len(self.auth_queries()), 1)
+        self.assertEqual(self.auth_queries(), [])
+    
+    def test_invalid_session_mode(self):
+        """Test that a mistyped SESSION_MODE names the valid modes"""
+        import os
+        import runpy
+        from unittest import mock
+        from django.conf import settings
+        from django.core.exceptions import ImproperlyConfigured
+        
+        with mock.patch.dict(os.environ, {'SESSION_MODE': 'cache_db'}):
+            with self.assertRaisesRegex(ImproperlyConfigured, 'db, cached_db, signed_cookies'):
+                runpy.run_path(str(settings.BASE_DIR / 'config' / 'settings.py'))
+    
+    @override_settings(USER_CACHE_TIMEOUT=0)
+    def test_user_cache_disabled(self):
+        """Test that a zero timeout loads the user on every request"""
+        self.assertEqual(len(self.auth_queries()), 1)
+        self.assertEqual(len(self.auth_queries()), 1)
+    
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookie_sessions(self):
+        """Test that signed cookie sessions log in and out without the session table"""
+        self.client = Client()
+        self.assertTrue(self.client.login(username='testuser', password='testpass123'))
+        self.auth_queries()
+        self.assertEqual(self.auth_queries(), [])
+        
+        self.client.post(reverse('tagnid:logout'))
+        response = self.client.get(self.url, {'codes': '1999-9999'})
+        self.assertEqual(response.status_code, 401)
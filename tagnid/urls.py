@@ -21,13 +21,30 @@ urlpatterns = [
     path('registrations/export/pdf/', views.export_registrations_pdf, name='export_registrations_pdf'),
     path('registrations/export/pdf/preview/', views.export_registrations_pdf_preview, name='export_registrations_pdf_preview'),
     path('registration/create/', views.registration_create, name='registration_create'),
+    path('registrations/import/', views.registration_import, name='registration_import'),
     path('registration/<int:pk>/', views.registration_detail, name='registration_detail'),
     path('registration/<int:pk>/update/', views.registration_update, name='registration_update'),
     path('registration/<int:pk>/delete/', views.registration_delete, name='registration_delete'),
     
+    # Duplicate review URLs
+    path('duplicates/', views.duplicate_list, name='duplicate_list'),
+    path('duplicates/<int:pk>/dismiss/', views.duplicate_dismiss, name='duplicate_dismiss'),
+    
     # Vitals URLs
     path('registration/<int:registration_id>/vitals/create/', views.vitals_create, name='vitals_create'),
     path('registration/<int:registration_id>/vitals/update/', views.vitals_update, name='vitals_update'),
     path('registration/<int:registration_id>/vitals/delete/', views.vitals_delete, name='vitals_delete'),
+    
+    # Export job URLs
+    path('exports/<int:pk>/', views.export_job_detail, name='export_job_detail'),
+    path('exports/<int:pk>/status/', views.export_job_status, name='export_job_status'),
+    path('exports/<int:pk>/download/', views.export_job_download, name='export_job_download'),
+    
+    # JSON API
+    path('api/registrations/', views.api_registrations, name='api_registrations'),
+    path('api/registrations/sync/', views.api_sync_registrations, name='api_sync_registrations'),
+    
+    # Instrumentation
+    path('metrics/requests/', views.request_metrics, name='request_metrics'),
 ]
 
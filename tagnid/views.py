@@ -1,16 +1,41 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse
+from django.views.decorators.http import require_POST
+from django.http import StreamingHttpResponse, JsonResponse, FileResponse, Http404
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.db.models import Count, Q
 import csv
-from datetime import datetime
+import hashlib
+import json
+import os
+from datetime import date, datetime
+from functools import wraps
+from itertools import islice
+from asgiref.sync import sync_to_async
 from .forms import CustomLoginForm
-from .models import Registration, Vitals
-from .forms import RegistrationForm, VitalsForm
+from .models import Registration, Vitals, ExportJob, DuplicateCandidate, REGION_LABELS, AUXILIARY_BODY_LABELS, calculate_age
+from .exports import EXPORT_CHUNK_SIZE, export_file_exists, request_export
+from .pagination import KeysetPaginator
+from .forms import RegistrationForm, VitalsForm, RegistrationImportForm
+from .middleware import database_connection_stats, metrics_store
+from .conditional import (
+    LIST_PAGE_CACHE_TIMEOUT,
+    conditional_page,
+    registration_detail_fingerprint,
+    registration_list_fingerprint,
+)
+from .duplicates import find_possible_duplicates
+from .importer import SYNC_MAX_BATCH, import_registrations, read_rows, sync_registrations
 from .service import (
+    filter_registrations,
+    get_dashboard_stats,
+    lookup_registrations_by_code,
+    save_registration,
     create_registration,
     update_registration,
     delete_registration,
@@ -20,6 +45,26 @@ from .service import (
 )
 
 
+REGISTRATIONS_PER_PAGE = 20
+
+CSV_EXPORT_HEADER = [
+    'Unique Code',
+    'First Name',
+    'Last Name',
+    'Date of Birth',
+    'Age',
+    'Region',
+    'Auxiliary Body',
+    'Blood Group',
+    'Height (cm)',
+    'Created At',
+    'Updated At'
+]
+
+# Most codes one API lookup may resolve (keeps the IN list and response bounded)
+API_MAX_CODES = 500
+
+
 def login_view(request):
     """User login view"""
     if request.user.is_authenticated:
@@ -47,116 +92,135 @@ def logout_view(request):
     return redirect('tagnid:login')
 
 
+# render() for async views: templates read the session (messages) and may
+# evaluate querysets, which must not happen on the event loop
+arender = sync_to_async(render)
+
+
 @login_required
-def dashboard(request):
+async def dashboard(request):
     """Dashboard with statistics"""
-    # Total registrations
-    total_registrations = Registration.objects.count()
-    
-    # Statistics by region
-    region_stats = Registration.objects.values('region').annotate(
-        count=Count('id')
-    ).order_by('-count')
-    
-    # Statistics by auxiliary body
-    auxiliary_body_stats = Registration.objects.values('auxiliary_body').annotate(
-        count=Count('id')
-    ).order_by('-count')
-    
-    # Get display names for regions and auxiliary body
-    region_data = []
-    for stat in region_stats:
-        region_data.append({
-            'name': dict(Registration.REGION_CHOICES).get(stat['region'], stat['region']),
-            'count': stat['count']
-        })
-    
-    auxiliary_body_data = []
-    for stat in auxiliary_body_stats:
-        auxiliary_body_data.append({
-            'name': dict(Registration.AUXILIARY_BODY_CHOICES).get(stat['auxiliary_body'], stat['auxiliary_body']),
-            'count': stat['count']
-        })
-    
-    return render(request, 'tagnid/dashboard.html', {
-        'total_registrations': total_registrations,
-        'region_stats': region_data,
-        'auxiliary_body_stats': auxiliary_body_data,
-    })
+    stats = await sync_to_async(get_dashboard_stats)()
+    return await arender(request, 'tagnid/dashboard.html', stats)
 
 
 @login_required
-def registration_list(request):
+@conditional_page(registration_list_fingerprint, cache_timeout=LIST_PAGE_CACHE_TIMEOUT)
+async def registration_list(request):
     """List all registrations with search and filter"""
-    registrations = Registration.objects.select_related('vitals').all()
+    context = await sync_to_async(_registration_list_context)(request)
+    return await arender(request, 'tagnid/registration_list.html', context)
+
+
+def _registration_list_context(request):
+    """Template context of one registration list page (runs the page's queries)"""
+    registrations = _get_filtered_registrations(request)
     
-    # Search functionality
     search_query = request.GET.get('search', '')
-    if search_query:
-        registrations = registrations.filter(
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query) |
-            Q(unique_code__icontains=search_query)
-        )
-    
-    # Filter by region
+    # Unknown values select nothing, so they share the cached "All" dropdown fragments
     region_filter = request.GET.get('region', '')
-    if region_filter:
-        registrations = registrations.filter(region=region_filter)
-    
-    # Filter by auxiliary body
+    if region_filter not in REGION_LABELS:
+        region_filter = ''
     auxiliary_body_filter = request.GET.get('auxiliary_body', '')
-    if auxiliary_body_filter:
-        registrations = registrations.filter(auxiliary_body=auxiliary_body_filter)
+    if auxiliary_body_filter not in AUXILIARY_BODY_LABELS:
+        auxiliary_body_filter = ''
+    min_age_filter = request.GET.get('min_age', '')
+    max_age_filter = request.GET.get('max_age', '')
     
-    # Order by creation date (newest first)
-    registrations = registrations.order_by('-created_at')
+    # Ages for the table are computed in the database
+    registrations = registrations.with_age()
     
     # Pagination - 20 per page
-    paginator = Paginator(registrations, 20)
-    page = request.GET.get('page', 1)
-    
-    try:
-        registrations_page = paginator.page(page)
-    except PageNotAnInteger:
-        # If page is not an integer, deliver first page
-        registrations_page = paginator.page(1)
-    except EmptyPage:
-        # If page is out of range, deliver last page
-        registrations_page = paginator.page(paginator.num_pages)
+    if 'page' in request.GET:
+        # Legacy offset pagination, kept so old page=N links still work
+        paginator = Paginator(registrations, REGISTRATIONS_PER_PAGE)
+        page = request.GET.get('page', 1)
+        
+        try:
+            registrations_page = paginator.page(page)
+        except PageNotAnInteger:
+            # If page is not an integer, deliver first page
+            registrations_page = paginator.page(1)
+        except EmptyPage:
+            # If page is out of range, deliver last page
+            registrations_page = paginator.page(paginator.num_pages)
+    else:
+        # Keyset pagination on (created_at, id): no COUNT(*) and no OFFSET
+        paginator = KeysetPaginator(registrations, REGISTRATIONS_PER_PAGE)
+        registrations_page = paginator.page(request.GET.get('cursor'))
+    # Fetch the rows here, in the worker thread, rather than while rendering
+    len(registrations_page)
     
     # Build query string for pagination (preserve filters and search)
     query_params = request.GET.copy()
-    if 'page' in query_params:
-        del query_params['page']
+    for param in ('page', 'cursor'):
+        if param in query_params:
+            del query_params[param]
     query_string = query_params.urlencode()
     
-    return render(request, 'tagnid/registration_list.html', {
+    return {
         'registrations': registrations_page,
         'search_query': search_query,
         'region_filter': region_filter,
         'auxiliary_body_filter': auxiliary_body_filter,
+        'min_age_filter': min_age_filter,
+        'max_age_filter': max_age_filter,
         'region_choices': Registration.REGION_CHOICES,
         'auxiliary_body_choices': Registration.AUXILIARY_BODY_CHOICES,
         'query_string': query_string,
-    })
+    }
 
 
 @login_required
 def registration_create(request):
-    """Create a new registration"""
+    """Create a new registration, first checking that the person is not already registered"""
+    duplicates = []
     if request.method == 'POST':
         form = RegistrationForm(request.POST)
         if form.is_valid():
-            registration = form.save()
-            messages.success(request, f'Registration for {registration.first_name} {registration.last_name} created successfully!')
-            return redirect('tagnid:registration_list')
+            data = form.cleaned_data
+            if not request.POST.get('confirm_not_duplicate'):
+                duplicates = find_possible_duplicates(
+                    data['first_name'], data['last_name'], dob=data.get('dob'), region=data['region']
+                )
+            if not duplicates:
+                registration = save_registration(form.save(commit=False))
+                messages.success(request, f'Registration for {registration.first_name} {registration.last_name} created successfully!')
+                return redirect('tagnid:registration_list')
     else:
         form = RegistrationForm()
     
     return render(request, 'tagnid/registration_form.html', {
         'form': form,
-        'title': 'Create Registration'
+        'title': 'Create Registration',
+        'duplicates': duplicates,
+    })
+
+
+@login_required
+def registration_import(request):
+    """Bulk-create registrations (and vitals) from an uploaded CSV or Excel file"""
+    result = None
+    
+    if request.method == 'POST':
+        form = RegistrationImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                result = import_registrations(read_rows(upload, upload.name))
+            except ValueError as e:
+                messages.error(request, str(e))
+            else:
+                if result.created:
+                    messages.success(request, f'Imported {result.created} registration(s).')
+                if result.failed:
+                    messages.error(request, f'{result.failed} row(s) could not be imported. See the list below.')
+    else:
+        form = RegistrationImportForm()
+    
+    return render(request, 'tagnid/registration_import.html', {
+        'form': form,
+        'result': result,
     })
 
 
@@ -168,7 +232,7 @@ def registration_update(request, pk):
     if request.method == 'POST':
         form = RegistrationForm(request.POST, instance=registration)
         if form.is_valid():
-            registration = form.save()
+            registration = save_registration(form.save(commit=False))
             messages.success(request, f'Registration for {registration.first_name} {registration.last_name} updated successfully!')
             return redirect('tagnid:registration_list')
     else:
@@ -192,7 +256,7 @@ def registration_delete(request, pk):
     registration = get_object_or_404(Registration, pk=pk)
     
     if request.method == 'POST':
-        registration.delete()
+        delete_registration(registration.pk)
         messages.success(request, 'Registration deleted successfully!')
         return redirect('tagnid:registration_list')
     
@@ -202,16 +266,48 @@ def registration_delete(request, pk):
 
 
 @login_required
-def registration_detail(request, pk):
+def duplicate_list(request):
+    """Pending possible-duplicate pairs for review - Only staff/superusers"""
+    if not (request.user.is_staff or request.user.is_superuser):
+        messages.error(request, 'You do not have permission to review duplicates.')
+        return redirect('tagnid:registration_list')
+    
+    candidates = DuplicateCandidate.objects.filter(
+        status=DuplicateCandidate.STATUS_PENDING
+    ).select_related('registration', 'duplicate')
+    paginator = Paginator(candidates, REGISTRATIONS_PER_PAGE)
+    
+    return render(request, 'tagnid/duplicate_list.html', {
+        'candidates': paginator.get_page(request.GET.get('page')),
+    })
+
+
+@login_required
+@require_POST
+def duplicate_dismiss(request, pk):
+    """Mark a possible-duplicate pair as two different people - Only staff/superusers"""
+    if not (request.user.is_staff or request.user.is_superuser):
+        messages.error(request, 'You do not have permission to review duplicates.')
+        return redirect('tagnid:registration_list')
+    
+    candidate = get_object_or_404(DuplicateCandidate, pk=pk)
+    candidate.dismiss(request.user)
+    messages.success(request, 'Marked as different people.')
+    return redirect('tagnid:duplicate_list')
+
+
+@login_required
+@conditional_page(registration_detail_fingerprint)
+async def registration_detail(request, pk):
     """View registration details"""
-    registration = get_object_or_404(Registration, pk=pk)
+    registration = await aget_object_or_404(Registration.objects.select_related('vitals'), pk=pk)
     vitals = None
     try:
         vitals = registration.vitals
     except Vitals.DoesNotExist:
         pass
     
-    return render(request, 'tagnid/registration_detail.html', {
+    return await arender(request, 'tagnid/registration_detail.html', {
         'registration': registration,
         'vitals': vitals
     })
@@ -285,199 +381,100 @@ def vitals_delete(request, registration_id):
     })
 
 
-@login_required
-def export_registrations(request):
-    """Export all registrations to CSV"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="registrations_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
+class _Echo:
+    """File-like object whose write() hands the line back instead of buffering it"""
     
-    writer = csv.writer(response)
-    
-    # Write header row
-    writer.writerow([
-        'Unique Code',
-        'First Name',
-        'Last Name',
-        'Date of Birth',
-        'Age',
-        'Region',
-        'Auxiliary Body',
-        'Blood Group',
-        'Height (cm)',
-        'Created At',
-        'Updated At'
+    def write(self, value):
+        return value
+
+
+CSV_EXPORT_FIELDS = (
+    'unique_code', 'first_name', 'last_name', 'dob', 'current_age', 'region', 'auxiliary_body',
+    'vitals__blood_group', 'vitals__height', 'created_at', 'updated_at'
+)
+
+
+def _csv_export_line(writer, row):
+    """One CSV line for a row of CSV_EXPORT_FIELDS values"""
+    unique_code, first_name, last_name, dob, age, region, auxiliary_body, blood_group, height, created_at, updated_at = row
+    return writer.writerow([
+        unique_code or '',
+        first_name,
+        last_name,
+        dob.strftime('%Y-%m-%d') if dob else '',
+        age if age else '',
+        REGION_LABELS.get(region, region),
+        AUXILIARY_BODY_LABELS.get(auxiliary_body, auxiliary_body),
+        blood_group or '',
+        height if height else '',
+        created_at.strftime('%Y-%m-%d %H:%M:%S') if created_at else '',
+        updated_at.strftime('%Y-%m-%d %H:%M:%S') if updated_at else '',
     ])
+
+
+def _csv_export_rows(registrations):
+    """Yield CSV lines for the header and each registration, one at a time"""
+    writer = csv.writer(_Echo())
     
+    yield writer.writerow(CSV_EXPORT_HEADER)
+    
+    rows = registrations.with_age().values_list(*CSV_EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for row in rows:
+        yield _csv_export_line(writer, row)
+
+
+async def _acsv_export_rows(registrations):
+    """
+    Async version of _csv_export_rows(): no thread is held while the client reads
+    
+    Each chunk of rows is fetched and formatted in the request's worker thread
+    (the same one every time, as the chunked cursor requires) and sent as one
+    piece. QuerySet.aiterator() is not used: for values_list() querysets it
+    runs the query on the event loop.
+    """
+    writer = csv.writer(_Echo())
+    rows = registrations.with_age().values_list(*CSV_EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    
+    def next_chunk():
+        return ''.join(_csv_export_line(writer, row) for row in islice(rows, EXPORT_CHUNK_SIZE))
+    
+    yield writer.writerow(CSV_EXPORT_HEADER)
+    while chunk := await sync_to_async(next_chunk)():
+        yield chunk
+
+
+@login_required
+async def export_registrations(request):
+    """Export all registrations to CSV, streamed row by row"""
     # Get filtered registrations (same filters as list view)
-    registrations = _get_filtered_registrations(request)
+    registrations = await sync_to_async(_get_filtered_registrations)(request)
     
-    for registration in registrations:
-        vitals = None
-        try:
-            vitals = registration.vitals
-        except Vitals.DoesNotExist:
-            pass
-        
-        writer.writerow([
-            registration.unique_code or '',
-            registration.first_name,
-            registration.last_name,
-            registration.dob.strftime('%Y-%m-%d') if registration.dob else '',
-            registration.age if registration.age else '',
-            registration.get_region_display(),
-            registration.get_auxiliary_body_display(),
-            vitals.blood_group if vitals and vitals.blood_group else '',
-            vitals.height if vitals and vitals.height else '',
-            registration.created_at.strftime('%Y-%m-%d %H:%M:%S') if registration.created_at else '',
-            registration.updated_at.strftime('%Y-%m-%d %H:%M:%S') if registration.updated_at else '',
-        ])
+    # Under WSGI Django would buffer a whole async iterator in memory, so only
+    # ASGI deployments get the async one
+    if isinstance(request, ASGIRequest):
+        rows = _acsv_export_rows(registrations)
+    else:
+        rows = _csv_export_rows(registrations)
     
+    response = StreamingHttpResponse(rows, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="registrations_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
     return response
 
 
 def _get_filtered_registrations(request):
     """Helper function to get filtered registrations based on request parameters"""
-    registrations = Registration.objects.select_related('vitals').all()
-    
-    # Search functionality
-    search_query = request.GET.get('search', '')
-    if search_query:
-        registrations = registrations.filter(
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query) |
-            Q(unique_code__icontains=search_query)
-        )
-    
-    # Filter by region
-    region_filter = request.GET.get('region', '')
-    if region_filter:
-        registrations = registrations.filter(region=region_filter)
-    
-    # Filter by auxiliary body
-    auxiliary_body_filter = request.GET.get('auxiliary_body', '')
-    if auxiliary_body_filter:
-        registrations = registrations.filter(auxiliary_body=auxiliary_body_filter)
-    
-    return registrations.order_by('-created_at')
+    return filter_registrations(request.GET)
 
 
 @login_required
 def export_registrations_pdf(request, preview=False):
-    """Export registrations to PDF with optional preview"""
-    try:
-        from reportlab.lib.pagesizes import letter, A4
-        from reportlab.lib import colors
-        from reportlab.lib.units import inch
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.enums import TA_CENTER, TA_LEFT
-    except ImportError:
-        messages.error(request, 'PDF generation library not installed. Please install reportlab.')
-        return redirect('tagnid:registration_list')
-    
-    # Get filtered registrations
-    registrations = _get_filtered_registrations(request)
-    
-    # Create response
-    response = HttpResponse(content_type='application/pdf')
-    if not preview:
-        response['Content-Disposition'] = f'attachment; filename="registrations_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf"'
-    else:
-        response['Content-Disposition'] = 'inline; filename="registrations_preview.pdf"'
-    
-    # Create PDF document
-    doc = SimpleDocTemplate(response, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=30)
-    story = []
-    
-    # Define styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        textColor=colors.HexColor('#000000'),
-        spaceAfter=30,
-        alignment=TA_CENTER
-    )
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=12,
-        textColor=colors.HexColor('#000000'),
-        spaceAfter=12
-    )
+    """Queue (or reuse) a background PDF export and show its progress page"""
+    job = request_export(request.GET, export_format=ExportJob.FORMAT_PDF, user=request.user)
     
-    # Title
-    title = Paragraph("Majilis Khuddamul Ahmadiyya The Gambia<br/>National Registration Tajnid 2025", title_style)
-    story.append(title)
-    story.append(Spacer(1, 0.2*inch))
-    
-    # Summary info
-    summary_text = f"Total Registrations: {registrations.count()}<br/>Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-    if request.GET.get('search'):
-        summary_text += f"<br/>Search: {request.GET.get('search')}"
-    if request.GET.get('region'):
-        summary_text += f"<br/>Region: {dict(Registration.REGION_CHOICES).get(request.GET.get('region'), '')}"
-    if request.GET.get('auxiliary_body'):
-        summary_text += f"<br/>Auxiliary Body: {dict(Registration.AUXILIARY_BODY_CHOICES).get(request.GET.get('auxiliary_body'), '')}"
-    
-    summary = Paragraph(summary_text, styles['Normal'])
-    story.append(summary)
-    story.append(Spacer(1, 0.3*inch))
-    
-    # Prepare table data
-    data = [['Unique Code', 'Name', 'Region', 'Auxiliary Body', 'DOB', 'Age', 'Blood Group', 'Height']]
-    
-    for registration in registrations:
-        vitals = None
-        try:
-            vitals = registration.vitals
-        except Vitals.DoesNotExist:
-            pass
-        
-        name = f"{registration.first_name} {registration.last_name}"
-        dob_str = registration.dob.strftime('%Y-%m-%d') if registration.dob else 'N/A'
-        age_str = str(registration.age) if registration.age else 'N/A'
-        blood_group = vitals.blood_group if vitals and vitals.blood_group else 'N/A'
-        height = f"{vitals.height} cm" if vitals and vitals.height else 'N/A'
-        
-        data.append([
-            registration.unique_code or 'N/A',
-            name,
-            registration.get_region_display(),
-            registration.get_auxiliary_body_display(),
-            dob_str,
-            age_str,
-            blood_group,
-            height
-        ])
-    
-    # Create table with column widths
-    col_widths = [0.8*inch, 1.2*inch, 0.8*inch, 0.9*inch, 0.8*inch, 0.4*inch, 0.6*inch, 0.6*inch]
-    table = Table(data, colWidths=col_widths, repeatRows=1)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#bab148')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-        ('TOPPADDING', (0, 0), (-1, 0), 10),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#fdf4e3')),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 7),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#fdf4e3')]),
-    ]))
-    
-    story.append(table)
-    
-    # Build PDF
-    doc.build(story)
-    
-    return response
+    url = reverse('tagnid:export_job_detail', args=[job.pk])
+    if preview:
+        url += '?preview=1'
+    return redirect(url)
 
 
 @login_required
@@ -485,3 +482,142 @@ def export_registrations_pdf_preview(request):
     """Preview PDF export"""
     return export_registrations_pdf(request, preview=True)
 
+
+@login_required
+def export_job_detail(request, pk):
+    """Progress page for an export job; polls the status endpoint until it finishes"""
+    job = get_object_or_404(ExportJob, pk=pk)
+    
+    return render(request, 'tagnid/export_job.html', {
+        'job': job,
+        'preview': request.GET.get('preview') == '1',
+    })
+
+
+@login_required
+def export_job_status(request, pk):
+    """JSON status of an export job"""
+    job = get_object_or_404(ExportJob, pk=pk)
+    
+    data = {
+        'id': job.pk,
+        'status': job.status,
+        'download_url': None,
+        'error': job.error,
+    }
+    if job.status == ExportJob.STATUS_DONE:
+        data['download_url'] = reverse('tagnid:export_job_download', args=[job.pk])
+    return JsonResponse(data)
+
+
+@login_required
+def export_job_download(request, pk):
+    """Serve the finished file of an export job"""
+    job = get_object_or_404(ExportJob, pk=pk, status=ExportJob.STATUS_DONE)
+    if not export_file_exists(job):
+        raise Http404('Export file not found')
+    
+    finished = job.finished_at or job.created_at
+    return FileResponse(
+        job.file.open('rb'),
+        as_attachment=request.GET.get('inline') != '1',
+        filename=f'registrations_{finished.strftime("%Y%m%d_%H%M%S")}.{job.format}',
+        content_type='application/pdf',
+    )
+
+
+def _api_login_required(view):
+    """Like login_required, but answers 401 JSON instead of redirecting to the login page"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@_api_login_required
+def api_registrations(request):
+    """
+    JSON lookup of registrations by unique code for check-in scanners
+    
+    GET /api/registrations/?codes=2025-0001,2025-0002 resolves every code in one
+    query. The response carries an ETag; a matching If-None-Match gets a 304.
+    """
+    codes = [code.strip() for code in request.GET.get('codes', '').split(',') if code.strip()]
+    codes = list(dict.fromkeys(codes))
+    if not codes:
+        return JsonResponse({'error': 'Pass one or more unique codes in the "codes" parameter'}, status=400)
+    if len(codes) > API_MAX_CODES:
+        return JsonResponse({'error': f'At most {API_MAX_CODES} codes per request'}, status=400)
+    
+    found = lookup_registrations_by_code(codes)
+    today = date.today()
+    results = []
+    for code in codes:
+        row = found.get(code)
+        if row is None:
+            continue
+        results.append({
+            'id': row['id'],
+            'unique_code': code,
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'dob': row['dob'],
+            'age': calculate_age(row['dob'], today),
+            'region': row['region'],
+            'auxiliary_body': row['auxiliary_body'],
+            'blood_group': row['vitals__blood_group'],
+            'height': row['vitals__height'],
+            'updated_at': max(filter(None, (row['updated_at'], row['vitals__updated_at']))),
+        })
+    payload = {
+        'results': results,
+        'missing': [code for code in codes if code not in found],
+    }
+    
+    response = JsonResponse(payload, json_dumps_params={'separators': (',', ':')})
+    response['ETag'] = '"%s"' % hashlib.md5(response.content, usedforsecurity=False).hexdigest()
+    response['Cache-Control'] = 'private, no-cache'
+    # Same If-None-Match handling (weak tags, "*") as the conditional pages
+    return get_conditional_response(request, etag=response['ETag'], response=response)
+
+
+@require_POST
+@_api_login_required
+def api_sync_registrations(request):
+    """
+    Batched sync endpoint for registrations queued on offline devices
+    
+    POST /api/registrations/sync/ with a JSON body {"registrations": [...]}, each
+    item carrying a client-generated "client_uuid" and the registration fields
+    (plus optional blood_group/height). Like any POST it needs the X-CSRFToken header.
+    Returns the outcome and assigned unique_code of every item, in order.
+    """
+    try:
+        items = json.loads(request.body).get('registrations')
+    except (ValueError, AttributeError):
+        items = None
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return JsonResponse({'error': 'Body must be a JSON object with a "registrations" list'}, status=400)
+    if len(items) > SYNC_MAX_BATCH:
+        return JsonResponse({'error': f'At most {SYNC_MAX_BATCH} registrations per request'}, status=400)
+    
+    return JsonResponse({'results': sync_registrations(items)})
+
+
+@login_required
+def request_metrics(request):
+    """Staff-only JSON dump of this worker's per-view request metrics (?reset=1 clears them)"""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Staff access required'}, status=403)
+    
+    data = {
+        'enabled': settings.REQUEST_METRICS_ENABLED,
+        'pid': os.getpid(),
+        'databases': database_connection_stats(),
+        'views': metrics_store.summary(),
+    }
+    if request.GET.get('reset') == '1':
+        metrics_store.reset()
+    return JsonResponse(data)